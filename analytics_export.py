@@ -0,0 +1,237 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from json_store import atomic_open
+
+logger = logging.getLogger(__name__)
+
+DATASETS = ('matches', 'posts', 'videos')
+
+# Match score histogram bins, from 0 to 1 in tenths
+SCORE_BINS = [i / 10 for i in range(11)]
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def match_row(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat row for a match written to the sheet."""
+    return {
+        'reddit_url': match.get('reddit_url', ''),
+        'reddit_subreddit': match.get('reddit_subreddit', ''),
+        'category': match.get('category', ''),
+        'reddit_score': int(_number(match.get('reddit_score'))),
+        'reddit_comments': int(_number(match.get('reddit_comments'))),
+        'tiktok_url': match.get('tiktok_url', ''),
+        'tiktok_author': match.get('tiktok_author', ''),
+        'tiktok_views': int(_number(match.get('tiktok_views'))),
+        'match_score': _number(match.get('match_score')),
+        'search_query': match.get('search_query', ''),
+        'query_template': match.get('query_template', 'keywords')
+    }
+
+def post_row(problem: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat row for a Reddit post scanned as a problem."""
+    return {
+        'reddit_url': problem.get('reddit_url', ''),
+        'subreddit': problem.get('subreddit', ''),
+        'category': problem.get('category', ''),
+        'score': int(_number(problem.get('score'))),
+        'num_comments': int(_number(problem.get('num_comments'))),
+        'query_template': problem.get('query_template', 'keywords')
+    }
+
+def video_row(video: Dict[str, Any], query: str = '', category: str = '') -> Dict[str, Any]:
+    """Flat row for a snapshot of a TikTok video found by a search."""
+    return {
+        'url': video.get('url', ''),
+        'author': video.get('author', ''),
+        'views': int(_number(video.get('views'))),
+        'likes': int(_number(video.get('likes'))),
+        'hashtags': ' '.join(video.get('hashtags') or []),
+        'search_query': query,
+        'category': category
+    }
+
+class AnalyticsExporter:
+    """Buffer matches, posts and video snapshots and write them to Parquet, partitioned by date.
+    
+    Each flush writes one file per dataset and day under
+    <root>/<dataset>/date=YYYY-MM-DD/, so history can be read with pandas,
+    pyarrow or DuckDB without touching the Sheets API. Rows carry a
+    seen_at timestamp; posts and videos are snapshots, so the same post or
+    video appears once per scan that saw it.
+    """
+    
+    def __init__(self, root: str = 'analytics', max_buffered_rows: int = 5000):
+        """Initialize the exporter; nothing is written until flush."""
+        self.root = root
+        self.max_buffered_rows = max_buffered_rows
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {dataset: [] for dataset in DATASETS}
+    
+    def record(self, dataset: str, rows: List[Dict[str, Any]]):
+        """Buffer rows for a dataset, flushing once enough have accumulated."""
+        if not self.enabled or not rows:
+            return
+        
+        seen_at = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._buffers[dataset].extend(dict(row, seen_at=seen_at) for row in rows)
+            full = sum(len(buffer) for buffer in self._buffers.values()) >= self.max_buffered_rows
+        
+        if full:
+            self.flush()
+    
+    def record_matches(self, matches: List[Dict[str, Any]]):
+        """Buffer matches written to the sheet."""
+        self.record('matches', [match_row(match) for match in matches])
+    
+    def record_posts(self, problems: List[Dict[str, Any]]):
+        """Buffer Reddit posts scanned as problems."""
+        self.record('posts', [post_row(problem) for problem in problems])
+    
+    def record_videos(self, videos: List[Dict[str, Any]], query: str = '', category: str = ''):
+        """Buffer snapshots of the videos a search found."""
+        self.record('videos', [video_row(video, query, category) for video in videos])
+    
+    def flush(self) -> int:
+        """Write buffered rows to Parquet files; returns the number of rows written."""
+        with self._lock:
+            buffers = self._buffers
+            self._buffers = {dataset: [] for dataset in DATASETS}
+        
+        if not any(buffers.values()):
+            return 0
+        
+        try:
+            import pandas as pd
+            import pyarrow  # noqa: F401 - required by DataFrame.to_parquet
+        except ImportError as e:
+            logger.warning(f"Analytics export disabled, pandas and pyarrow are required: {e}")
+            self.enabled = False
+            return 0
+        
+        written = 0
+        for dataset, rows in buffers.items():
+            if not rows:
+                continue
+            try:
+                written += self._write(pd.DataFrame(rows), dataset)
+            except Exception as e:
+                logger.error(f"Failed to export {len(rows)} {dataset} rows: {e}")
+                # Keep the rows for the next flush, unless the buffer has grown too large
+                with self._lock:
+                    self._buffers[dataset][:0] = rows[-self.max_buffered_rows:]
+        
+        if written:
+            logger.info(f"Exported {written} analytics rows to {self.root}")
+        return written
+    
+    def _write(self, frame, dataset: str) -> int:
+        """Write a dataset's rows to one file per day."""
+        frame['seen_at'] = frame['seen_at'].astype('datetime64[ns]')
+        name = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+        
+        for day, rows in frame.groupby(frame['seen_at'].dt.strftime('%Y-%m-%d')):
+            directory = os.path.join(self.root, dataset, f"date={day}")
+            os.makedirs(directory, exist_ok=True)
+            
+            # Written under a temporary name so readers never see a partial file
+            with atomic_open(os.path.join(directory, name), 'wb') as f:
+                rows.to_parquet(f, index=False)
+        
+        return len(frame)
+
+def load_dataset(root: str, dataset: str, days: Optional[int] = None):
+    """Read a dataset's Parquet files, optionally only the last `days` days of partitions."""
+    import pandas as pd
+    
+    base = os.path.join(root, dataset)
+    cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d') if days else ''
+    frames = []
+    
+    if os.path.isdir(base):
+        for partition in sorted(os.listdir(base)):
+            if not partition.startswith('date=') or partition[5:] < cutoff:
+                continue
+            directory = os.path.join(base, partition)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.parquet'):
+                    frames.append(pd.read_parquet(os.path.join(directory, name)))
+    
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def build_report(root: str = 'analytics', days: Optional[int] = 30, top: int = 10) -> Dict[str, Any]:
+    """Per-category conversion, score distributions and top authors over the exported history.
+    
+    Returns DataFrames keyed 'conversion', 'match_scores', 'score_histogram',
+    'reddit_scores' and 'top_authors'; a DataFrame is empty when the data
+    it needs hasn't been exported yet.
+    """
+    import pandas as pd
+    
+    matches = load_dataset(root, 'matches', days)
+    posts = load_dataset(root, 'posts', days)
+    videos = load_dataset(root, 'videos', days)
+    report = {name: pd.DataFrame() for name in
+              ('conversion', 'match_scores', 'score_histogram', 'reddit_scores', 'top_authors')}
+    
+    # Posts and videos are snapshots; keep the latest one of each
+    if not posts.empty:
+        posts = posts.sort_values('seen_at').drop_duplicates('reddit_url', keep='last')
+    if not videos.empty:
+        videos = videos.sort_values('seen_at').drop_duplicates('url', keep='last')
+    
+    if not posts.empty:
+        scanned = posts.groupby('category')['reddit_url'].nunique().rename('posts')
+        matched = (matches.groupby('category')['reddit_url'].nunique() if not matches.empty
+                   else pd.Series(dtype='int64')).rename('matched_posts')
+        total = (matches.groupby('category').size() if not matches.empty
+                 else pd.Series(dtype='int64')).rename('matches')
+        
+        conversion = pd.concat([scanned, matched, total], axis=1).fillna(0).astype('int64')
+        conversion['conversion'] = (conversion['matched_posts'] / conversion['posts'].where(conversion['posts'] > 0)).round(3)
+        conversion['matches_per_post'] = (conversion['matches'] / conversion['posts'].where(conversion['posts'] > 0)).round(2)
+        report['conversion'] = conversion.sort_values('conversion', ascending=False)
+        
+        report['reddit_scores'] = posts.assign(matched=posts['reddit_url'].isin(
+            matches['reddit_url'] if not matches.empty else []
+        )).groupby('matched')['score'].describe(percentiles=[0.5, 0.9]).round(1)
+    
+    if not matches.empty:
+        report['match_scores'] = matches.groupby('category')['match_score'].describe(
+            percentiles=[0.25, 0.5, 0.75, 0.9]
+        ).round(3)
+        
+        bins = pd.cut(matches['match_score'].clip(0, 1), SCORE_BINS, include_lowest=True)
+        report['score_histogram'] = pd.crosstab(bins, matches['category'])
+        
+        authors = matches.groupby('tiktok_author').agg(
+            matches=('tiktok_url', 'size'),
+            videos=('tiktok_url', 'nunique'),
+            categories=('category', 'nunique'),
+            mean_score=('match_score', 'mean')
+        )
+        
+        # Views come from the latest snapshot of each video, falling back to the match
+        latest = matches.drop_duplicates('tiktok_url', keep='last').set_index('tiktok_url')
+        views = latest['tiktok_views']
+        if not videos.empty:
+            views = videos.set_index('url')['views'].reindex(views.index).fillna(views)
+        views = views.groupby(latest['tiktok_author']).sum()
+        
+        authors['views'] = views.reindex(authors.index).fillna(0).astype('int64')
+        authors['mean_score'] = authors['mean_score'].round(3)
+        report['top_authors'] = authors.sort_values(['matches', 'views'], ascending=False).head(top)
+    
+    return report
@@ -0,0 +1,252 @@
+import json
+import time
+import base64
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from content_parser import extract_product_terms
+
+logger = logging.getLogger(__name__)
+
+# URL patterns dropped during searches: we only read links, text and view counts
+BLOCKED_URL_PATTERNS = [
+    # Video streams
+    '*.mp4*', '*.webm*', '*.m3u8*', '*/video/tos/*',
+    # Images
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.ico*',
+    '*.image*', '*tiktokcdn*/obj/*',
+    # Fonts
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    # Analytics and third-party trackers
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*connect.facebook.com*', '*analytics.tiktok.com*',
+    '*mon.tiktokv.com*', '*mon-va.byteoversea.com*', '*mcs.tiktokv.com*',
+    '*mssdk*.tiktokw.*', '*sentry.io*', '*hotjar.com*'
+]
+
+# Rough transfer size per blocked request, used to estimate savings since a
+# blocked request never reports its size
+ESTIMATED_BYTES_BY_TYPE = {
+    'Media': 750000,
+    'Image': 35000,
+    'Font': 45000,
+    'Script': 60000,
+    'XHR': 5000,
+    'Fetch': 5000,
+    'Ping': 500,
+    'Other': 10000
+}
+
+def configure_resource_blocking(options):
+    """Add Chrome options that stop images and media from loading."""
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_argument('--autoplay-policy=user-gesture-required')
+    options.add_argument('--mute-audio')
+    options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.media_stream': 2
+    })
+
+def enable_performance_logging(options):
+    """Ask ChromeDriver to record DevTools network events."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+def enable_resource_blocking(driver, patterns: List[str] = BLOCKED_URL_PATTERNS):
+    """Install DevTools blocking rules on a running driver."""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+def _read_performance_log(driver) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Drain the performance log and return (target, method, params) for network events."""
+    events = []
+    
+    try:
+        entries = driver.get_log('performance')
+    except Exception as e:
+        logger.warning(f"Performance log not available: {e}")
+        return events
+    
+    for entry in entries:
+        try:
+            logged = json.loads(entry['message'])
+            message = logged['message']
+        except (KeyError, ValueError):
+            continue
+        
+        method = message.get('method', '')
+        if method.startswith('Network.'):
+            # 'webview' is the DevTools target (tab) that logged the event
+            events.append((logged.get('webview', ''), method, message.get('params', {})))
+    
+    return events
+
+def read_network_events(driver) -> List[Tuple[str, Dict[str, Any]]]:
+    """Drain the performance log and return (method, params) for network events."""
+    return [(method, params) for _, method, params in _read_performance_log(driver)]
+
+def read_network_events_by_target(driver) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    """Drain the performance log and group (method, params) by the tab that logged them."""
+    events: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    for target, method, params in _read_performance_log(driver):
+        events.setdefault(target, []).append((method, params))
+    return events
+
+def window_target_id(handle: str) -> str:
+    """DevTools target ID of a WebDriver window handle (older chromedrivers prefix 'CDwindow-')."""
+    return handle[len('CDwindow-'):] if handle.startswith('CDwindow-') else handle
+
+def summarize_resource_usage(events: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Summarize requests loaded and blocked on a page."""
+    request_types = {}
+    report = {
+        'requests_loaded': 0,
+        'bytes_loaded': 0,
+        'requests_blocked': 0,
+        'estimated_bytes_saved': 0,
+        'blocked_by_type': {}
+    }
+    
+    for method, params in events:
+        request_id = params.get('requestId')
+        
+        if method == 'Network.requestWillBeSent':
+            request_types[request_id] = params.get('type', 'Other')
+        
+        elif method == 'Network.loadingFinished':
+            report['requests_loaded'] += 1
+            report['bytes_loaded'] += int(params.get('encodedDataLength', 0))
+        
+        elif method == 'Network.loadingFailed':
+            blocked = params.get('blockedReason') or 'BLOCKED_BY_CLIENT' in params.get('errorText', '')
+            if not blocked:
+                continue
+            
+            resource_type = params.get('type') or request_types.get(request_id, 'Other')
+            report['requests_blocked'] += 1
+            report['blocked_by_type'][resource_type] = report['blocked_by_type'].get(resource_type, 0) + 1
+            report['estimated_bytes_saved'] += ESTIMATED_BYTES_BY_TYPE.get(
+                resource_type, ESTIMATED_BYTES_BY_TYPE['Other']
+            )
+    
+    return report
+
+# TikTok endpoints whose JSON bodies carry search results
+SEARCH_API_PATTERNS = (
+    '/api/search/general/full/',
+    '/api/search/item/full/',
+    '/api/search/video/full/'
+)
+
+def fetch_search_payloads(driver, events: List[Tuple[str, Dict[str, Any]]],
+                          seen_request_ids: set) -> List[Dict[str, Any]]:
+    """Fetch the JSON bodies of completed TikTok search responses seen in the events."""
+    search_requests = {}
+    finished = set()
+    
+    for method, params in events:
+        if method == 'Network.responseReceived':
+            url = params.get('response', {}).get('url', '')
+            if any(pattern in url for pattern in SEARCH_API_PATTERNS):
+                search_requests[params.get('requestId')] = url
+        elif method == 'Network.loadingFinished':
+            finished.add(params.get('requestId'))
+    
+    payloads = []
+    for request_id in search_requests:
+        if request_id not in finished or request_id in seen_request_ids:
+            continue
+        seen_request_ids.add(request_id)
+        
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            text = body.get('body', '')
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8', errors='replace')
+            payloads.append(json.loads(text))
+        except Exception as e:
+            logger.warning(f"Failed to read search response body: {e}")
+    
+    return payloads
+
+def parse_search_payload(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn a TikTok search API payload into structured video records."""
+    items = []
+    
+    # general/full wraps each video as {"type": 1, "item": {...}}
+    for entry in payload.get('data') or []:
+        if isinstance(entry, dict) and isinstance(entry.get('item'), dict):
+            items.append(entry['item'])
+    
+    # item/full and video/full return the videos directly
+    for key in ('item_list', 'itemList'):
+        items.extend(item for item in payload.get(key) or [] if isinstance(item, dict))
+    
+    videos = []
+    for item in items:
+        video_id = str(item.get('id', ''))
+        if not video_id:
+            continue
+        
+        author = item.get('author') or {}
+        author_name = author.get('uniqueId', '') if isinstance(author, dict) else str(author)
+        stats = item.get('stats') or {}
+        description = item.get('desc', '') or ''
+        
+        hashtags = [
+            extra.get('hashtagName') for extra in item.get('textExtra') or []
+            if isinstance(extra, dict) and extra.get('hashtagName')
+        ]
+        if not hashtags:
+            hashtags = [c.get('title') for c in item.get('challenges') or [] if c.get('title')]
+        
+        videos.append({
+            'id': video_id,
+            'title': description[:200],
+            'url': f"https://www.tiktok.com/@{author_name}/video/{video_id}",
+            'views': int(stats.get('playCount', 0) or 0),
+            'likes': int(stats.get('diggCount', 0) or 0),
+            'author': f"@{author_name}" if author_name else 'Unknown',
+            'description': description,
+            'hashtags': [tag.lower() for tag in hashtags],
+            'product_terms': extract_product_terms(description),
+            'duration': (item.get('video') or {}).get('duration'),
+            'created_utc': item.get('createTime'),
+            'platform': 'TikTok',
+            'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+    
+    return videos
+
+# Returns a short reason when the current page is a captcha or block page
+BLOCK_CHECK_SCRIPT = """
+const href = window.location.href.toLowerCase();
+if (href.includes('captcha') || href.includes('/verify')) { return 'redirected to ' + href; }
+if (document.querySelector('#captcha_container, .captcha_verify_container, [class*="captcha-verify"], [id*="secsdk-captcha"]')) {
+    return 'captcha challenge';
+}
+const text = (document.body ? document.body.innerText : '').slice(0, 2000).toLowerCase();
+for (const marker of ['too many requests', 'verify to continue', 'access denied', 'maximum number of attempts']) {
+    if (text.includes(marker)) { return marker; }
+}
+return null;
+"""
+
+def detect_block_page(driver) -> Optional[str]:
+    """Check whether the current page is a captcha or rate-limit page."""
+    try:
+        return driver.execute_script(BLOCK_CHECK_SCRIPT)
+    except Exception as e:
+        logger.warning(f"Block check failed: {e}")
+        return None
+
+def detect_blocked_responses(events: List[Tuple[str, Dict[str, Any]]]) -> Optional[str]:
+    """Check for TikTok search API responses rejected with 403 or 429."""
+    for method, params in events:
+        if method != 'Network.responseReceived':
+            continue
+        
+        response = params.get('response', {})
+        if response.get('status') in (403, 429) and \
+                any(pattern in response.get('url', '') for pattern in SEARCH_API_PATTERNS):
+            return f"search API returned {response['status']}"
+    
+    return None
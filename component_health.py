@@ -0,0 +1,67 @@
+import os
+import time
+import logging
+import importlib.util
+from typing import Dict, List, Optional
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+# Modules each component needs at runtime
+COMPONENT_MODULES = {
+    'reddit': ['praw'],
+    'tiktok': ['selenium', 'webdriver_manager', 'bs4'],
+    'sheets': ['gspread', 'oauth2client'],
+    'telegram': ['requests', 'gspread', 'oauth2client']
+}
+
+# Environment variables each component needs
+COMPONENT_SETTINGS = {
+    'reddit': ['REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET'],
+    'tiktok': [],
+    'sheets': [],
+    'telegram': ['TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
+}
+
+def _modules_available(modules: List[str]) -> bool:
+    """Check that modules can be imported, without importing them."""
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+def check_components_offline(enable_telegram: bool = True) -> Dict[str, bool]:
+    """Check component configuration without importing clients or touching the network."""
+    results = {}
+    
+    for component, modules in COMPONENT_MODULES.items():
+        if component == 'reddit' and os.getenv('REDDIT_CLIENT_MODE', 'praw').lower() == 'json':
+            modules = ['requests']
+        settings_ok = all(os.getenv(name) for name in COMPONENT_SETTINGS[component])
+        results[component] = _modules_available(modules) and settings_ok
+    
+    service_account_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'service_account.json')
+    results['sheets'] = results['sheets'] and os.path.exists(service_account_file)
+    results['telegram'] = enable_telegram and results['telegram'] and os.path.exists(service_account_file)
+    
+    return results
+
+class ComponentHealthCache:
+    """Cache live component test results on disk for a limited time."""
+    
+    def __init__(self, path: str = 'component_health.json', ttl_minutes: float = 30):
+        """Initialize the health cache."""
+        self.path = path
+        self.ttl_seconds = ttl_minutes * 60
+    
+    def load(self) -> Optional[Dict[str, bool]]:
+        """Return cached results if they are still fresh."""
+        cached = load_json(self.path, 'component health cache', {})
+        if time.time() - cached.get('checked_at', 0) > self.ttl_seconds:
+            return None
+        
+        return cached.get('results')
+    
+    def save(self, results: Dict[str, bool]):
+        """Store live test results."""
+        try:
+            atomic_write_json(self.path, {'checked_at': time.time(), 'results': results})
+        except OSError as e:
+            logger.warning(f"Failed to cache component health: {e}")
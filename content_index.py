@@ -0,0 +1,171 @@
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from content_parser import extract_hashtags, extract_product_terms, video_id_from_url
+
+logger = logging.getLogger(__name__)
+
+HASHTAG = 'hashtag'
+PRODUCT = 'product'
+
+class ContentIndex:
+    """Inverted index from hashtags and product terms to the TikTok videos using them.
+    
+    Each (term, video, category) posting remembers when it was first seen, so
+    trend queries compare how many new videos used a term this window against
+    the previous one. Adding videos is incremental: postings already in the
+    index are left alone and only view counts are refreshed.
+    """
+    
+    def __init__(self, path: str = 'content_index.db'):
+        """Initialize the index and create its tables if needed."""
+        self.path = path
+        self._local = threading.local()
+        
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS videos (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    author TEXT,
+                    views INTEGER NOT NULL DEFAULT 0,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    category TEXT NOT NULL COLLATE NOCASE,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (term, kind, video_id, category)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS postings_recent ON postings (kind, category, seen_at)')
+    
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections can't be shared."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def _terms(video: Dict[str, Any]) -> List[tuple]:
+        """(term, kind) pairs of a video, extracting them if the scraper didn't."""
+        text = video.get('description') or video.get('title', '')
+        hashtags = video.get('hashtags')
+        if hashtags is None:
+            hashtags = extract_hashtags(text)
+        product_terms = video.get('product_terms')
+        if product_terms is None:
+            product_terms = extract_product_terms(text)
+        
+        pairs = {(tag.lstrip('#').lower(), HASHTAG) for tag in hashtags if tag.lstrip('#')}
+        pairs.update((term, PRODUCT) for term in product_terms)
+        return list(pairs)
+    
+    def add_videos(self, videos: List[Dict[str, Any]], category: str = '') -> int:
+        """Index videos found for a category; returns the number of new postings."""
+        now = time.time()
+        conn = self._connect()
+        added = 0
+        
+        with conn:
+            for video in videos:
+                url = video.get('url')
+                if not url:
+                    continue
+                video_id = str(video.get('id') or video_id_from_url(url))
+                
+                conn.execute(
+                    'INSERT INTO videos (id, url, title, author, views, first_seen, last_seen) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET views = MAX(views, excluded.views), last_seen = excluded.last_seen',
+                    (video_id, url, video.get('title', ''), video.get('author', ''),
+                     int(video.get('views', 0) or 0), now, now)
+                )
+                
+                cursor = conn.executemany(
+                    'INSERT OR IGNORE INTO postings (term, kind, video_id, category, seen_at) VALUES (?, ?, ?, ?, ?)',
+                    [(term, kind, video_id, category or '', now) for term, kind in self._terms(video)]
+                )
+                added += max(cursor.rowcount, 0)
+        
+        return added
+    
+    def rising_terms(self, category: Optional[str] = None, kind: str = HASHTAG, days: float = 7,
+                     limit: int = 20, min_videos: int = 2) -> List[Dict[str, Any]]:
+        """Terms gaining the most new videos in the last `days`, compared with the window before.
+        
+        Growth is (recent + 1) / (previous + 1), so brand-new terms rank by
+        their recent count and terms that merely held steady score about 1.
+        """
+        now = time.time()
+        window = days * 86400
+        params = {
+            'recent_since': now - window, 'since': now - 2 * window, 'kind': kind,
+            'category': category, 'min_videos': min_videos, 'limit': limit
+        }
+        category_clause = 'AND category = :category' if category else ''
+        
+        rows = self._connect().execute(f'''
+            SELECT term,
+                   COUNT(DISTINCT CASE WHEN seen_at >= :recent_since THEN video_id END) AS recent,
+                   COUNT(DISTINCT CASE WHEN seen_at < :recent_since THEN video_id END) AS previous
+            FROM postings
+            WHERE kind = :kind AND seen_at >= :since {category_clause}
+            GROUP BY term
+            HAVING recent >= :min_videos
+            ORDER BY (recent + 1.0) / (previous + 1.0) DESC, recent DESC
+            LIMIT :limit
+        ''', params).fetchall()
+        
+        return [
+            {'term': term, 'recent': recent, 'previous': previous,
+             'growth': round((recent + 1) / (previous + 1), 2)}
+            for term, recent, previous in rows
+        ]
+    
+    def videos_for_term(self, term: str, category: Optional[str] = None,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+        """Videos mentioning a product term or using it as a hashtag, most viewed first."""
+        term = term.strip().lower()
+        hashtag = term.lstrip('#').replace(' ', '')
+        params = [term, hashtag]
+        category_clause = ''
+        if category:
+            category_clause = 'AND p.category = ?'
+            params.append(category)
+        params.append(limit)
+        
+        rows = self._connect().execute(f'''
+            SELECT v.id, v.url, v.title, v.author, v.views, v.first_seen,
+                   GROUP_CONCAT(DISTINCT p.category)
+            FROM postings p JOIN videos v ON v.id = p.video_id
+            WHERE ((p.kind = '{PRODUCT}' AND p.term = ?) OR (p.kind = '{HASHTAG}' AND p.term = ?))
+                  {category_clause}
+            GROUP BY v.id
+            ORDER BY v.views DESC
+            LIMIT ?
+        ''', params).fetchall()
+        
+        return [
+            {'id': video_id, 'url': url, 'title': title, 'author': author, 'views': views,
+             'first_seen': first_seen, 'categories': [c for c in (categories or '').split(',') if c]}
+            for video_id, url, title, author, views, first_seen, categories in rows
+        ]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Count indexed videos and distinct terms."""
+        conn = self._connect()
+        videos = conn.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
+        terms = conn.execute('SELECT COUNT(*) FROM (SELECT DISTINCT term, kind FROM postings)').fetchone()[0]
+        return {'videos': videos, 'terms': terms}
@@ -0,0 +1,333 @@
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Product-related keywords for filtering TikTok videos
+PRODUCT_KEYWORDS = [
+    'product', 'review', 'unboxing', 'test', 'try', 'works', 'helps',
+    'relief', 'solution', 'device', 'tool', 'gadget', 'item', 'buy',
+    'purchase', 'amazon', 'link', 'shop', 'store', 'brand', 'recommend',
+    'cushion', 'pillow', 'support', 'brace', 'wrap', 'pad', 'mat',
+    'cream', 'gel', 'oil', 'supplement', 'vitamin', 'medicine',
+    'stretcher', 'roller', 'massager', 'therapy', 'treatment'
+]
+
+PRODUCT_PATTERNS = [re.compile(pattern) for pattern in [
+    r'\b(this|the|my)\s+\w*\s+(product|item|device|tool)',
+    r'\b(buy|purchase|get|order)\s+\w*\s+(this|it|here)',
+    r'\b(link\s+in\s+bio|check\s+description)',
+    r'\b(amazon|shop|store|website)',
+    r'\b(review|unbox|test|try)',
+    r'\b(works|helps|relief|solution)'
+]]
+
+# Pain-related keywords for detecting Reddit problems
+PAIN_KEYWORDS = [
+    'pain', 'hurt', 'ache', 'sore', 'relief', 'chronic', 'suffering',
+    'uncomfortable', 'stiff', 'tender', 'throbbing', 'burning',
+    'sharp', 'dull', 'constant', 'severe', 'mild', 'moderate',
+    'can\'t sleep', 'sleepless', 'insomnia', 'tired', 'exhausted',
+    'inflammation', 'swollen', 'numb', 'tingling', 'weakness',
+    'mobility', 'difficulty', 'struggle', 'help', 'solution',
+    'treatment', 'therapy', 'medication', 'supplement', 'device',
+    'product', 'recommend', 'suggestion', 'advice', 'what works'
+]
+
+PAIN_PATTERNS = [re.compile(pattern) for pattern in [
+    r'\b(my|have|got|experiencing)\s+\w*pain\w*',
+    r'\b(relief|help|solution)\s+(for|with|from)',
+    r'\b(what|any|best)\s+\w*\s+(works|helps|relieves)',
+    r'\b(recommend|suggest|advice)\s+\w*\s+(for|to)',
+    r'\b(can\'t|cannot|unable)\s+(sleep|walk|sit|stand|move)',
+    r'\b(need|looking for|searching for)\s+\w*\s+(help|relief|solution)'
+]]
+
+PROBLEM_CATEGORIES = {
+    'Back Pain': ['back', 'spine', 'lumbar', 'sciatica', 'disc'],
+    'Neck Pain': ['neck', 'cervical', 'whiplash'],
+    'Knee Pain': ['knee', 'patella', 'meniscus'],
+    'Foot Care': ['foot', 'feet', 'plantar', 'heel', 'arch', 'toe'],
+    'Sleep Issues': ['sleep', 'insomnia', 'tired', 'exhausted', 'bed'],
+    'Joint Pain': ['joint', 'arthritis', 'rheumatoid', 'osteoarthritis'],
+    'Muscle Pain': ['muscle', 'strain', 'spasm', 'cramp'],
+    'Headache/Migraine': ['headache', 'migraine', 'head', 'temple'],
+    'Shoulder Pain': ['shoulder', 'rotator', 'cuff'],
+    'General Pain': ['chronic', 'fibromyalgia', 'widespread', 'overall']
+}
+
+# Head nouns that name a product; "posture corrector" is indexed as the phrase and the noun
+PRODUCT_NOUNS = frozenset([
+    'corrector', 'brace', 'cushion', 'pillow', 'massager', 'roller', 'stretcher', 'pad', 'pads',
+    'mat', 'wrap', 'insole', 'insoles', 'sleeve', 'sleeves', 'belt', 'band', 'splint', 'gun',
+    'patch', 'patches', 'cream', 'gel', 'oil', 'spray', 'balm', 'supplement', 'supplements',
+    'device', 'gadget', 'mattress', 'topper', 'chair', 'stand', 'lamp', 'light', 'glasses',
+    'mask', 'socks', 'shoes', 'slippers', 'machine', 'blanket', 'heater'
+])
+
+# Words that never start a product phrase
+PHRASE_STOPWORDS = frozenset([
+    'a', 'an', 'the', 'this', 'that', 'my', 'your', 'our', 'his', 'her', 'its', 'their', 'best',
+    'new', 'one', 'and', 'or', 'for', 'with', 'of', 'to', 'in', 'on', 'is', 'it', 'i', 'you', 'get'
+])
+
+HASHTAG_RE = re.compile(r'#(\w+)')
+TAG_LINK_RE = re.compile(r'/tag/')
+WORD_RE = re.compile(r"[a-z][a-z'-]*")
+VIDEO_ID_RE = re.compile(r'/video/(\d+)')
+
+VIDEO_LINK_RE = re.compile(r'/video/')
+VIDEO_ITEM_CLASS_RE = re.compile(r'.*video.*item.*')
+VIEW_TEXT_RE = re.compile(r'\d+[KMB]?\s*(view|like)')
+AUTHOR_RE = re.compile(r'@\w+')
+VIEW_COUNT_RE = re.compile(r'(\d+\.?\d*)\s*([KMB]?)')
+
+def is_product_related(title: str, description: str, keywords: List[str] = PRODUCT_KEYWORDS) -> bool:
+    """Check if video text is product-related."""
+    combined_text = f"{title} {description}".lower()
+    
+    if any(keyword in combined_text for keyword in keywords):
+        return True
+    
+    return any(pattern.search(combined_text) for pattern in PRODUCT_PATTERNS)
+
+def is_pain_related(text: str, keywords: List[str] = PAIN_KEYWORDS) -> bool:
+    """Check if text contains pain-related keywords."""
+    text_lower = text.lower()
+    
+    if any(keyword in text_lower for keyword in keywords):
+        return True
+    
+    return any(pattern.search(text_lower) for pattern in PAIN_PATTERNS)
+
+def extract_problem_category(title: str, content: str) -> str:
+    """Extract problem category from post content."""
+    combined_text = f"{title} {content}".lower()
+    
+    for category, keywords in PROBLEM_CATEGORIES.items():
+        if any(keyword in combined_text for keyword in keywords):
+            return category
+    
+    return 'General Pain'
+
+def extract_view_count(view_text: str) -> int:
+    """Extract numeric view count from text."""
+    if not view_text:
+        return 0
+    
+    # Remove non-numeric characters except K, M, B
+    view_text = view_text.upper().replace(',', '')
+    
+    match = VIEW_COUNT_RE.search(view_text)
+    if not match:
+        return 0
+    
+    number = float(match.group(1))
+    multiplier = match.group(2)
+    
+    if multiplier == 'K':
+        return int(number * 1000)
+    elif multiplier == 'M':
+        return int(number * 1000000)
+    elif multiplier == 'B':
+        return int(number * 1000000000)
+    else:
+        return int(number)
+
+def extract_hashtags(text: str) -> List[str]:
+    """Hashtags in a text, lowercased, in order of first appearance."""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_RE.findall(text or '')))
+
+def extract_product_terms(text: str) -> List[str]:
+    """Product nouns in a text, with the word before each as a phrase ("posture corrector")."""
+    # Hashtags are indexed separately
+    words = WORD_RE.findall(HASHTAG_RE.sub(' ', (text or '').lower()))
+    terms = []
+    
+    for i, word in enumerate(words):
+        if word not in PRODUCT_NOUNS:
+            continue
+        if i > 0 and words[i - 1] not in PHRASE_STOPWORDS and words[i - 1] not in PRODUCT_NOUNS:
+            terms.append(f"{words[i - 1]} {word}")
+        terms.append(word)
+    
+    return list(dict.fromkeys(terms))
+
+def video_id_from_url(url: str) -> str:
+    """TikTok video ID from a video URL, or the URL itself if it has none."""
+    match = VIDEO_ID_RE.search(url or '')
+    return match.group(1) if match else url
+
+def extract_video_data(element) -> Optional[Dict[str, Any]]:
+    """Extract video data from a BeautifulSoup element."""
+    # Try to find video link
+    link_elem = element.find('a', href=VIDEO_LINK_RE)
+    if not link_elem:
+        link_elem = element.find('a')
+    
+    if not link_elem:
+        return None
+    
+    video_url = link_elem.get('href', '')
+    if video_url.startswith('/'):
+        video_url = f"https://www.tiktok.com{video_url}"
+    
+    # Extract title/description
+    title_elem = element.find('span') or element.find('div')
+    title = title_elem.get_text(strip=True) if title_elem else ''
+    
+    # Try to find view count
+    view_elem = element.find(text=VIEW_TEXT_RE)
+    views = extract_view_count(view_elem) if view_elem else 0
+    
+    # Extract author if available
+    author_elem = element.find('span', text=AUTHOR_RE)
+    author = author_elem.get_text(strip=True) if author_elem else 'Unknown'
+    
+    # Hashtags from the caption text and from the rendered /tag/ links
+    hashtags = extract_hashtags(title)
+    for tag_link in element.find_all('a', href=TAG_LINK_RE):
+        tag = tag_link.get_text(strip=True).lstrip('#').lower()
+        if tag and tag not in hashtags:
+            hashtags.append(tag)
+    
+    return {
+        'id': video_id_from_url(video_url),
+        'title': title[:200],  # Limit title length
+        'url': video_url,
+        'views': views,
+        'author': author,
+        'description': title,  # Use title as description for now
+        'hashtags': hashtags,
+        'product_terms': extract_product_terms(title),
+        'platform': 'TikTok',
+        'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def is_valid_video(video_data: Dict[str, Any], min_views: int,
+                   keywords: List[str] = PRODUCT_KEYWORDS) -> bool:
+    """Check if video meets criteria for viral product content."""
+    # Check minimum views
+    if video_data['views'] < min_views:
+        return False
+    
+    # Check if product-related
+    if not is_product_related(video_data['title'], video_data['description'], keywords):
+        return False
+    
+    # Check if URL is valid
+    if not video_data['url'] or 'tiktok.com' not in video_data['url']:
+        return False
+    
+    return True
+
+def parse_search_page(page_source: str, max_results: int, min_views: int,
+                      keywords: List[str] = PRODUCT_KEYWORDS) -> List[Dict[str, Any]]:
+    """Parse a TikTok search page and return the valid videos on it."""
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(page_source, 'html.parser')
+    
+    # Find video elements (TikTok structure may change)
+    video_elements = soup.find_all('div', {'data-e2e': 'search_top-item'}) or \
+                     soup.find_all('div', class_=VIDEO_ITEM_CLASS_RE)
+    
+    if not video_elements:
+        # Try alternative selectors
+        video_elements = soup.find_all('a', href=VIDEO_LINK_RE)[:max_results]
+    
+    videos = []
+    for element in video_elements[:max_results]:
+        try:
+            video_data = extract_video_data(element)
+            if video_data and is_valid_video(video_data, min_views, keywords):
+                videos.append(video_data)
+        except Exception as e:
+            logger.warning(f"Failed to extract video data: {e}")
+            continue
+    
+    return videos
+
+def classify_posts(texts: List[Tuple[str, str]],
+                   keywords: List[str] = PAIN_KEYWORDS) -> List[Optional[str]]:
+    """Classify (title, content) pairs.
+    
+    Returns the problem category for each pain-related post and None for
+    the rest, so results stay compact when sent back from a worker.
+    """
+    results = []
+    for title, content in texts:
+        if is_pain_related(f"{title} {content}", keywords):
+            results.append(extract_problem_category(title, content))
+        else:
+            results.append(None)
+    return results
+
+class ParsePool:
+    """Optional process pool for CPU-bound parsing and classification.
+    
+    With zero workers everything runs inline in the calling thread, which is
+    the default and matches the behaviour of a single scraper.
+    """
+    
+    def __init__(self, workers: int = 0, chunk_size: int = 50):
+        """Initialize the parse pool."""
+        self.workers = max(0, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+        
+        if self.executor:
+            logger.info(f"Parse pool started with {self.workers} worker processes")
+    
+    def parse_search_page(self, page_source: str, max_results: int, min_views: int,
+                          keywords: List[str] = PRODUCT_KEYWORDS) -> List[Dict[str, Any]]:
+        """Parse a TikTok search page, in a worker process when available."""
+        if not self.executor:
+            return parse_search_page(page_source, max_results, min_views, keywords)
+        
+        return self.executor.submit(parse_search_page, page_source, max_results, min_views, keywords).result()
+    
+    def classify_posts(self, texts: List[Tuple[str, str]],
+                       keywords: List[str] = PAIN_KEYWORDS) -> List[Optional[str]]:
+        """Classify posts, split into chunks across the worker processes."""
+        if not self.executor or len(texts) <= self.chunk_size:
+            return classify_posts(texts, keywords)
+        
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        futures = [self.executor.submit(classify_posts, chunk, keywords) for chunk in chunks]
+        
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+    
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+_shared_pool: Optional[ParsePool] = None
+_shared_pool_lock = threading.Lock()
+
+def get_parse_pool() -> ParsePool:
+    """Return the process-wide parse pool configured by PARSE_POOL_WORKERS.
+    
+    Set PARSE_POOL_WORKERS to a number of processes, or to auto to use
+    one per CPU core. The default of 0 parses inline.
+    """
+    global _shared_pool
+    
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            setting = os.getenv('PARSE_POOL_WORKERS', '0').strip().lower()
+            workers = (os.cpu_count() or 1) if setting == 'auto' else int(setting or '0')
+            chunk_size = int(os.getenv('PARSE_POOL_CHUNK_SIZE', '50'))
+            _shared_pool = ParsePool(workers, chunk_size)
+        
+        return _shared_pool
@@ -0,0 +1,44 @@
+import os
+import json
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator, IO
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', fsync: bool = False) -> Iterator[IO]:
+    """Open a temporary file next to path that replaces it only if the block succeeds.
+    
+    A crash mid-write leaves the previous file intact.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path: str, data: Any, fsync: bool = False):
+    """Write data as JSON, atomically."""
+    with atomic_open(path, fsync=fsync) as f:
+        json.dump(data, f)
+
+def load_json(path: str, label: str, default: Any = None) -> Any:
+    """Read a JSON file, returning default if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable {label} {path}: {e}")
+        return default
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Dict, Optional, Tuple
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `per_minute` records a minute from each logging call site.
+    
+    Only records below `max_level` are limited, so warnings and errors always
+    get through. The first record after a suppressed stretch says how many
+    were dropped.
+    """
+    
+    def __init__(self, per_minute: int = 20, max_level: int = logging.WARNING):
+        super().__init__()
+        self.per_minute = per_minute
+        self.max_level = max_level
+        self._lock = threading.Lock()
+        self._sites: Dict[Tuple[str, int], list] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.max_level or self.per_minute <= 0:
+            return True
+        
+        now = time.monotonic()
+        with self._lock:
+            # [window start, records let through, records suppressed]
+            site = self._sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+            if now - site[0] >= 60:
+                suppressed = site[2]
+                site[:] = [now, 0, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            
+            if site[1] >= self.per_minute:
+                site[2] += 1
+                return False
+            site[1] += 1
+            return True
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+    
+    def __init__(self, queue_: queue.Queue):
+        super().__init__(queue_)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+    
+    def enqueue(self, record: logging.LogRecord):
+        # The next record that gets through reports the drops before it
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} log records dropped, queue was full)"
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped + 1
+
+def _file_handler(path: str) -> logging.Handler:
+    """Rotating file handler, by size or by time as LOG_ROTATION says."""
+    backups = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    if os.getenv('LOG_ROTATION', 'size').lower() == 'time':
+        return TimedRotatingFileHandler(path, when=os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+                                        backupCount=backups, encoding='utf-8')
+    return RotatingFileHandler(path, maxBytes=int(float(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024),
+                               backupCount=backups, encoding='utf-8')
+
+def setup_logging(log_file: Optional[str] = None) -> QueueListener:
+    """Route all logging through a queue to a rotating file and stdout.
+    
+    Logging calls only put the record on a queue; a background listener
+    thread does the formatting and disk I/O, so a scraping thread never
+    waits on a slow disk. Replaces any handlers set up by basicConfig.
+    """
+    global _listener
+    if _listener is None:
+        atexit.register(_stop_listener)
+    else:
+        _stop_listener()
+    
+    if os.getenv('DEBUG_MODE', 'false').lower() == 'true':
+        level = logging.DEBUG
+    else:
+        level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        log_dir = os.getenv('LOG_DIR', '')
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+            log_file = os.path.join(log_dir, log_file)
+        handlers.append(_file_handler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    queue_handler = DroppingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', '10000'))))
+    queue_handler.addFilter(RateLimitFilter(int(os.getenv('LOG_RATE_LIMIT_PER_MINUTE', '20'))))
+    
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    
+    _listener = QueueListener(queue_handler.queue, *handlers)
+    _listener.start()
+    return _listener
+
+def _stop_listener():
+    """Write out queued records and close the handlers."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -3,16 +3,12 @@ import time
 import logging
 from datetime import datetime
 from typing import Set, List, Dict, Any
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import requests
 from dotenv import load_dotenv
+from sheets_session import get_sheets_session
+from logging_setup import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Configure logging (handlers are installed by setup_logging() in main)
 logger = logging.getLogger(__name__)
 
 class GoogleSheetsToTelegram:
@@ -35,40 +31,18 @@ class GoogleSheetsToTelegram:
         # Track sent rows to avoid duplicates
         self.sent_rows: Set[int] = set()
         
-        # Initialize Google Sheets client
-        self.gc = self._setup_google_sheets()
+        # Initialize Google Sheets client (shared with other clients in this process)
+        self.session = get_sheets_session(self.service_account_file)
+        self.gc = self.session.client
         self.worksheet = None
         
         logger.info("GoogleSheetsToTelegram initialized successfully")
     
-    def _setup_google_sheets(self) -> gspread.Client:
-        """Set up Google Sheets API connection."""
-        try:
-            # Define the scope
-            scope = [
-                'https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            # Add credentials to the account
-            credentials = ServiceAccountCredentials.from_json_keyfile_name(
-                self.service_account_file, scope
-            )
-            
-            # Authorize the clientsheet
-            gc = gspread.authorize(credentials)
-            logger.info("Google Sheets API connection established")
-            return gc
-            
-        except Exception as e:
-            logger.error(f"Failed to setup Google Sheets connection: {e}")
-            raise
-    
     def _get_worksheet(self):
-        """Get the worksheet, with retry logic."""
+        """Get the worksheet from the shared session cache."""
         try:
-            sheet = self.gc.open(self.sheet_name)
-            self.worksheet = sheet.worksheet(self.worksheet_name)
+            sheet = self.session.open_spreadsheet(name=self.sheet_name)
+            self.worksheet = self.session.get_worksheet(sheet, self.worksheet_name)
             logger.info(f"Connected to worksheet: {self.worksheet_name}")
         except Exception as e:
             logger.error(f"Failed to open worksheet: {e}")
@@ -88,7 +62,7 @@ class GoogleSheetsToTelegram:
                 return all_values[1:]  # Skip header row
             else:
                 return []
-                
+        
         except Exception as e:
             logger.error(f"Failed to retrieve rows: {e}")
             return []
@@ -121,7 +95,7 @@ class GoogleSheetsToTelegram:
 *Sent at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*"""
             
             return message
-            
+        
         except Exception as e:
             logger.error(f"Failed to format message for row {row_index}: {e}")
             return f"Error formatting data for row {row_index + 2}"
@@ -146,7 +120,7 @@ class GoogleSheetsToTelegram:
             else:
                 logger.error(f"Failed to send message to Telegram: {response.status_code} - {response.text}")
                 return False
-                
+        
         except Exception as e:
             logger.error(f"Error sending message to Telegram: {e}")
             return False
@@ -189,7 +163,7 @@ class GoogleSheetsToTelegram:
                 logger.info(f"Processed {new_rows_count} new rows")
             else:
                 logger.info("No new rows to process")
-                
+        
         except Exception as e:
             logger.error(f"Error processing rows: {e}")
     
@@ -204,7 +178,7 @@ class GoogleSheetsToTelegram:
                 
                 logger.info("Waiting 5 minutes before next check...")
                 time.sleep(300)  # 5 minutes = 300 seconds
-                
+            
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user")
                 break
@@ -215,6 +189,9 @@ class GoogleSheetsToTelegram:
 
 def main():
     """Main function to start the bot."""
+    load_dotenv()
+    setup_logging('main.log')
+    
     try:
         bot = GoogleSheetsToTelegram()
         bot.run()
@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+# Counted sheet columns, by the name they are reported under
+COUNTED_COLUMNS = {
+    'categories': 'Category',
+    'statuses': 'Status',
+    'subreddits': 'Reddit Subreddit',
+    'days': 'Date Added'
+}
+
+def _empty() -> Dict[str, Any]:
+    aggregates = {name: {} for name in COUNTED_COLUMNS}
+    aggregates.update({'total': 0, 'reconciled_at': 0.0, 'stale': False})
+    return aggregates
+
+def _value(row: Dict[str, Any], name: str) -> str:
+    value = str(row.get(COUNTED_COLUMNS[name], '') or 'Unknown')
+    # Dates are counted per day, whatever time of day was written
+    return value[:10] if name == 'days' else value
+
+def _count(aggregates: Dict[str, Any], rows: Iterable[Dict[str, Any]]):
+    for row in rows:
+        aggregates['total'] += 1
+        for name in COUNTED_COLUMNS:
+            counts = aggregates[name]
+            value = _value(row, name)
+            counts[value] = counts.get(value, 0) + 1
+
+class MatchAggregates:
+    """Match counts by category, status, subreddit and day, per worksheet.
+    
+    Counts are updated as rows are written and statuses change, and saved
+    locally, so stats don't need to read the sheet. A worksheet's counts are
+    replaced by an exact recount whenever its rows are read anyway, and are
+    marked stale when a change can't be applied incrementally.
+    """
+    
+    def __init__(self, path: str = 'match_aggregates.json'):
+        """Initialize the aggregates and load any saved counts."""
+        self.path = path
+        self._lock = threading.Lock()
+        self.worksheets: Dict[str, Dict[str, Any]] = load_json(self.path, 'match aggregates file', {})
+    
+    def add_rows(self, title: str, rows: Iterable[Dict[str, Any]]):
+        """Count rows appended to a worksheet (dicts keyed by sheet header)."""
+        with self._lock:
+            _count(self.worksheets.setdefault(title, _empty()), rows)
+    
+    def replace(self, title: str, rows: List[Dict[str, Any]]):
+        """Replace a worksheet's counts with a recount of all its rows."""
+        aggregates = _empty()
+        _count(aggregates, rows)
+        aggregates['reconciled_at'] = time.time()
+        
+        with self._lock:
+            self.worksheets[title] = aggregates
+    
+    def change_status(self, title: str, old: str, new: str):
+        """Move one row of a worksheet from one status to another."""
+        with self._lock:
+            statuses = self.worksheets.setdefault(title, _empty())['statuses']
+            old = old or 'Unknown'
+            if statuses.get(old, 0) > 0:
+                statuses[old] -= 1
+                if not statuses[old]:
+                    del statuses[old]
+            statuses[new] = statuses.get(new, 0) + 1
+    
+    def mark_stale(self, title: str):
+        """Flag a worksheet's counts as needing a recount."""
+        with self._lock:
+            self.worksheets.setdefault(title, _empty())['stale'] = True
+    
+    def needs_reconcile(self, title: str, max_age_seconds: float) -> bool:
+        """Whether a worksheet's counts are missing, stale or older than max_age_seconds."""
+        with self._lock:
+            aggregates = self.worksheets.get(title)
+            return (aggregates is None or aggregates['stale'] or
+                    time.time() - aggregates['reconciled_at'] >= max_age_seconds)
+    
+    def totals(self, titles: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Counts summed over the given worksheets (all of them by default)."""
+        result = {name: {} for name in COUNTED_COLUMNS}
+        result['total_matches'] = 0
+        
+        with self._lock:
+            for title, aggregates in self.worksheets.items():
+                if titles is not None and title not in titles:
+                    continue
+                result['total_matches'] += aggregates['total']
+                for name in COUNTED_COLUMNS:
+                    for value, count in aggregates[name].items():
+                        result[name][value] = result[name].get(value, 0) + count
+        
+        result['days'] = dict(sorted(result['days'].items()))
+        return result
+    
+    def save(self):
+        """Write the counts to disk atomically."""
+        with self._lock:
+            atomic_write_json(self.path, self.worksheets)
@@ -0,0 +1,129 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+WEEK = 7 * DAY
+
+# Bucket width in seconds and number of buckets kept, per resolution
+RESOLUTIONS = {
+    'minute': (60, 180),
+    'hour': (HOUR, 24 * 14),
+    'day': (DAY, 90)
+}
+
+class MetricsStore:
+    """Rolling time series of counters and timings, kept in fixed-size ring buffers.
+    
+    Every metric has a ring of buckets per resolution (3 hours of minutes,
+    two weeks of hours, 90 days of days); each bucket holds the count, sum
+    and maximum of the values recorded in it. A bucket is reused once its
+    time has rolled out of the ring, so memory and file size stay constant
+    however long the bot runs. All-time totals and the time each metric
+    was last recorded are kept alongside. The rings are saved to disk at
+    most every `save_interval` seconds, so trends survive restarts.
+    """
+    
+    def __init__(self, path: str = 'metrics.json', save_interval: float = 60):
+        """Initialize the store and load any saved series."""
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._saved_at = time.time()
+        state = load_json(self.path, 'metrics file', {})
+        self.series: Dict[str, Dict[str, List[Optional[list]]]] = state.get('series', {})
+        self.totals: Dict[str, float] = state.get('totals', {})
+        self.last_recorded: Dict[str, float] = state.get('last_recorded', {})
+    
+    def _rings(self, name: str) -> Dict[str, List[Optional[list]]]:
+        rings = self.series.setdefault(name, {})
+        for resolution, (_, size) in RESOLUTIONS.items():
+            if len(rings.get(resolution, [])) != size:
+                rings[resolution] = [None] * size
+        return rings
+    
+    def record(self, name: str, value: float = 1.0, when: float = None):
+        """Record one observation: 1 for an event, or a duration, latency or count."""
+        when = time.time() if when is None else when
+        
+        with self._lock:
+            for resolution, ring in self._rings(name).items():
+                width, size = RESOLUTIONS[resolution]
+                start = int(when // width) * width
+                slot = (start // width) % size
+                # [bucket start, count, sum, max]
+                bucket = ring[slot]
+                if bucket is None or bucket[0] < start:
+                    ring[slot] = [start, 1, value, value]
+                elif bucket[0] == start:
+                    bucket[1] += 1
+                    bucket[2] += value
+                    bucket[3] = max(bucket[3], value)
+            self.totals[name] = self.totals.get(name, 0) + value
+            self.last_recorded[name] = max(self.last_recorded.get(name, when), when)
+            due = time.time() - self._saved_at >= self.save_interval
+        
+        if due:
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning(f"Failed to save metrics: {e}")
+    
+    def summary(self, name: str, seconds: float, end: float = None) -> Dict[str, float]:
+        """Count, sum, mean and max of a metric over the `seconds` before `end`.
+        
+        Uses the finest resolution whose ring covers the whole window.
+        """
+        end = time.time() if end is None else end
+        begin = end - seconds
+        resolution = next((r for r, (width, size) in RESOLUTIONS.items() if width * size >= seconds), 'day')
+        
+        count = total = 0
+        peak = None
+        with self._lock:
+            for bucket in self.series.get(name, {}).get(resolution, []):
+                if bucket is None or not begin <= bucket[0] < end:
+                    continue
+                count += bucket[1]
+                total += bucket[2]
+                peak = bucket[3] if peak is None else max(peak, bucket[3])
+        
+        return {
+            'count': count,
+            'sum': round(total, 3),
+            'mean': round(total / count, 3) if count else 0.0,
+            'max': round(peak, 3) if peak is not None else 0.0
+        }
+    
+    def trend(self, name: str, seconds: float = DAY, field: str = 'sum') -> Dict[str, float]:
+        """A metric over the last window compared with the window before it."""
+        now = time.time()
+        current = self.summary(name, seconds, now)[field]
+        previous = self.summary(name, seconds, now - seconds)[field]
+        change = round((current - previous) / previous * 100, 1) if previous else None
+        return {'current': current, 'previous': previous, 'change_pct': change}
+    
+    def get_trends(self, counters: List[str], timings: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Hour, day and week trends: sums of counters and mean durations of timings."""
+        trends = {}
+        for name in counters + timings:
+            field = 'mean' if name in timings else 'sum'
+            trends[name] = {
+                'hour': self.trend(name, HOUR, field),
+                'day': self.trend(name, DAY, field),
+                'week': self.trend(name, WEEK, field),
+                'all_time': round(self.totals.get(name, 0), 3) if field == 'sum' else None
+            }
+        return trends
+    
+    def save(self):
+        """Write the series to disk atomically."""
+        with self._lock:
+            self._saved_at = time.time()
+            atomic_write_json(self.path, {'series': self.series, 'totals': self.totals,
+                                          'last_recorded': self.last_recorded})
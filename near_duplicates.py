@@ -0,0 +1,223 @@
+import re
+import hashlib
+import threading
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Words too common to say anything about what a post is about
+STOPWORDS = frozenset('''
+a an and are as at be but by for from has have i i'm im in is it it's its my me of on or so
+that the this to was were with you your we they he she just can do does did not no
+'''.split())
+
+FINGERPRINT_BITS = 64
+
+def _features(text: str) -> List[str]:
+    """Words and adjacent word pairs of the normalized text."""
+    words = [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def _feature_hash(feature: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def simhash(text: str) -> int:
+    """64-bit SimHash: similar texts get fingerprints that differ in few bits."""
+    weights = [0] * FINGERPRINT_BITS
+    
+    for feature in _features(text):
+        h = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+K = TypeVar('K', bound=Hashable)
+
+class SimHashIndex(Generic[K]):
+    """Find fingerprints within max_distance bits without comparing against all of them.
+    
+    Fingerprints are split into max_distance + 1 bands. Two fingerprints that
+    differ in at most max_distance bits must agree exactly on at least one
+    band, so only entries sharing a band value are compared.
+    """
+    
+    def __init__(self, max_distance: int = 3):
+        """Initialize an empty index."""
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = -(-FINGERPRINT_BITS // self.bands)
+        self._buckets: List[Dict[int, List[K]]] = [{} for _ in range(self.bands)]
+        self._fingerprints: Dict[K, int] = {}
+    
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+    
+    def add(self, key: K, fingerprint: int):
+        """Index a fingerprint under a key."""
+        if key in self._fingerprints:
+            return
+        self._fingerprints[key] = fingerprint
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            bucket.setdefault(value, []).append(key)
+    
+    def within(self, fingerprint: int) -> List[Tuple[K, int]]:
+        """Return every indexed key within max_distance and its distance, closest first."""
+        matches = []
+        seen = set()
+        
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            for key in bucket.get(value, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                distance = hamming_distance(fingerprint, self._fingerprints[key])
+                if distance <= self.max_distance:
+                    matches.append((key, distance))
+        
+        matches.sort(key=lambda match: match[1])
+        return matches
+    
+    def nearest(self, fingerprint: int) -> Optional[Tuple[K, int]]:
+        """Return the closest indexed key within max_distance and its distance, if any."""
+        matches = self.within(fingerprint)
+        return matches[0] if matches else None
+    
+    def remove(self, key: K):
+        """Remove a key from the index, if present."""
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            keys = bucket[value]
+            keys.remove(key)
+            if not keys:
+                del bucket[value]
+    
+    def clear(self):
+        """Remove every entry."""
+        for bucket in self._buckets:
+            bucket.clear()
+        self._fingerprints.clear()
+    
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+class VideoFingerprintIndex:
+    """Collapse reposts of the same TikTok video into one canonical record.
+    
+    A video is fingerprinted from its normalized description and hashtags,
+    plus its duration when known. Identical fingerprints are found with a
+    dict lookup and near-identical ones through a SimHashIndex; videos with
+    too little text to fingerprint only collapse with exact copies from the
+    same author. The canonical record keeps the first URL seen and adds up
+    the views of every repost. Past max_entries URLs the oldest are evicted
+    first.
+    """
+    
+    def __init__(self, max_distance: int = 3, min_words: int = 3, max_entries: int = 50000):
+        """Initialize an empty index."""
+        self.min_words = min_words
+        self.max_entries = max_entries
+        self._near = SimHashIndex(max_distance)
+        self._exact: Dict[str, Dict[str, Any]] = {}
+        self._by_url: Dict[str, Dict[str, Any]] = {}
+        # Exact key each URL added to _exact, so eviction can remove it
+        self._exact_keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+    
+    def _text(self, video: Dict[str, Any]) -> str:
+        hashtags = ' '.join(sorted(tag.lstrip('#').lower() for tag in video.get('hashtags') or []))
+        return f"{video.get('description') or video.get('title', '')} {hashtags}"
+    
+    @staticmethod
+    def _durations_match(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        if a.get('duration') and b.get('duration'):
+            return abs(a['duration'] - b['duration']) <= 1
+        return True
+    
+    def add(self, video: Dict[str, Any]) -> Dict[str, Any]:
+        """Index a video and return a copy of its canonical record (the video itself if it's new)."""
+        with self._lock:
+            return self._copy(self._add(video))
+    
+    @staticmethod
+    def _copy(canonical: Dict[str, Any]) -> Dict[str, Any]:
+        # Canonical records keep changing under the lock; callers get a snapshot
+        return dict(canonical, repost_urls=list(canonical['repost_urls']))
+    
+    def _add(self, video: Dict[str, Any]) -> Dict[str, Any]:
+        """Index a video and return its live canonical record (call with the lock held)."""
+        url = video['url']
+        if url in self._by_url:
+            return self._by_url[url]
+        
+        while self._by_url and len(self._by_url) >= self.max_entries:
+            self._evict_oldest()
+        
+        words = [w for w in WORD_PATTERN.findall(self._text(video).lower()) if w not in STOPWORDS]
+        fuzzy = len(words) >= self.min_words
+        # Short texts ("#fyp") say nothing, so only the same author's exact copy matches
+        exact_key = ' '.join(words) + f"|{video.get('duration') or ''}" + ('' if fuzzy else f"|{video.get('author', '')}")
+        
+        canonical = self._exact.get(exact_key)
+        fingerprint = simhash(' '.join(words)) if fuzzy else None
+        
+        if canonical is None and fuzzy:
+            # The closest fingerprint may be a different cut of the same clip;
+            # take the closest one whose duration also matches
+            for key, _ in self._near.within(fingerprint):
+                if self._durations_match(self._by_url[key], video):
+                    canonical = self._by_url[key]
+                    break
+        
+        if canonical is None:
+            canonical = dict(video, total_views=video.get('views', 0), repost_urls=[])
+            if fuzzy:
+                self._near.add(url, fingerprint)
+        else:
+            canonical['total_views'] += video.get('views', 0)
+            canonical['repost_urls'].append(url)
+        
+        if exact_key not in self._exact:
+            self._exact[exact_key] = canonical
+            self._exact_keys[url] = exact_key
+        self._by_url[url] = canonical
+        return canonical
+    
+    def _evict_oldest(self):
+        # Dicts keep insertion order, so the first URL is the oldest. Evicting a
+        # canonical video also evicts its reposts, so nothing merges into it later
+        canonical = self._by_url[next(iter(self._by_url))]
+        for url in [canonical['url']] + canonical['repost_urls']:
+            if self._by_url.get(url) is not canonical:
+                continue
+            del self._by_url[url]
+            self._near.remove(url)
+            exact_key = self._exact_keys.pop(url, None)
+            if exact_key is not None:
+                del self._exact[exact_key]
+    
+    def collapse(self, videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Index videos and return one entry per canonical video, with aggregated views."""
+        with self._lock:
+            collapsed = {}
+            for video in videos:
+                canonical = self._add(video)
+                collapsed.setdefault(canonical['url'], canonical)
+            
+            return [
+                dict(self._copy(canonical), views=canonical['total_views'], reposts=len(canonical['repost_urls']))
+                for canonical in collapsed.values()
+            ]
@@ -10,29 +10,36 @@ import os
 import sys
 import time
 import logging
-import schedule
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set, Optional
 from dotenv import load_dotenv
 import json
 
-# Import our custom modules
-from reddit_scanner import RedditScanner
-from tiktok_scraper import TikTokScraper
-from product_finder_sheets import ProductFinderSheets
-from main import GoogleSheetsToTelegram  # Import existing Telegram functionality
+# Import our custom modules (components are imported lazily, on first use)
+from scan_scheduler import JobScheduler, YieldTracker, CycleGoal
+from scan_checkpoint import ScanCheckpoint
+from component_health import ComponentHealthCache, check_components_offline
+from scrape_guard import ScrapeBlockedError
+from work_queue import open_work_queue
+from tracked_posts import TrackedPostStore
+from near_duplicates import SimHashIndex, VideoFingerprintIndex, simhash
+from content_index import ContentIndex
+from analytics_export import AnalyticsExporter, build_report
+from search_budget import BudgetBandit
+from metrics_store import MetricsStore, DAY
+from reddit_scanner import QUERY_TEMPLATES, MAX_LISTING_LIMIT
+from logging_setup import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('product_finder_bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging (handlers are installed by setup_logging() in main)
 logger = logging.getLogger(__name__)
 
+# Rolling metrics shown as trends by `stats`
+TREND_COUNTERS = ['scans', 'problems_found', 'matches_found', 'matches_added', 'errors']
+API_TIMINGS = ['reddit_fetch_seconds', 'tiktok_search_seconds', 'sheet_write_seconds', 'telegram_send_seconds']
+
 class ProductFinderBot:
     def __init__(self):
         """Initialize the ProductFinderBot."""
@@ -44,38 +51,43 @@ class ProductFinderBot:
         self.max_matches_per_problem = int(os.getenv('MAX_MATCHES_PER_PROBLEM', '3'))
         self.min_reddit_score = int(os.getenv('MIN_REDDIT_SCORE', '5'))
         self.enable_telegram = os.getenv('ENABLE_TELEGRAM', 'true').lower() == 'true'
+        self.max_notifications_per_flush = int(os.getenv('MAX_NOTIFICATIONS_PER_FLUSH', '5'))
         
-        # Initialize components
-        try:
-            self.reddit_scanner = RedditScanner()
-            logger.info("Reddit scanner initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize Reddit scanner: {e}")
-            self.reddit_scanner = None
+        # Scheduler cadences (seconds)
+        self.subreddit_refresh_check_seconds = int(os.getenv('SUBREDDIT_REFRESH_CHECK_SECONDS', '300'))
+        self.tiktok_search_interval_seconds = int(os.getenv('TIKTOK_SEARCH_INTERVAL_SECONDS', '60'))
+        self.tiktok_search_batch_size = int(os.getenv('TIKTOK_SEARCH_BATCH_SIZE', '5'))
+        # Search rounds that may overlap; each takes its own batch of problems. The
+        # other jobs always run one at a time: overlapping refreshes or flushes
+        # would scan the same subreddits or write the same matches twice
+        self.tiktok_search_concurrency = int(os.getenv('TIKTOK_SEARCH_CONCURRENCY', '1'))
+        self.sheet_flush_interval_seconds = int(os.getenv('SHEET_FLUSH_INTERVAL_SECONDS', '120'))
+        self.telegram_drain_interval_seconds = int(os.getenv('TELEGRAM_DRAIN_INTERVAL_SECONDS', '15'))
+        self.enable_sheet_relay = os.getenv('ENABLE_SHEET_RELAY', 'false').lower() == 'true'
+        self.sheet_relay_interval_seconds = int(os.getenv('SHEET_RELAY_INTERVAL_SECONDS', '300'))
+        self.query_result_ttl_seconds = int(os.getenv('QUERY_RESULT_TTL_MINUTES', '60')) * 60
+        self.score_refresh_interval_seconds = int(os.getenv('REDDIT_SCORE_REFRESH_MINUTES', '60')) * 60
         
-        try:
-            self.tiktok_scraper = TikTokScraper()
-            logger.info("TikTok scraper initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize TikTok scraper: {e}")
-            self.tiktok_scraper = None
+        # Stopping rules for scan_and_match cycles (0 disables a rule)
+        self.scan_target_new_matches = int(os.getenv('SCAN_TARGET_NEW_MATCHES', '0'))
+        self.scan_category_quota = int(os.getenv('SCAN_CATEGORY_QUOTA', '0'))
+        self.scan_time_budget_seconds = float(os.getenv('SCAN_TIME_BUDGET_MINUTES', '0')) * 60
+        self.scan_browser_budget_seconds = float(os.getenv('SCAN_BROWSER_BUDGET_MINUTES', '0')) * 60
         
-        try:
-            self.sheets_client = ProductFinderSheets()
-            logger.info("Google Sheets client initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize Google Sheets client: {e}")
-            self.sheets_client = None
+        # Shared work queue for `enqueue` / `worker` mode
+        self.work_queue_url = os.getenv('WORK_QUEUE_URL', 'sqlite:///work_queue.db')
+        self.work_queue_visibility_seconds = int(os.getenv('WORK_QUEUE_VISIBILITY_SECONDS', '600'))
+        self.work_queue_max_attempts = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', '5'))
+        self.work_queue_poll_seconds = float(os.getenv('WORK_QUEUE_POLL_SECONDS', '5'))
         
-        if self.enable_telegram:
-            try:
-                self.telegram_client = GoogleSheetsToTelegram()
-                logger.info("Telegram client initialized")
-            except Exception as e:
-                logger.error(f"Failed to initialize Telegram client: {e}")
-                self.telegram_client = None
-        else:
-            self.telegram_client = None
+        # Components are created on first use, so lightweight commands only
+        # pay for what they touch
+        self._components: Dict[str, Any] = {}
+        self._component_lock = threading.RLock()
+        self.health_cache = ComponentHealthCache(
+            os.getenv('COMPONENT_HEALTH_FILE', 'component_health.json'),
+            float(os.getenv('COMPONENT_HEALTH_TTL_MINUTES', '30'))
+        )
         
         # Statistics
         self.stats = {
@@ -84,11 +96,694 @@ class ProductFinderBot:
             'total_matches_found': 0,
             'total_matches_added': 0,
             'last_scan_time': None,
-            'errors': []
+            'errors': deque(maxlen=int(os.getenv('ERROR_HISTORY_SIZE', '50')))
         }
         
+        # Rolling counts and timings at minute, hour and day resolution, kept across restarts
+        self.metrics = MetricsStore(os.getenv('METRICS_FILE', 'metrics.json'))
+        
+        # Work queues shared by the scheduled jobs
+        self._queue_lock = threading.Lock()
+        self.pending_problems: List[Dict[str, Any]] = []
+        self.pending_matches: List[Dict[str, Any]] = []
+        self.pending_notifications = deque()
+        self._in_flight_problems: List[Dict[str, Any]] = []
+        # Reddit URL -> when it was queued. Entries expire after one base refresh
+        # interval, so a long-running process doesn't remember every post forever
+        self._seen_problem_urls: Dict[str, float] = {}
+        
+        # TikTok results per search query, reused by problems that share a query
+        self._completed_queries: Dict[str, Dict[str, Any]] = {}
+        self._cycle_problems_found = 0
+        self._cycle_goal: Optional[CycleGoal] = None
+        
+        # Scan state is checkpointed to disk so restarts resume instead of redoing work;
+        # the lock keeps concurrent checkpoints from landing out of order
+        self._checkpoint_lock = threading.Lock()
+        self.checkpoint = ScanCheckpoint(
+            os.getenv('SCAN_CHECKPOINT_FILE', 'scan_checkpoint.json'),
+            float(os.getenv('SCAN_CHECKPOINT_MAX_AGE_HOURS', '24'))
+        )
+        
+        # Yield tracking drives how often subreddits are refreshed and which
+        # categories are searched first
+        self.subreddit_yield = YieldTracker()
+        self.category_yield = YieldTracker()
+        self._subreddit_last_refresh: Dict[str, float] = {}
+        self._subreddit_categories: Dict[str, Set[str]] = {}
+        
+        # Near-duplicate problems (crossposts, reposts) ride along with the first
+        # one queued instead of getting their own TikTok search
+        max_distance = int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', '3'))
+        self._problem_index = SimHashIndex(max_distance) if max_distance >= 0 else None
+        self._problem_reps: Dict[str, Dict[str, Any]] = {}
+        # Representatives kept for folding; the oldest are forgotten first
+        self.max_problem_reps = int(os.getenv('NEAR_DUPLICATE_MAX_PROBLEMS', '10000'))
+        
+        # Reposts of one TikTok video by different accounts collapse into the
+        # first one seen, so the sheet and Telegram get a single entry
+        max_distance = int(os.getenv('VIDEO_DUPLICATE_MAX_DISTANCE', '3'))
+        self.video_index = VideoFingerprintIndex(max_distance) if max_distance >= 0 else None
+        
+        # Reddit posts with matches in the sheet, whose scores are refreshed in bulk
+        self.tracked_posts = TrackedPostStore(
+            os.getenv('TRACKED_POSTS_FILE', 'tracked_posts.json'),
+            float(os.getenv('TRACKED_POSTS_MAX_AGE_DAYS', '30'))
+        )
+        
+        # Sheet matches per API call and per browser-minute of each subreddit,
+        # category and query template decide where each scan's budget goes
+        # 0 (the default) keeps the full 100 posts per target subreddit
+        self.reddit_posts_per_scan = int(os.getenv('REDDIT_POSTS_PER_SCAN', '0'))
+        self.min_posts_per_subreddit = int(os.getenv('REDDIT_MIN_POSTS_PER_SUBREDDIT', '25'))
+        self.budget = None
+        if os.getenv('ENABLE_SEARCH_BUDGET', 'true').lower() == 'true':
+            self.budget = BudgetBandit(
+                os.getenv('SEARCH_BUDGET_FILE', 'search_budget.json'),
+                float(os.getenv('SEARCH_BUDGET_DISCOUNT', '0.98'))
+            )
+        
+        # Hashtags and product terms of every video found, for trend queries
+        self.content_index = None
+        if os.getenv('ENABLE_CONTENT_INDEX', 'true').lower() == 'true':
+            self.content_index = ContentIndex(os.getenv('CONTENT_INDEX_FILE', 'content_index.db'))
+        
+        # Matches, scanned posts and video snapshots, as date-partitioned Parquet for reporting
+        self.analytics_dir = os.getenv('ANALYTICS_DIR', 'analytics')
+        self.analytics_flush_interval_seconds = float(os.getenv('ANALYTICS_FLUSH_MINUTES', '30')) * 60
+        self.analytics = None
+        if os.getenv('ENABLE_ANALYTICS_EXPORT', 'true').lower() == 'true':
+            self.analytics = AnalyticsExporter(self.analytics_dir)
+        
+        self.scheduler = None
+        
         logger.info("ProductFinderBot initialized successfully")
     
+    def _get_component(self, key: str, label: str, factory):
+        """Create a component on first access; failures are cached as None."""
+        with self._component_lock:
+            if key not in self._components:
+                try:
+                    self._components[key] = factory()
+                    logger.info(f"{label} initialized")
+                except Exception as e:
+                    logger.error(f"Failed to initialize {label}: {e}")
+                    self._components[key] = None
+            
+            return self._components[key]
+    
+    @staticmethod
+    def _create_reddit_scanner():
+        from reddit_scanner import RedditScanner
+        return RedditScanner()
+    
+    @staticmethod
+    def _create_tiktok_scraper():
+        from tiktok_scraper import TikTokScraper
+        return TikTokScraper()
+    
+    @staticmethod
+    def _create_sheets_client():
+        from product_finder_sheets import ProductFinderSheets
+        return ProductFinderSheets()
+    
+    @staticmethod
+    def _create_telegram_client():
+        from main import GoogleSheetsToTelegram  # Import existing Telegram functionality
+        return GoogleSheetsToTelegram()
+    
+    def _create_work_queue(self):
+        return open_work_queue(self.work_queue_url, self.work_queue_max_attempts)
+    
+    @property
+    def reddit_scanner(self):
+        """Reddit scanner, created on first use."""
+        return self._get_component('reddit', 'Reddit scanner', self._create_reddit_scanner)
+    
+    @property
+    def tiktok_scraper(self):
+        """TikTok scraper, created on first use."""
+        return self._get_component('tiktok', 'TikTok scraper', self._create_tiktok_scraper)
+    
+    @property
+    def sheets_client(self):
+        """Google Sheets client, created on first use."""
+        return self._get_component('sheets', 'Google Sheets client', self._create_sheets_client)
+    
+    @property
+    def telegram_client(self):
+        """Telegram client, created on first use when Telegram is enabled."""
+        if not self.enable_telegram:
+            return None
+        return self._get_component('telegram', 'Telegram client', self._create_telegram_client)
+    
+    @property
+    def work_queue(self):
+        """Work queue shared with other worker processes, opened on first use."""
+        return self._get_component('work_queue', 'Work queue', self._create_work_queue)
+    
+    def _enqueue_problems(self, problems: List[Dict[str, Any]]) -> int:
+        """Queue qualifying problems for TikTok search, skipping ones already seen."""
+        added = 0
+        folded = 0
+        now = time.time()
+        with self._queue_lock:
+            self._expire_seen_problems(now)
+            for problem in problems:
+                if problem.get('score', 0) < self.min_reddit_score:
+                    continue
+                if problem['reddit_url'] in self._seen_problem_urls:
+                    continue
+                
+                self._seen_problem_urls[problem['reddit_url']] = now
+                self._subreddit_categories.setdefault(problem['subreddit'], set()).add(problem['category'])
+                self._assign_query_template(problem)
+                added += 1
+                
+                if self._fold_duplicate(problem):
+                    folded += 1
+                else:
+                    self.pending_problems.append(problem)
+        
+        if folded:
+            logger.info(f"Folded {folded} near-duplicate problems into queued ones")
+        
+        return added
+    
+    def _expire_seen_problems(self, now: float):
+        """Forget problems queued more than one base refresh interval ago (call with the queue lock held)."""
+        cutoff = now - self.scan_interval_hours * 3600
+        for url in [url for url, seen_at in self._seen_problem_urls.items() if seen_at < cutoff]:
+            del self._seen_problem_urls[url]
+    
+    @staticmethod
+    def _problem_text(problem: Dict[str, Any]) -> str:
+        return f"{problem['reddit_title']} {problem.get('reddit_content', '')}"
+    
+    def _index_problem(self, problem: Dict[str, Any]):
+        """Make a problem the representative for later near-duplicates of it."""
+        self._problem_reps[problem['reddit_url']] = problem
+        self._problem_index.add(problem['reddit_url'], simhash(self._problem_text(problem)))
+        
+        # Dicts keep insertion order, so the first representative is the oldest
+        while len(self._problem_reps) > self.max_problem_reps:
+            oldest = next(iter(self._problem_reps))
+            del self._problem_reps[oldest]
+            self._problem_index.remove(oldest)
+    
+    def _fold_duplicate(self, problem: Dict[str, Any]) -> bool:
+        """Attach a near-duplicate to its queued representative (call with the queue lock held).
+        
+        Returns True if the problem needs no queue entry of its own. A duplicate
+        of a problem that is already being searched or done is queued with the
+        representative's query, so its search is answered from the query cache.
+        """
+        if self._problem_index is None:
+            return False
+        
+        nearest = self._problem_index.nearest(simhash(self._problem_text(problem)))
+        if nearest is None:
+            self._index_problem(problem)
+            return False
+        
+        representative = self._problem_reps[nearest[0]]
+        problem['search_query'] = representative['search_query']
+        problem['query_template'] = representative.get('query_template', 'keywords')
+        
+        if any(p is representative for p in self.pending_problems):
+            representative.setdefault('duplicates', []).append(problem)
+            return True
+        
+        return False
+    
+    def _assign_query_template(self, problem: Dict[str, Any]):
+        """Rewrite a problem's search query with the template the budget picks for it."""
+        if self.budget is None:
+            return
+        
+        template = self.budget.choose([f"template:{t}" for t in QUERY_TEMPLATES]).split(':', 1)[1]
+        problem['query_template'] = template
+        problem['search_query'] = self.reddit_scanner._generate_search_query(
+            problem['reddit_title'], problem.get('reddit_content', ''), template, problem['category']
+        )
+    
+    def _plan_post_limits(self, subreddits: List[str]) -> Optional[Dict[str, int]]:
+        """Posts to fetch per subreddit, from the budget's share of REDDIT_POSTS_PER_SCAN.
+        
+        Subreddits given no posts are skipped this time. Each fetched subreddit
+        is charged one API call.
+        """
+        if self.budget is None:
+            return None
+        
+        targets = max(1, len(self.reddit_scanner.target_subreddits))
+        per_scan = self.reddit_posts_per_scan or targets * MAX_LISTING_LIMIT
+        total = per_scan * len(subreddits) // targets
+        allocation = self.budget.allocate(
+            [f"subreddit:{s}" for s in subreddits], total,
+            minimum=self.min_posts_per_subreddit, maximum=MAX_LISTING_LIMIT
+        )
+        
+        # Templates are chosen per problem, so this round's discount is applied here
+        self.budget.decay([f"template:{t}" for t in QUERY_TEMPLATES])
+        
+        limits = {s: allocation[f"subreddit:{s}"] for s in subreddits}
+        for subreddit, limit in limits.items():
+            if limit:
+                self.budget.record_cost(f"subreddit:{subreddit}")
+        
+        logger.info(f"Fetching posts from {sum(1 for limit in limits.values() if limit)}/{len(subreddits)} "
+                    f"subreddits within the budget")
+        return limits
+    
+    def _select_problems(self, problems: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Pick the problems to search, with each category's share of the limit set by the budget."""
+        problems = sorted(problems, key=lambda p: p.get('score', 0), reverse=True)
+        if self.budget is None:
+            return problems[:limit]
+        
+        categories = sorted({p['category'] for p in problems})
+        quotas = self.budget.allocate([f"category:{c}" for c in categories], limit)
+        
+        selected = []
+        rest = []
+        for problem in problems:
+            arm = f"category:{problem['category']}"
+            if quotas.get(arm, 0) > 0:
+                quotas[arm] -= 1
+                selected.append(problem)
+            else:
+                rest.append(problem)
+        
+        # Quotas left unused by categories with few problems go to the best-scored rest
+        return selected + rest[:max(0, limit - len(selected))]
+    
+    def _record_search_cost(self, problem: Dict[str, Any], minutes: float):
+        """Charge browser time spent on a live search to the cycle goal and the budget arms."""
+        self.metrics.record('tiktok_search_seconds', minutes * 60)
+        goal = self._cycle_goal
+        if goal is not None:
+            goal.record_browser_time(minutes * 60)
+        
+        if self.budget is None:
+            return
+        self.budget.record_cost(f"category:{problem['category']}", minutes)
+        self.budget.record_cost(f"template:{problem.get('query_template', 'keywords')}", minutes)
+    
+    def _export(self, dataset: str, rows: List[Dict[str, Any]], *args):
+        """Buffer rows for the analytics export; export problems never interrupt a scan."""
+        if self.analytics is None or not rows:
+            return
+        
+        record = {'matches': self.analytics.record_matches, 'posts': self.analytics.record_posts,
+                  'videos': self.analytics.record_videos}[dataset]
+        try:
+            record(rows, *args)
+        except Exception as e:
+            logger.warning(f"Failed to export {dataset} for analytics: {e}")
+    
+    def flush_analytics(self) -> int:
+        """Write buffered analytics rows to Parquet."""
+        if self.analytics is None:
+            return 0
+        return self.analytics.flush()
+    
+    def _record_added_matches(self, matches: List[Dict[str, Any]]):
+        """Credit matches newly written to the sheet to the arms that produced them, and export them."""
+        self._export('matches', matches)
+        if self.budget is None or not matches:
+            return
+        
+        for match in matches:
+            self.budget.record_reward(f"subreddit:{match['reddit_subreddit']}")
+            self.budget.record_reward(f"category:{match['category']}")
+            self.budget.record_reward(f"template:{match.get('query_template', 'keywords')}")
+        self._save_budget()
+    
+    def _save_budget(self):
+        """Write the search budget's observations to disk."""
+        if self.budget is None:
+            return
+        try:
+            self.budget.save()
+        except OSError as e:
+            logger.warning(f"Failed to save search budget: {e}")
+    
+    def _subreddit_interval(self, subreddit: str) -> float:
+        """Refresh interval for a subreddit, shortened for high-yield subreddits and categories."""
+        hotness = self.subreddit_yield.hotness(subreddit)
+        for category in self._subreddit_categories.get(subreddit, ()):
+            hotness = max(hotness, self.category_yield.hotness(category))
+        
+        return self.subreddit_yield.interval_for(subreddit, self.scan_interval_hours * 3600, hotness)
+    
+    def refresh_subreddits(self, force: bool = False) -> int:
+        """Scan the subreddits that are due for a refresh and queue new problems."""
+        if not self.reddit_scanner:
+            raise Exception("Reddit scanner not available")
+        
+        now = time.time()
+        due = [
+            subreddit for subreddit in self.reddit_scanner.target_subreddits
+            if force or now - self._subreddit_last_refresh.get(subreddit, 0) >= self._subreddit_interval(subreddit)
+        ]
+        
+        if not due:
+            return 0
+        
+        logger.info(f"📡 Refreshing {len(due)} subreddits...")
+        self._count('scans')
+        queued = 0
+        post_limits = self._plan_post_limits(due)
+        
+        for subreddit in due:
+            limit = post_limits[subreddit] if post_limits else MAX_LISTING_LIMIT
+            # A subreddit outside this round's budget waits for its next refresh
+            started = time.time()
+            posts = self.reddit_scanner.scan_subreddit(subreddit, limit=limit) if limit else []
+            self._subreddit_last_refresh[subreddit] = time.time()
+            if limit:
+                self.metrics.record('reddit_fetch_seconds', time.time() - started)
+            
+            problems = [self.reddit_scanner.post_to_problem(post) for post in posts]
+            self._export('posts', problems)
+            queued += self._enqueue_problems(problems)
+            self.save_checkpoint()
+        
+        logger.info(f"Queued {queued} new problems from {len(due)} subreddits")
+        return queued
+    
+    def _next_problems(self, limit: int) -> List[Dict[str, Any]]:
+        """Pop the next problems to search, hottest categories and highest scores first."""
+        with self._queue_lock:
+            self.pending_problems.sort(
+                key=lambda p: (self.category_yield.hotness(p['category']), p.get('score', 0)),
+                reverse=True
+            )
+            batch = self.pending_problems[:limit]
+            del self.pending_problems[:limit]
+            self._in_flight_problems.extend(batch)
+        
+        return batch
+    
+    def _finish_problem(self, problem: Dict[str, Any]):
+        """Drop a problem from the in-flight list once it has been searched."""
+        with self._queue_lock:
+            self._in_flight_problems = [
+                p for p in self._in_flight_problems if p['reddit_url'] != problem['reddit_url']
+            ]
+    
+    def _requeue_problems(self, problems: List[Dict[str, Any]]):
+        """Put in-flight problems back at the front of the queue to retry later."""
+        urls = {p['reddit_url'] for p in problems}
+        with self._queue_lock:
+            self._in_flight_problems = [
+                p for p in self._in_flight_problems if p['reddit_url'] not in urls
+            ]
+            self.pending_problems[:0] = problems
+    
+    def _build_match(self, problem: Dict[str, Any], video: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a match record from a Reddit problem and a TikTok video."""
+        return {
+            'reddit_title': problem['reddit_title'],
+            'reddit_url': problem['reddit_url'],
+            'reddit_category': problem['category'],
+            'reddit_subreddit': problem['subreddit'],
+            'reddit_score': problem['score'],
+            'reddit_comments': problem.get('num_comments', 0),
+            'tiktok_title': video['title'],
+            'tiktok_url': video['url'],
+            'tiktok_views': video['views'],
+            'tiktok_author': video['author'],
+            'description': video['description'],
+            'category': problem['category'],
+            'source': 'Reddit + TikTok',
+            'match_score': self.tiktok_scraper._calculate_match_score(problem, video),
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'search_query': problem['search_query'],
+            'query_template': problem.get('query_template', 'keywords')
+        }
+    
+    def _search_query(self, query: str) -> List[Dict[str, Any]]:
+        """Search TikTok for a query, reusing recent results for the same query."""
+        now = time.time()
+        if self._has_fresh_results(query):
+            logger.info(f"Reusing completed search for query: {query}")
+            with self._queue_lock:
+                return self._completed_queries[query]['videos']
+        
+        videos = self.tiktok_scraper.search_tiktok(query)
+        
+        with self._queue_lock:
+            self._completed_queries[query] = {'videos': videos, 'time': now}
+            # Expired queries are not worth keeping in the checkpoint
+            for expired in [q for q, entry in self._completed_queries.items()
+                            if now - entry['time'] >= self.query_result_ttl_seconds]:
+                del self._completed_queries[expired]
+        
+        return videos
+    
+    def _has_fresh_results(self, query: str) -> bool:
+        """Check if a query was searched recently enough to reuse its results."""
+        with self._queue_lock:
+            cached = self._completed_queries.get(query)
+        return bool(cached) and time.time() - cached['time'] < self.query_result_ttl_seconds
+    
+    def _prefetch_queries(self, problems: List[Dict[str, Any]]):
+        """Search a batch's distinct queries concurrently as tabs of one browser."""
+        queries = [q for q in dict.fromkeys(p['search_query'] for p in problems)
+                   if not self._has_fresh_results(q)]
+        if len(queries) <= 1:
+            return
+        
+        started = time.time()
+        results = self.tiktok_scraper.search_many(queries)
+        now = time.time()
+        with self._queue_lock:
+            for query, videos in results.items():
+                self._completed_queries[query] = {'videos': videos, 'time': now}
+        
+        # The tabs share the browser's time evenly
+        minutes = (now - started) / 60 / len(queries)
+        for query in results:
+            self._record_search_cost(next(p for p in problems if p['search_query'] == query), minutes)
+        self.save_checkpoint()
+    
+    def _search_problem(self, problem: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Search TikTok for a single problem and return its match records.
+        
+        The results are also attributed to any near-duplicates folded into it.
+        """
+        live = not self._has_fresh_results(problem['search_query'])
+        started = time.time()
+        videos = self._search_query(problem['search_query'])
+        if live:
+            self._record_search_cost(problem, (time.time() - started) / 60)
+            self._export('videos', videos, problem['search_query'], problem['category'])
+        
+        if self.content_index is not None and videos:
+            categories = {member['category'] for member in [problem] + problem.get('duplicates', [])}
+            try:
+                for category in categories:
+                    self.content_index.add_videos(videos, category)
+            except Exception as e:
+                logger.warning(f"Failed to index videos for '{problem['search_query']}': {e}")
+        
+        # One entry per video, with views summed over its reposts
+        if self.video_index is not None:
+            videos = self.video_index.collapse(videos)
+        
+        # Limit matches per problem
+        videos = videos[:self.max_matches_per_problem]
+        matches = []
+        
+        for member in [problem] + problem.get('duplicates', []):
+            matches.extend(self._build_match(member, video) for video in videos)
+            self.subreddit_yield.record(member['subreddit'], len(videos))
+            self.category_yield.record(member['category'], len(videos))
+        
+        return matches
+    
+    def _process_problem(self, problem: Dict[str, Any], position: int, total: int,
+                         results: Dict[str, Any]):
+        """Search one queued problem and queue its matches, requeueing it if TikTok blocks.
+        
+        During a cycle with stopping rules, problems are skipped once the goal
+        is met or their category is full, and only new matches within quota
+        are queued.
+        """
+        goal = self._cycle_goal
+        if goal is not None and (goal.reason() or goal.category_full(problem['category'])):
+            self._finish_problem(problem)
+            with self._queue_lock:
+                results['skipped'] += 1
+            return
+        
+        try:
+            logger.info(f"Processing problem {position}/{total}: {problem['reddit_title'][:50]}...")
+            
+            searched = not self._has_fresh_results(problem['search_query'])
+            matches = self._search_problem(problem)
+            if goal is not None:
+                matches = goal.admit(matches)
+            with self._queue_lock:
+                self.pending_matches.extend(matches)
+                results['problems_searched'] += 1
+                results['matches_found'] += len(matches)
+            self._finish_problem(problem)
+            self.save_checkpoint()
+            
+            # Small delay between live searches
+            if searched and position < total:
+                time.sleep(2)
+        
+        except ScrapeBlockedError:
+            # Not the problem's fault: keep it for a later search
+            self._requeue_problems([problem])
+            with self._queue_lock:
+                results['blocked'] += 1
+        
+        except Exception as e:
+            error_msg = f"Error processing problem {position}: {e}"
+            logger.error(error_msg)
+            with self._queue_lock:
+                results['errors'].append(error_msg)
+            self._finish_problem(problem)
+    
+    def search_pending_problems(self, limit: int = None) -> Dict[str, Any]:
+        """Search TikTok for queued problems and queue the resulting matches."""
+        results = {'problems_searched': 0, 'matches_found': 0, 'blocked': 0, 'skipped': 0, 'errors': []}
+        
+        if not self.tiktok_scraper:
+            raise Exception("TikTok scraper not available")
+        
+        guard = self.tiktok_scraper.guard
+        if guard.is_open():
+            logger.info(f"TikTok searches paused for {guard.breaker.seconds_until_retry():.0f}s after repeated blocks")
+            return results
+        
+        with self._queue_lock:
+            available = len(self.pending_problems)
+        problems = self._next_problems(available if limit is None else limit)
+        
+        if not problems:
+            return results
+        
+        logger.info("🎵 Searching TikTok for product matches...")
+        
+        if self.tiktok_scraper.tabs_per_browser > 1:
+            try:
+                self._prefetch_queries(problems)
+            except Exception as e:
+                logger.error(f"Multi-tab search failed, searching one by one: {e}")
+        
+        # Single-browser searches run in parallel up to the guard's limit,
+        # which adapts to how TikTok responds
+        workers = 1 if self.tiktok_scraper.tabs_per_browser > 1 else guard.controller.max_limit
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i, problem in enumerate(problems, 1):
+                executor.submit(self._process_problem, problem, i, len(problems), results)
+        
+        if results['blocked']:
+            logger.warning(f"Requeued {results['blocked']} problems blocked by TikTok")
+        
+        return results
+    
+    def flush_matches(self) -> int:
+        """Write queued matches to Google Sheets and queue notifications for them."""
+        # Matches stay queued (and checkpointed) until the write succeeds
+        with self._queue_lock:
+            matches = list(self.pending_matches)
+        
+        if not matches:
+            return 0
+        
+        if not self.sheets_client:
+            logger.warning("Google Sheets client not available, skipping save")
+            return 0
+        
+        logger.info("📊 Saving matches to Google Sheets...")
+        
+        # Add only unique matches; a failed read or write raises and leaves them all queued
+        started = time.time()
+        unique_matches = self.sheets_client.filter_unique_matches(matches)
+        added_count = self.sheets_client.add_product_matches(unique_matches) if unique_matches else 0
+        self.metrics.record('sheet_write_seconds', time.time() - started)
+        
+        logger.info(f"Added {added_count} unique matches to Google Sheets")
+        if added_count:
+            self._record_added_matches(unique_matches)
+        
+        with self._queue_lock:
+            del self.pending_matches[:len(matches)]
+            if added_count > 0 and self.telegram_client:
+                self.pending_notifications.extend(matches[:self.max_notifications_per_flush])
+        self.save_checkpoint()
+        self._track_posts(matches)
+        
+        return added_count
+    
+    def _track_posts(self, matches: List[Dict[str, Any]]):
+        """Track the Reddit posts of flushed matches for score refreshes."""
+        try:
+            if self.tracked_posts.track(matches, self.sheets_client.current_worksheet_title()):
+                self.tracked_posts.save()
+        except OSError as e:
+            logger.warning(f"Failed to save tracked posts: {e}")
+    
+    def refresh_reddit_scores(self) -> int:
+        """Re-query tracked posts by fullname and write changed scores to the sheet.
+        
+        Posts are looked up 100 per request, so thousands of tracked posts take
+        a handful of requests, and all changes go to the sheet in one write.
+        """
+        if not self.reddit_scanner:
+            raise Exception("Reddit scanner not available")
+        
+        fullnames = self.tracked_posts.fullnames()
+        if not fullnames:
+            return 0
+        
+        engagement = self.reddit_scanner.fetch_engagement(fullnames)
+        changed = self.tracked_posts.apply(engagement)
+        self.tracked_posts.save()
+        
+        logger.info(f"Refreshed {len(engagement)} tracked Reddit posts, {len(changed)} changed")
+        
+        if changed and self.sheets_client:
+            self.sheets_client.update_reddit_engagement(changed)
+        
+        return len(changed)
+    
+    def drain_notifications(self) -> int:
+        """Send queued Telegram notifications."""
+        if not self.telegram_client:
+            return 0
+        
+        sent = 0
+        while True:
+            with self._queue_lock:
+                if not self.pending_notifications:
+                    break
+                match = self.pending_notifications.popleft()
+            
+            message = self._format_telegram_message(match)
+            started = time.time()
+            self.telegram_client._send_telegram_message(message)
+            self.metrics.record('telegram_send_seconds', time.time() - started)
+            sent += 1
+            self.save_checkpoint()
+            
+            with self._queue_lock:
+                more = bool(self.pending_notifications)
+            if more:
+                time.sleep(1)  # Avoid rate limiting
+        
+        if sent:
+            logger.info(f"Sent {sent} Telegram notifications")
+        
+        return sent
+    
     def scan_and_match(self) -> Dict[str, Any]:
         """Main workflow: scan Reddit, find TikTok matches, and log results."""
         scan_results = {
@@ -98,132 +793,245 @@ class ProductFinderBot:
             'errors': [],
             'scan_time': datetime.now().isoformat()
         }
+        started = time.time()
         
         try:
             logger.info("🚀 Starting ProductFinderBot scan...")
             
-            # Step 1: Scan Reddit for pain-related problems
-            if not self.reddit_scanner:
-                raise Exception("Reddit scanner not available")
-            
-            logger.info("📡 Scanning Reddit for pain-related problems...")
-            problems = self.reddit_scanner.get_top_problems(limit=self.max_problems_per_scan)
-            
-            # Filter problems by minimum score
-            problems = [p for p in problems if p.get('score', 0) >= self.min_reddit_score]
-            
-            scan_results['problems_found'] = len(problems)
-            logger.info(f"Found {len(problems)} qualifying problems on Reddit")
-            
-            if not problems:
-                logger.info("No problems found, ending scan")
-                return scan_results
-            
-            # Step 2: Find TikTok product matches
-            if not self.tiktok_scraper:
-                raise Exception("TikTok scraper not available")
-            
-            logger.info("🎵 Searching TikTok for product matches...")
-            all_matches = []
-            
-            for i, problem in enumerate(problems, 1):
-                try:
-                    logger.info(f"Processing problem {i}/{len(problems)}: {problem['reddit_title'][:50]}...")
-                    
-                    # Search for TikTok videos
-                    videos = self.tiktok_scraper.search_tiktok(problem['search_query'])
-                    
-                    # Limit matches per problem
-                    videos = videos[:self.max_matches_per_problem]
-                    
-                    # Create match records
-                    for video in videos:
-                        match = {
-                            'reddit_title': problem['reddit_title'],
-                            'reddit_url': problem['reddit_url'],
-                            'reddit_category': problem['category'],
-                            'reddit_subreddit': problem['subreddit'],
-                            'reddit_score': problem['score'],
-                            'tiktok_title': video['title'],
-                            'tiktok_url': video['url'],
-                            'tiktok_views': video['views'],
-                            'tiktok_author': video['author'],
-                            'description': video['description'],
-                            'category': problem['category'],
-                            'source': 'Reddit + TikTok',
-                            'match_score': self.tiktok_scraper._calculate_match_score(problem, video),
-                            'date': datetime.now().strftime('%Y-%m-%d'),
-                            'search_query': problem['search_query']
-                        }
-                        all_matches.append(match)
-                    
-                    # Small delay between searches
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    error_msg = f"Error processing problem {i}: {e}"
-                    logger.error(error_msg)
-                    scan_results['errors'].append(error_msg)
-                    continue
-            
-            scan_results['matches_found'] = len(all_matches)
-            logger.info(f"Found {len(all_matches)} total product matches")
-            
-            # Step 3: Save to Google Sheets
-            if all_matches and self.sheets_client:
-                logger.info("📊 Saving matches to Google Sheets...")
+            if self.restore_checkpoint() and self.has_pending_work():
+                # Resume the interrupted cycle instead of rescanning Reddit
+                scan_results['problems_found'] = self._cycle_problems_found
+                logger.info("♻️ Resuming interrupted scan from checkpoint")
+            else:
+                # Step 1: Scan Reddit for pain-related problems
+                if not self.reddit_scanner:
+                    raise Exception("Reddit scanner not available")
+                
+                logger.info("📡 Scanning Reddit for pain-related problems...")
+                post_limits = self._plan_post_limits(self.reddit_scanner.target_subreddits)
+                problems = self.reddit_scanner.get_top_problems(limit=None, post_limits=post_limits)
+                self._export('posts', problems)
                 
-                # Add only unique matches
-                added_count = self.sheets_client.add_unique_matches(all_matches)
-                scan_results['matches_added'] = added_count
+                # Filter problems by minimum score
+                problems = [p for p in problems if p.get('score', 0) >= self.min_reddit_score]
+                problems = self._select_problems(problems, self.max_problems_per_scan)
                 
-                logger.info(f"Added {added_count} unique matches to Google Sheets")
+                scan_results['problems_found'] = len(problems)
+                logger.info(f"Found {len(problems)} qualifying problems on Reddit")
                 
-                # Step 4: Send Telegram notifications for new matches
-                if added_count > 0 and self.telegram_client:
-                    logger.info("📱 Sending Telegram notifications...")
-                    try:
-                        # Get recent matches for notification
-                        recent_matches = all_matches[:5]  # Limit notifications
-                        
-                        for match in recent_matches:
-                            message = self._format_telegram_message(match)
-                            self.telegram_client._send_telegram_message(message)
-                            time.sleep(1)  # Avoid rate limiting
-                        
-                        logger.info(f"Sent {len(recent_matches)} Telegram notifications")
-                        
-                    except Exception as e:
-                        error_msg = f"Error sending Telegram notifications: {e}"
-                        logger.error(error_msg)
-                        scan_results['errors'].append(error_msg)
+                if not problems:
+                    logger.info("No problems found, ending scan")
+                    return scan_results
+                
+                # A fresh cycle searches its top problems even if an earlier one already did
+                with self._queue_lock:
+                    self._seen_problem_urls.clear()
+                    self._problem_reps.clear()
+                    if self._problem_index is not None:
+                        self._problem_index.clear()
+                
+                self._cycle_problems_found = len(problems)
+                self._enqueue_problems(problems)
+                self.save_checkpoint()
+            
+            # Step 2: Find TikTok product matches
+            search_results = self._search_until_goal()
+            scan_results['matches_found'] = search_results['matches_found']
+            scan_results['errors'].extend(search_results['errors'])
+            logger.info(f"Found {scan_results['matches_found']} total product matches")
+            
+            # Step 3: Save to Google Sheets (matches stay queued if the write fails)
+            try:
+                scan_results['matches_added'] = self.flush_matches()
+            except Exception as e:
+                error_msg = f"Error saving matches to Google Sheets: {e}"
+                logger.error(error_msg)
+                scan_results['errors'].append(error_msg)
+                self._record_error(error_msg)
             
-            elif not self.sheets_client:
-                logger.warning("Google Sheets client not available, skipping save")
+            # Step 4: Send Telegram notifications for new matches
+            try:
+                self.drain_notifications()
+            except Exception as e:
+                error_msg = f"Error sending Telegram notifications: {e}"
+                logger.error(error_msg)
+                scan_results['errors'].append(error_msg)
             
             # Update statistics
-            self.stats['total_scans'] += 1
-            self.stats['total_problems_found'] += scan_results['problems_found']
-            self.stats['total_matches_found'] += scan_results['matches_found']
-            self.stats['total_matches_added'] += scan_results['matches_added']
-            self.stats['last_scan_time'] = scan_results['scan_time']
+            scan_results['duration_seconds'] = round(time.time() - started, 1)
+            self._record_scan(scan_results)
+            self.flush_analytics()
+            
+            # The cycle is complete, nothing left to resume
+            if not self.has_pending_work():
+                self.checkpoint.clear()
             
             logger.info(f"✅ Scan completed successfully!")
             logger.info(f"   Problems: {scan_results['problems_found']}")
             logger.info(f"   Matches: {scan_results['matches_found']}")
             logger.info(f"   Added: {scan_results['matches_added']}")
-            
+        
         except Exception as e:
             error_msg = f"Critical error in scan_and_match: {e}"
             logger.error(error_msg)
             scan_results['errors'].append(error_msg)
-            self.stats['errors'].append({
-                'time': datetime.now().isoformat(),
-                'error': error_msg
-            })
+            self._record_error(error_msg)
         
         return scan_results
     
+    def _build_cycle_goal(self) -> Optional[CycleGoal]:
+        """Stopping rules for a scan cycle, or None if none are configured."""
+        if not any((self.scan_target_new_matches, self.scan_category_quota,
+                    self.scan_time_budget_seconds, self.scan_browser_budget_seconds)):
+            return None
+        
+        # Matches already in the sheet don't count towards the goal
+        known_keys = None
+        if self.sheets_client:
+            try:
+                known_keys = self.sheets_client.get_match_keys()
+            except Exception as e:
+                logger.warning(f"Failed to load sheet keys for the scan goal: {e}")
+        
+        goal = CycleGoal(
+            self.scan_target_new_matches,
+            self.scan_category_quota,
+            self.scan_time_budget_seconds,
+            self.scan_browser_budget_seconds,
+            known_keys
+        )
+        
+        # Matches queued before a restart still count
+        with self._queue_lock:
+            goal.admit(list(self.pending_matches))
+        return goal
+    
+    def _search_until_goal(self) -> Dict[str, Any]:
+        """Search the cycle's queued problems, stopping early once the cycle goal is met.
+        
+        With stopping rules, problems are searched in batches so the goal is
+        checked between them; problems left when it is met are dropped.
+        """
+        goal = self._build_cycle_goal()
+        if goal is None:
+            return self.search_pending_problems()
+        
+        totals = {'problems_searched': 0, 'matches_found': 0, 'blocked': 0, 'skipped': 0, 'errors': []}
+        batch_size = max(self.tiktok_search_batch_size, getattr(self.tiktok_scraper, 'tabs_per_browser', 1))
+        self._cycle_goal = goal
+        try:
+            while not goal.reason():
+                results = self.search_pending_problems(limit=batch_size)
+                for key in ('problems_searched', 'matches_found', 'blocked', 'skipped'):
+                    totals[key] += results[key]
+                totals['errors'].extend(results['errors'])
+                
+                with self._queue_lock:
+                    remaining = len(self.pending_problems)
+                if not remaining or not (results['problems_searched'] or results['skipped']):
+                    break
+        finally:
+            self._cycle_goal = None
+        
+        reason = goal.reason()
+        if reason:
+            with self._queue_lock:
+                dropped = len(self.pending_problems)
+                self.pending_problems.clear()
+            self.save_checkpoint()
+            logger.info(f"🏁 Stopping the scan early: it {reason} ({dropped} problems not searched)")
+        
+        return totals
+    
+    def has_pending_work(self) -> bool:
+        """Check if any queued work remains."""
+        with self._queue_lock:
+            return bool(self.pending_problems or self._in_flight_problems or
+                        self.pending_matches or self.pending_notifications)
+    
+    def save_checkpoint(self):
+        """Checkpoint the work queues to local disk."""
+        # Snapshot and write under one lock, so an older snapshot can never
+        # overwrite a newer one that finished writing first
+        with self._checkpoint_lock:
+            self._write_checkpoint()
+    
+    def _write_checkpoint(self):
+        with self._queue_lock:
+            state = {
+                'cycle_problems_found': self._cycle_problems_found,
+                # In-flight problems are searched again after a restart
+                'pending_problems': self._in_flight_problems + self.pending_problems,
+                'pending_matches': list(self.pending_matches),
+                'pending_notifications': list(self.pending_notifications),
+                'completed_queries': dict(self._completed_queries),
+                'seen_problem_urls': dict(self._seen_problem_urls),
+                'subreddit_last_refresh': dict(self._subreddit_last_refresh)
+            }
+        
+        try:
+            self.checkpoint.save(state)
+        except Exception as e:
+            logger.warning(f"Failed to save scan checkpoint: {e}")
+    
+    def restore_checkpoint(self) -> bool:
+        """Restore the work queues from the last checkpoint, if there is one."""
+        state = self.checkpoint.load()
+        if not state:
+            return False
+        
+        with self._queue_lock:
+            self._cycle_problems_found = state.get('cycle_problems_found', 0)
+            self.pending_problems = state.get('pending_problems', [])
+            self._in_flight_problems = []
+            self.pending_matches = state.get('pending_matches', [])
+            self.pending_notifications = deque(state.get('pending_notifications', []))
+            self._completed_queries = state.get('completed_queries', {})
+            seen = state.get('seen_problem_urls', {})
+            # Checkpoints written before URLs carried a timestamp hold a plain list
+            self._seen_problem_urls = dict.fromkeys(seen, time.time()) if isinstance(seen, list) else seen
+            self._subreddit_last_refresh = state.get('subreddit_last_refresh', {})
+            
+            # Restored representatives keep collecting their near-duplicates
+            if self._problem_index is not None:
+                for problem in self.pending_problems:
+                    self._index_problem(problem)
+        
+        logger.info(f"Restored checkpoint: {len(self.pending_problems)} problems, "
+                    f"{len(self._completed_queries)} completed queries, "
+                    f"{len(self.pending_matches)} matches pending write")
+        return True
+    
+    def _record_scan(self, scan_results: Dict[str, Any]):
+        """Fold a completed scan into the bot statistics."""
+        self._count('scans')
+        self._count('problems_found', scan_results['problems_found'])
+        self._count('matches_found', scan_results['matches_found'])
+        self._count('matches_added', scan_results['matches_added'])
+        self.metrics.record('scan_seconds', scan_results['duration_seconds'])
+        self.stats['last_scan_time'] = scan_results['scan_time']
+        self._save_metrics()
+        self._save_budget()
+    
+    def _count(self, name: str, value: int = 1):
+        """Add to one of the bot's counters; its total and rolling metric live in the metrics store."""
+        self.metrics.record(name, value)
+    
+    def _save_metrics(self):
+        """Write the rolling metrics to disk."""
+        try:
+            self.metrics.save()
+        except OSError as e:
+            logger.warning(f"Failed to save metrics: {e}")
+    
+    def _record_error(self, error_msg: str):
+        """Record an error in the bot statistics; only the most recent errors are kept."""
+        self.stats['errors'].append({
+            'time': datetime.now().isoformat(),
+            'error': error_msg
+        })
+        self.metrics.record('errors')
+    
     def _format_telegram_message(self, match: Dict[str, Any]) -> str:
         """Format a product match for Telegram notification."""
         message = f"""🎯 **New Product Match Found!**
@@ -254,39 +1062,280 @@ class ProductFinderBot:
             except Exception as e:
                 logger.error(f"Failed to get sheet stats: {e}")
         
+        if self.budget is not None:
+            self.stats['search_budget'] = self.budget.get_status()
+        
+        if self.content_index is not None:
+            self.stats['content_index'] = self.content_index.get_stats()
+        
+        # Only report the scraper's guard if a search has created the scraper
+        scraper = self._components.get('tiktok')
+        if scraper:
+            self.stats['tiktok_guard'] = scraper.guard.get_status()
+        
+        # Totals come from the persistent metrics, so a fresh process (the stats
+        # command) reports the same numbers as the running bot
+        for name in ('scans', 'problems_found', 'matches_found', 'matches_added'):
+            self.stats[f'total_{name}'] = int(self.metrics.totals.get(name, 0))
+        if self.stats['last_scan_time'] is None and 'scans' in self.metrics.last_recorded:
+            self.stats['last_scan_time'] = datetime.fromtimestamp(self.metrics.last_recorded['scans']).isoformat()
+        
+        # Errors per timed API call (Reddit, TikTok, Sheets, Telegram) over the last day
+        calls = sum(self.metrics.summary(name, DAY)['count'] for name in API_TIMINGS)
+        errors = self.metrics.summary('errors', DAY)['count']
+        self.stats['error_rate_day'] = round(errors / calls, 3) if calls else 0.0
+        self.stats['trends'] = self.metrics.get_trends(TREND_COUNTERS, ['scan_seconds'] + API_TIMINGS)
+        
         return self.stats
     
+    def prewarm(self):
+        """Do one-time startup work (chromedriver resolution) before scanning."""
+        if self.tiktok_scraper:
+            try:
+                self.tiktok_scraper.prewarm()
+            except Exception as e:
+                logger.error(f"Failed to prewarm TikTok scraper: {e}")
+    
     def run_once(self) -> Dict[str, Any]:
         """Run a single scan cycle."""
         logger.info("Running single ProductFinderBot scan...")
         return self.scan_and_match()
     
-    def run_scheduled(self):
-        """Run the bot on a schedule."""
-        logger.info(f"Starting ProductFinderBot with {self.scan_interval_hours}h intervals...")
+    def enqueue_scan(self) -> int:
+        """Queue a fetch task for every target subreddit, for workers to pick up."""
+        if not self.reddit_scanner:
+            raise Exception("Reddit scanner not available")
+        if not self.work_queue:
+            raise Exception("Work queue not available")
         
-        # Schedule the scan
-        schedule.every(self.scan_interval_hours).hours.do(self.scan_and_match)
+        queued = 0
+        for subreddit in self.reddit_scanner.target_subreddits:
+            # A subreddit still queued or in progress from an earlier scan isn't queued twice
+            if self.work_queue.put('subreddit_fetch', {'subreddit': subreddit},
+                                   dedup_key=f"subreddit:{subreddit}"):
+                queued += 1
         
-        # Run initial scan
-        logger.info("Running initial scan...")
-        self.scan_and_match()
+        logger.info(f"Queued {queued} subreddit fetches")
+        return queued
+    
+    def _handle_subreddit_fetch(self, payload: Dict[str, Any]):
+        """Worker task: scan one subreddit and queue a TikTok search per qualifying problem."""
+        started = time.time()
+        posts = self.reddit_scanner.scan_subreddit(payload['subreddit'])
+        self.metrics.record('reddit_fetch_seconds', time.time() - started)
+        problems = [self.reddit_scanner.post_to_problem(post) for post in posts]
+        self._export('posts', problems)
+        problems = [p for p in problems if p.get('score', 0) >= self.min_reddit_score]
+        problems.sort(key=lambda p: p['score'], reverse=True)
         
-        # Keep running scheduled scans
-        while True:
+        queued = 0
+        for problem in problems[:self.max_problems_per_scan]:
+            self._assign_query_template(problem)
+            if self.work_queue.put('tiktok_query', {'problem': problem},
+                                   dedup_key=f"problem:{problem['reddit_url']}"):
+                queued += 1
+        
+        self._count('problems_found', queued)
+        logger.info(f"Queued {queued} TikTok searches from r/{payload['subreddit']}")
+    
+    def _handle_tiktok_query(self, payload: Dict[str, Any]):
+        """Worker task: search TikTok for one problem and queue its matches for the sheet."""
+        if not self.tiktok_scraper:
+            raise Exception("TikTok scraper not available")
+        
+        matches = self._search_problem(payload['problem'])
+        self._count('matches_found', len(matches))
+        
+        if matches:
+            self.work_queue.put('sheet_flush', {'matches': matches})
+    
+    def _handle_sheet_flush(self, payload: Dict[str, Any]):
+        """Worker task: write matches to Google Sheets and notify about new ones."""
+        if not self.sheets_client:
+            raise Exception("Google Sheets client not available")
+        
+        matches = payload['matches']
+        started = time.time()
+        # A failed read or write raises, so run_worker nacks the task and it is
+        # retried (and eventually dead-lettered) instead of acked with the matches lost
+        unique_matches = self.sheets_client.filter_unique_matches(matches)
+        added_count = self.sheets_client.add_product_matches(unique_matches) if unique_matches else 0
+        if added_count < len(unique_matches):
+            raise Exception(f"Only {added_count} of {len(unique_matches)} matches were written to Google Sheets")
+        self.metrics.record('sheet_write_seconds', time.time() - started)
+        self._count('matches_added', added_count)
+        logger.info(f"Added {added_count} unique matches to Google Sheets")
+        if added_count:
+            self._record_added_matches(unique_matches)
+        self._track_posts(matches)
+        
+        if added_count > 0 and self.telegram_client:
+            with self._queue_lock:
+                self.pending_notifications.extend(matches[:self.max_notifications_per_flush])
+            # The matches are already saved, so a failed notification doesn't retry the task
             try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-                
-            except KeyboardInterrupt:
-                logger.info("Bot stopped by user")
-                break
+                self.drain_notifications()
+            except Exception as e:
+                logger.error(f"Error sending Telegram notifications: {e}")
+    
+    def run_worker(self, max_tasks: int = None) -> int:
+        """Lease and process tasks from the shared work queue.
+        
+        Any number of workers, on any number of machines, can share one queue.
+        A task whose worker dies is handed to another worker once its
+        visibility timeout passes.
+        """
+        if not self.work_queue:
+            raise Exception("Work queue not available")
+        
+        handlers = {
+            'subreddit_fetch': self._handle_subreddit_fetch,
+            'tiktok_query': self._handle_tiktok_query,
+            'sheet_flush': self._handle_sheet_flush
+        }
+        
+        logger.info(f"👷 Worker started on {self.work_queue_url}")
+        processed = 0
+        last_export = time.time()
+        
+        while max_tasks is None or processed < max_tasks:
+            if time.time() - last_export >= self.analytics_flush_interval_seconds:
+                self.flush_analytics()
+                last_export = time.time()
+            
+            task = self.work_queue.lease(self.work_queue_visibility_seconds)
+            if task is None:
+                time.sleep(self.work_queue_poll_seconds)
+                continue
+            
+            handler = handlers.get(task['type'])
+            if handler is None:
+                logger.error(f"Dropping task {task['id']} of unknown type: {task['type']}")
+                self.work_queue.ack(task)
+                continue
+            
+            try:
+                handler(task['payload'])
+                if not self.work_queue.ack(task):
+                    logger.warning(f"Task {task['id']} ({task['type']}) outlived its lease and may run again")
+            
+            except ScrapeBlockedError as e:
+                # Retry once TikTok lets us back in; being blocked isn't the task's fault
+                delay = max(self.tiktok_scraper.guard.breaker.seconds_until_retry(), self.work_queue_poll_seconds)
+                logger.warning(f"Task {task['id']} blocked by TikTok, retrying in {delay:.0f}s: {e}")
+                self.work_queue.nack(task, delay=delay, count_attempt=False)
+            
+            except Exception as e:
+                error_msg = f"Error in {task['type']} task {task['id']} (attempt {task['attempts']}): {e}"
+                logger.error(error_msg)
+                self._record_error(error_msg)
+                self.work_queue.nack(task, delay=60)
+            
+            processed += 1
+        
+        return processed
+    
+    def _job(self, name: str, func):
+        """Wrap a stage so that its failures are recorded in the statistics."""
+        def run():
+            try:
+                func()
             except Exception as e:
-                logger.error(f"Error in scheduled run: {e}")
-                time.sleep(300)  # Wait 5 minutes before retrying
+                error_msg = f"Error in {name} job: {e}"
+                self._record_error(error_msg)
+                raise
+        return run
+    
+    def _run_search_job(self):
+        """Scheduled TikTok search: work through a batch of queued problems."""
+        results = self.search_pending_problems(limit=self.tiktok_search_batch_size)
+        if results['problems_searched']:
+            self._count('problems_found', results['problems_searched'])
+            self._count('matches_found', results['matches_found'])
+    
+    def _run_flush_job(self):
+        """Scheduled sheet flush."""
+        added = self.flush_matches()
+        if added:
+            self._count('matches_added', added)
+            self.stats['last_scan_time'] = datetime.now().isoformat()
+    
+    def build_scheduler(self) -> JobScheduler:
+        """Create the scheduler with one independent job per pipeline stage."""
+        scheduler = JobScheduler()
+        
+        # Notification delivery runs on its own pool at the highest priority,
+        # so a slow Chrome search never holds it back
+        if self.telegram_client:
+            scheduler.add_job('telegram_drain', self._job('telegram_drain', self.drain_notifications),
+                              self.telegram_drain_interval_seconds, priority=30)
+            
+            if self.enable_sheet_relay:
+                scheduler.add_job('sheet_relay', self._job('sheet_relay', self.telegram_client._process_new_rows),
+                                  self.sheet_relay_interval_seconds, priority=25)
+        
+        if self.sheets_client:
+            scheduler.add_job('sheet_flush', self._job('sheet_flush', self._run_flush_job),
+                              self.sheet_flush_interval_seconds, priority=20)
+            
+            # Moves finished months out of the spreadsheet; cheap when there is nothing to archive
+            scheduler.add_job('sheet_archive', self._job('sheet_archive', self.sheets_client.cleanup_old_matches),
+                              24 * 3600, priority=2)
+        
+        if self.reddit_scanner:
+            scheduler.add_job('subreddit_refresh', self._job('subreddit_refresh', self.refresh_subreddits),
+                              self.subreddit_refresh_check_seconds, priority=10)
+            
+            scheduler.add_job('score_refresh', self._job('score_refresh', self.refresh_reddit_scores),
+                              self.score_refresh_interval_seconds, priority=5, run_immediately=False)
+        
+        if self.analytics is not None:
+            scheduler.add_job('analytics_export', self._job('analytics_export', self.flush_analytics),
+                              self.analytics_flush_interval_seconds, priority=3, run_immediately=False)
+        
+        if self.tiktok_scraper:
+            scheduler.add_job('tiktok_search', self._job('tiktok_search', self._run_search_job),
+                              self.tiktok_search_interval_seconds, priority=0,
+                              max_concurrency=self.tiktok_search_concurrency)
+        
+        return scheduler
+    
+    def run_scheduled(self):
+        """Run the bot on a schedule."""
+        logger.info(f"Starting ProductFinderBot with {self.scan_interval_hours}h base refresh interval...")
+        
+        # Pick up wherever the previous process left off
+        self.restore_checkpoint()
+        
+        self.scheduler = self.build_scheduler()
+        
+        try:
+            self.scheduler.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user")
+        finally:
+            self.scheduler.stop()
+            self.flush_analytics()
+            self._save_metrics()
+            self._save_budget()
     
-    def test_components(self) -> Dict[str, bool]:
-        """Test all components to ensure they're working."""
+    def check_health(self) -> Dict[str, bool]:
+        """Return cached live test results, or a quick offline check when none are fresh."""
+        cached = self.health_cache.load()
+        if cached is not None:
+            return cached
+        
+        return check_components_offline(self.enable_telegram)
+    
+    def test_components(self, offline: bool = False) -> Dict[str, bool]:
+        """Test all components to ensure they're working.
+        
+        Offline tests only check configuration and installed modules. Live
+        tests exercise every component and their results are cached.
+        """
+        if offline:
+            return check_components_offline(self.enable_telegram)
+        
         results = {}
         
         # Test Reddit scanner
@@ -314,7 +1363,8 @@ class ProductFinderBot:
         # Test Google Sheets
         try:
             if self.sheets_client:
-                stats = self.sheets_client.get_sheet_stats()
+                # A live test reads the sheet rather than the local counts
+                stats = self.sheets_client.get_sheet_stats(refresh=True)
                 results['sheets'] = 'total_matches' in stats
             else:
                 results['sheets'] = False
@@ -333,64 +1383,158 @@ class ProductFinderBot:
             logger.error(f"Telegram test failed: {e}")
             results['telegram'] = False
         
+        self.health_cache.save(results)
         return results
 
+def _print_component_results(results: Dict[str, bool]):
+    """Print component status lines."""
+    for component, status in results.items():
+        status_icon = "✅" if status else "❌"
+        print(f"   {component.capitalize()}: {status_icon}")
+
+def _print_trends(trends: Dict[str, Dict[str, Any]]):
+    """Print each metric's last hour, day and week against the window before."""
+    print("\n📈 Trends (current vs previous window; timings are mean seconds):")
+    for name, windows in trends.items():
+        parts = []
+        for window in ('hour', 'day', 'week'):
+            trend = windows[window]
+            change = f", {trend['change_pct']:+.1f}%" if trend['change_pct'] is not None else ""
+            parts.append(f"{window} {trend['current']:g} (prev {trend['previous']:g}{change})")
+        total = f", all time {windows['all_time']:g}" if windows['all_time'] is not None else ""
+        print(f"  {name}: {', '.join(parts)}{total}")
+
 def main():
     """Main function to run ProductFinderBot."""
+    load_dotenv()
+    setup_logging('product_finder_bot.log')
+    
     print("🧠 ProductFinderBot - Automated Product Discovery")
     print("=" * 50)
     
+    # Get command line arguments
+    args = [arg.lower() for arg in sys.argv[1:]]
+    command = args[0] if args else None
+    offline = '--offline' in args
+    
+    if command not in (None, 'once', 'stats', 'test', 'enqueue', 'worker', 'trends', 'mentions', 'archive', 'report'):
+        print(f"\nUnknown command: {command}")
+        print("Available commands: once, stats, test [--offline], enqueue, worker, trends [category], "
+              "mentions <term>, archive, report [days], or no command for scheduled run")
+        return 1
+    
+    if command == 'mentions' and len(args) < 2:
+        print("\nUsage: mentions <term>")
+        return 1
+    
     try:
         bot = ProductFinderBot()
         
-        # Test components first
-        print("\n🔧 Testing components...")
-        test_results = bot.test_components()
+        if command == 'stats':
+            # Only the Sheets client is needed here
+            print("\n📊 Bot Statistics:")
+            stats = bot.get_stats()
+            for key, value in stats.items():
+                if key not in ('errors', 'trends'):
+                    print(f"  {key}: {value}")
+            _print_trends(stats['trends'])
+            return 0
+        
+        if command == 'test':
+            print(f"\n🔧 Testing components{' (offline)' if offline else ''}...")
+            test_results = bot.test_components(offline=offline)
+            _print_component_results(test_results)
+            print("\n✅ Component tests completed")
+            return 0 if any(test_results.values()) else 1
+        
+        if command == 'archive':
+            # Only the Sheets client is needed here
+            if not bot.sheets_client:
+                print("\n❌ Google Sheets client not available")
+                return 1
+            archived = bot.sheets_client.cleanup_old_matches()
+            print(f"\n🗄️ Archived {archived} monthly partitions to {bot.sheets_client.archive_dir}")
+            return 0
+        
+        if command == 'report':
+            # Read from the exported Parquet files, without touching the Sheets API
+            days = int(args[1]) if len(args) > 1 and args[1].isdigit() else 30
+            report = build_report(bot.analytics_dir, days)
+            titles = {
+                'conversion': 'Conversion by category',
+                'match_scores': 'Match score distribution by category',
+                'score_histogram': 'Match score histogram',
+                'reddit_scores': 'Reddit scores of matched and unmatched posts',
+                'top_authors': 'Top TikTok authors'
+            }
+            print(f"\n📊 Analytics report, last {days} days ({bot.analytics_dir}):")
+            for key, title in titles.items():
+                print(f"\n{title}:")
+                print(report[key].to_string() if not report[key].empty else "  (no data exported yet)")
+            return 0
+        
+        if command in ('trends', 'mentions'):
+            # Answered from the local content index, without scraping
+            if bot.content_index is None:
+                print("\n❌ Content index is disabled (ENABLE_CONTENT_INDEX=false)")
+                return 1
+            text = ' '.join(args[1:])
+            
+            if command == 'trends':
+                print(f"\n📈 Rising hashtags this week{f' in {text}' if text else ''}:")
+                for trend in bot.content_index.rising_terms(text or None):
+                    print(f"  #{trend['term']}: {trend['recent']} videos (previous week {trend['previous']})")
+            else:
+                print(f"\n🔎 Videos mentioning '{text}':")
+                for video in bot.content_index.videos_for_term(text):
+                    print(f"  {video['views']:>10,} views  {video['url']}  {video['title'][:60]}")
+            return 0
+        
+        if command == 'enqueue':
+            # Only Reddit's subreddit list and the queue are needed here
+            queued = bot.enqueue_scan()
+            print(f"\n📥 Queued {queued} subreddit fetches on {bot.work_queue_url}")
+            return 0
         
-        for component, status in test_results.items():
-            status_icon = "✅" if status else "❌"
-            print(f"   {component.capitalize()}: {status_icon}")
+        # Check components before scanning, without running live tests
+        print("\n🔧 Checking components...")
+        test_results = bot.check_health()
+        _print_component_results(test_results)
         
         if not any(test_results.values()):
             print("\n❌ No components are working. Please check your configuration.")
             return 1
         
-        # Get command line arguments
-        if len(sys.argv) > 1:
-            command = sys.argv[1].lower()
-            
-            if command == 'once':
-                print("\n🚀 Running single scan...")
-                results = bot.run_once()
-                print(f"\nScan Results:")
-                print(f"  Problems found: {results['problems_found']}")
-                print(f"  Matches found: {results['matches_found']}")
-                print(f"  Matches added: {results['matches_added']}")
-                if results['errors']:
-                    print(f"  Errors: {len(results['errors'])}")
-                
-            elif command == 'stats':
-                print("\n📊 Bot Statistics:")
-                stats = bot.get_stats()
-                for key, value in stats.items():
-                    if key != 'errors':
-                        print(f"  {key}: {value}")
-                
-            elif command == 'test':
-                print("\n✅ Component tests completed (see above)")
-                
-            else:
-                print(f"\nUnknown command: {command}")
-                print("Available commands: once, stats, test, or no command for scheduled run")
-                return 1
+        bot.prewarm()
+        
+        if command == 'worker':
+            print(f"\n👷 Processing tasks from {bot.work_queue_url}")
+            print("Press Ctrl+C to stop...")
+            try:
+                bot.run_worker()
+            except KeyboardInterrupt:
+                print("\n👋 Worker stopped")
+            finally:
+                bot.flush_analytics()
+                bot._save_metrics()
+                bot._save_budget()
+        elif command == 'once':
+            print("\n🚀 Running single scan...")
+            results = bot.run_once()
+            print(f"\nScan Results:")
+            print(f"  Problems found: {results['problems_found']}")
+            print(f"  Matches found: {results['matches_found']}")
+            print(f"  Matches added: {results['matches_added']}")
+            if results['errors']:
+                print(f"  Errors: {len(results['errors'])}")
         else:
             # Run scheduled
-            print(f"\n⏰ Starting scheduled runs (every {bot.scan_interval_hours} hours)")
+            print(f"\n⏰ Starting scheduled jobs (subreddits refreshed at most every {bot.scan_interval_hours} hours)")
             print("Press Ctrl+C to stop...")
             bot.run_scheduled()
         
         return 0
-        
+    
     except Exception as e:
         logger.error(f"Failed to start ProductFinderBot: {e}")
         print(f"\n❌ Error: {e}")
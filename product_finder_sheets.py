@@ -1,11 +1,14 @@
 import os
+import re
 import time
 import logging
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 from dotenv import load_dotenv
+from sheets_session import get_sheets_session
+from sheet_partitions import (PartitionIndex, KnownMatchKeys, RowIndex, partition_title, partition_month,
+                              partition_end, archive_rows)
+from match_aggregates import MatchAggregates
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,13 +21,34 @@ class ProductFinderSheets:
         
         # Google Sheets configuration
         self.sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'ProductFinderBot')
+        self.sheet_id = os.getenv('GOOGLE_SHEET_ID') or None  # Skips the Drive search by name
         self.worksheet_name = os.getenv('GOOGLE_WORKSHEET_NAME', 'Product_Matches')
         self.service_account_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'service_account.json')
         
-        # Set up Google Sheets connection
-        self.gc = self._setup_google_sheets()
+        # Matches are written to one worksheet per month (Product_Matches_2026_10);
+        # older months are archived to compressed local files
+        self.monthly_partitions = os.getenv('GOOGLE_WORKSHEET_PARTITIONING', 'monthly').lower() == 'monthly'
+        self.archive_dir = os.getenv('SHEET_ARCHIVE_DIR', 'sheet_archive')
+        self.archive_after_days = int(os.getenv('SHEET_ARCHIVE_AFTER_DAYS', '30'))
+        self.partition_index = PartitionIndex(os.getenv('SHEET_PARTITION_INDEX_FILE', 'sheet_partitions.json'))
+        self._synced_partition: Optional[str] = None
+        
+        # Counts behind get_sheet_stats, kept up to date locally and recounted
+        # from the sheet at least every SHEET_STATS_RECONCILE_HOURS
+        self.aggregates = MatchAggregates(os.getenv('SHEET_STATS_FILE', 'match_aggregates.json'))
+        self.stats_reconcile_seconds = float(os.getenv('SHEET_STATS_RECONCILE_HOURS', '24')) * 3600
+        
+        # Set up Google Sheets connection (shared with other clients in this process)
+        self.session = get_sheets_session(self.service_account_file)
+        self.gc = self.session.client
         self.worksheet = None
         
+        # Row number of each (Reddit title, TikTok URL) key in the hot worksheet,
+        # refreshed whenever the worksheet is read and extended with the rows each append reports.
+        # It is saved, so a new process can use it once the worksheet's row count confirms it
+        self.row_index = RowIndex(os.getenv('SHEET_ROW_INDEX_FILE', 'sheet_row_index.json'))
+        self._row_index_verified = False
+        
         # Define column headers for ProductFinderBot
         self.headers = [
             'Reddit Title',
@@ -41,73 +65,60 @@ class ProductFinderSheets:
             'Match Score',
             'Date Added',
             'Search Query',
-            'Status'
+            'Status',
+            'Reddit Comments'
         ]
         
         logger.info("ProductFinderSheets initialized successfully")
     
-    def _setup_google_sheets(self) -> gspread.Client:
-        """Set up Google Sheets API connection."""
-        try:
-            # Define the scope
-            scope = [
-                'https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            # Add credentials to the account
-            credentials = ServiceAccountCredentials.from_json_keyfile_name(
-                self.service_account_file, scope
-            )
-            
-            # Authorize the client
-            gc = gspread.authorize(credentials)
-            logger.info("Google Sheets API connection established")
-            return gc
-            
-        except Exception as e:
-            logger.error(f"Failed to setup Google Sheets connection: {e}")
-            raise
+    def current_worksheet_title(self) -> str:
+        """Title of the worksheet new matches are written to."""
+        return self._partition_name()
+    
+    def _partition_name(self) -> str:
+        """Title of the worksheet new matches go to."""
+        if not self.monthly_partitions:
+            return self.worksheet_name
+        return partition_title(self.worksheet_name, datetime.now())
+    
+    def _ensure_worksheet(self):
+        """Open the hot worksheet, switching to a new partition when the month changes."""
+        if not self.worksheet or self.worksheet.title != self._partition_name():
+            self._get_or_create_worksheet()
     
     def _get_or_create_worksheet(self):
         """Get the worksheet, creating it if it doesn't exist."""
         try:
-            # Try to open existing sheet
-            try:
-                sheet = self.gc.open(self.sheet_name)
-                logger.info(f"Opened existing sheet: {self.sheet_name}")
-            except gspread.SpreadsheetNotFound:
-                # Create new sheet if it doesn't exist
-                sheet = self.gc.create(self.sheet_name)
-                logger.info(f"Created new sheet: {self.sheet_name}")
-            
-            # Try to get existing worksheet
-            try:
-                self.worksheet = sheet.worksheet(self.worksheet_name)
-                logger.info(f"Found existing worksheet: {self.worksheet_name}")
-            except gspread.WorksheetNotFound:
-                # Create new worksheet
-                self.worksheet = sheet.add_worksheet(
-                    title=self.worksheet_name,
-                    rows=1000,
-                    cols=len(self.headers)
-                )
-                logger.info(f"Created new worksheet: {self.worksheet_name}")
-                
-                # Add headers
-                self.worksheet.append_row(self.headers)
-                logger.info("Added headers to worksheet")
-                
-                # Format headers
-                self._format_headers()
-            
-            # Ensure headers are correct
-            self._validate_headers()
+            sheet = self.session.open_spreadsheet(name=self.sheet_name, key=self.sheet_id, create=True)
+            self.worksheet = self.session.get_worksheet(
+                sheet,
+                self._partition_name(),
+                rows=1000,
+                cols=len(self.headers),
+                on_create=self._initialize_worksheet,
+                create=True
+            )
             
+            # Ensure headers are correct (once per process)
+            if not self.session.is_validated(self.worksheet):
+                self._validate_headers()
+                self.session.mark_validated(self.worksheet)
+        
         except Exception as e:
             logger.error(f"Failed to setup worksheet: {e}")
             raise
     
+    def _initialize_worksheet(self, worksheet):
+        """Add and format headers on a newly created worksheet."""
+        self.worksheet = worksheet
+        
+        # Add headers
+        self.worksheet.append_row(self.headers)
+        logger.info("Added headers to worksheet")
+        
+        # Format headers
+        self._format_headers()
+    
     def _format_headers(self):
         """Format the header row."""
         try:
@@ -119,7 +130,7 @@ class ProductFinderSheets:
             
             # Auto-resize columns
             self.worksheet.columns_auto_resize(0, len(self.headers))
-            
+        
         except Exception as e:
             logger.warning(f"Failed to format headers: {e}")
     
@@ -136,91 +147,203 @@ class ProductFinderSheets:
                 logger.warning("Headers don't match expected format, updating...")
                 self.worksheet.update('1:1', [self.headers])
                 self._format_headers()
-                
+        
         except Exception as e:
             logger.error(f"Failed to validate headers: {e}")
     
     def add_product_matches(self, matches: List[Dict[str, Any]]) -> int:
-        """Add product matches to the sheet."""
+        """Add product matches to the sheet.
+        
+        Raises if the rows could not be written, so callers can keep the
+        matches queued and retry.
+        """
         if not matches:
             logger.info("No matches to add")
             return 0
         
+        self._ensure_worksheet()
+        
+        # Prepare rows for batch insert
+        rows_to_add = []
+        
+        for match in matches:
+            row = [
+                match.get('reddit_title', '')[:500],  # Limit length
+                match.get('tiktok_title', '')[:500],
+                match.get('category', ''),
+                match.get('tiktok_url', ''),
+                match.get('description', '')[:500],
+                str(match.get('tiktok_views', 0)),
+                match.get('source', 'Reddit + TikTok'),
+                match.get('reddit_url', ''),
+                match.get('reddit_subreddit', ''),
+                str(match.get('reddit_score', 0)),
+                match.get('tiktok_author', ''),
+                str(match.get('match_score', 0.0)),
+                match.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                match.get('search_query', ''),
+                'New',
+                str(match.get('reddit_comments', 0))
+            ]
+            rows_to_add.append(row)
+        
+        # Batch insert all rows
         try:
-            if not self.worksheet:
-                self._get_or_create_worksheet()
-            
-            # Prepare rows for batch insert
-            rows_to_add = []
-            
-            for match in matches:
-                row = [
-                    match.get('reddit_title', '')[:500],  # Limit length
-                    match.get('tiktok_title', '')[:500],
-                    match.get('category', ''),
-                    match.get('tiktok_url', ''),
-                    match.get('description', '')[:500],
-                    str(match.get('tiktok_views', 0)),
-                    match.get('source', 'Reddit + TikTok'),
-                    match.get('reddit_url', ''),
-                    match.get('reddit_subreddit', ''),
-                    str(match.get('reddit_score', 0)),
-                    match.get('tiktok_author', ''),
-                    str(match.get('match_score', 0.0)),
-                    match.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-                    match.get('search_query', ''),
-                    'New'
-                ]
-                rows_to_add.append(row)
-            
-            # Batch insert all rows
-            if rows_to_add:
-                self.worksheet.append_rows(rows_to_add)
-                logger.info(f"Added {len(rows_to_add)} product matches to sheet")
-                
-                # Auto-resize columns after adding data
-                try:
-                    self.worksheet.columns_auto_resize(0, len(self.headers))
-                except:
-                    pass  # Ignore formatting errors
-                
-                return len(rows_to_add)
-            
+            response = self.worksheet.append_rows(rows_to_add)
         except Exception as e:
             logger.error(f"Failed to add product matches: {e}")
-            return 0
+            raise
+        logger.info(f"Added {len(rows_to_add)} product matches to sheet")
         
-        return 0
+        self.aggregates.add_rows(self.worksheet.title, [dict(zip(self.headers, row)) for row in rows_to_add])
+        self._save_aggregates()
+        
+        # Other workers may append at the same time, so row numbers come from the response
+        if self._row_index_verified and self.row_index.title == self.worksheet.title:
+            first_row = self._appended_first_row(response)
+            if first_row is None:
+                # Unknown position; the next key lookup re-reads the worksheet
+                self.row_index.reset(None)
+                self._row_index_verified = False
+            else:
+                for offset, match in enumerate(matches):
+                    self.row_index.add(self.match_key(match), first_row + offset, 'New')
+            self._save_row_index()
+        
+        # Auto-resize columns after adding data
+        try:
+            self.worksheet.columns_auto_resize(0, len(self.headers))
+        except:
+            pass  # Ignore formatting errors
+        
+        return len(rows_to_add)
+    
+    @staticmethod
+    def _appended_first_row(response: Any) -> Optional[int]:
+        """First row written by append_rows, from updates.updatedRange (e.g. 'Sheet1!A5:P7')."""
+        try:
+            updated_range = response['updates']['updatedRange']
+        except (TypeError, KeyError):
+            return None
+        match = re.match(r'\$?[A-Z]+\$?(\d+)', updated_range.rsplit('!', 1)[-1])
+        return int(match.group(1)) if match else None
     
     def get_existing_matches(self) -> List[Dict[str, Any]]:
         """Get existing matches from the sheet to avoid duplicates."""
         try:
-            if not self.worksheet:
-                self._get_or_create_worksheet()
-            
-            # Get all rows except header
-            all_values = self.worksheet.get_all_values()
-            
-            if len(all_values) <= 1:
-                return []
-            
-            matches = []
-            headers = all_values[0]
+            return self._read_matches()
+        except Exception as e:
+            logger.error(f"Failed to get existing matches: {e}")
+            return []
+    
+    def _read_matches(self) -> List[Dict[str, Any]]:
+        """Read every row of the hot worksheet, refreshing the row index and stats counts."""
+        self._ensure_worksheet()
+        
+        # Get all rows except header
+        all_values = self.worksheet.get_all_values()
+        
+        # Every full read refreshes the key-to-row index
+        self.row_index.reset(self.worksheet.title, max(1, len(all_values)))
+        self._row_index_verified = True
+        
+        matches = []
+        headers = all_values[0] if all_values else self.headers
+        
+        for row_number, row in enumerate(all_values[1:], start=2):
+            # Pad row with empty strings if needed
+            while len(row) < len(headers):
+                row.append('')
             
-            for row in all_values[1:]:
-                # Pad row with empty strings if needed
-                while len(row) < len(headers):
-                    row.append('')
+            match = dict(zip(headers, row))
+            matches.append(match)
+            self.row_index.add(self.row_key(match), row_number, match.get('Status', ''))
+        
+        # A full read is also an exact recount for the stats
+        self.aggregates.replace(self.worksheet.title, matches)
+        self._save_aggregates()
+        self._save_row_index()
+        
+        logger.info(f"Retrieved {len(matches)} existing matches")
+        return matches
+    
+    def _row_index_current(self) -> bool:
+        """Whether the row index describes the hot worksheet.
+        
+        An index loaded from disk is checked once against the worksheet: its
+        last row must be the worksheet's last non-empty row. That costs one
+        two-row read instead of reading every row.
+        """
+        if self.row_index.title != self.worksheet.title:
+            return False
+        
+        if not self._row_index_verified:
+            from gspread.utils import rowcol_to_a1
+            last = self.row_index.row_count
+            values = self.worksheet.get(f"{rowcol_to_a1(last, 1)}:{rowcol_to_a1(last + 1, len(self.headers))}")
+            self._row_index_verified = len(values) == 1 and any(values[0])
+            if not self._row_index_verified:
+                logger.info(f"Saved row index of {self.worksheet.title} is out of date, re-reading the worksheet")
+        
+        return self._row_index_verified
+    
+    def _save_row_index(self):
+        """Persist the row index; a failed save only costs a full read later."""
+        try:
+            self.row_index.save()
+        except OSError as e:
+            logger.warning(f"Failed to save row index: {e}")
+    
+    @staticmethod
+    def match_key(match: Dict[str, Any]) -> Tuple[str, str]:
+        """(Reddit title, TikTok URL) key of a match record, as stored in the sheet."""
+        return (match.get('reddit_title', '')[:500].lower(), match.get('tiktok_url', ''))
+    
+    @staticmethod
+    def row_key(row: Dict[str, Any]) -> Tuple[str, str]:
+        """Key of a sheet row read by get_existing_matches."""
+        return (row.get('Reddit Title', '').lower(), row.get('TikTok URL', ''))
+    
+    def _partition_worksheets(self) -> List[Any]:
+        """Worksheets holding matches: the monthly partitions and the unpartitioned worksheet."""
+        sheet = self.session.open_spreadsheet(name=self.sheet_name, key=self.sheet_id, create=True)
+        return [
+            worksheet for worksheet in sheet.worksheets()
+            if worksheet.title == self.worksheet_name or partition_month(self.worksheet_name, worksheet.title)
+        ]
+    
+    def _sync_partition_index(self):
+        """Index the keys of older partitions not in the index yet.
+        
+        Runs once per process and month, so each older worksheet is read at
+        most once; afterwards only the hot worksheet is read for dedup.
+        """
+        hot = self._partition_name()
+        if not self.monthly_partitions or self._synced_partition == hot:
+            return
+        
+        try:
+            for worksheet in self._partition_worksheets():
+                if worksheet.title == hot or self.partition_index.has(worksheet.title):
+                    continue
                 
-                match = dict(zip(headers, row))
-                matches.append(match)
-            
-            logger.info(f"Retrieved {len(matches)} existing matches")
-            return matches
+                values = worksheet.get_all_values()
+                rows = [dict(zip(values[0], row)) for row in values[1:]] if values else []
+                self.partition_index.add(worksheet.title, [self.row_key(row) for row in rows], len(rows))
+                self.partition_index.save()
+                self.aggregates.replace(worksheet.title, rows)
+                self._save_aggregates()
+                logger.info(f"Indexed {len(rows)} match keys from worksheet {worksheet.title}")
             
+            self._synced_partition = hot
         except Exception as e:
-            logger.error(f"Failed to get existing matches: {e}")
-            return []
+            logger.warning(f"Failed to index older partitions: {e}")
+    
+    def get_match_keys(self) -> KnownMatchKeys:
+        """Keys of the matches in the hot worksheet and, through the index, in older partitions."""
+        self._sync_partition_index()
+        hot = {self.row_key(existing) for existing in self.get_existing_matches()}
+        return KnownMatchKeys(hot, self.partition_index if self.monthly_partitions else None)
     
     def is_duplicate_match(self, new_match: Dict[str, Any], existing_matches: List[Dict[str, Any]]) -> bool:
         """Check if a match already exists in the sheet."""
@@ -238,96 +361,289 @@ class ProductFinderSheets:
         
         return False
     
-    def add_unique_matches(self, matches: List[Dict[str, Any]]) -> int:
-        """Add only unique matches to avoid duplicates."""
+    def filter_unique_matches(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the matches that are not in the sheet yet."""
         if not matches:
-            return 0
+            return []
+        
+        # Get existing matches; a failed read raises rather than letting duplicates through
+        existing_matches = self._read_matches()
         
-        # Get existing matches
-        existing_matches = self.get_existing_matches()
+        # Matches in older partitions are found through the partition index
+        self._sync_partition_index()
         
         # Filter out duplicates
         unique_matches = []
         for match in matches:
-            if not self.is_duplicate_match(match, existing_matches):
+            older = self.monthly_partitions and self.match_key(match) in self.partition_index
+            if not older and not self.is_duplicate_match(match, existing_matches):
                 unique_matches.append(match)
             else:
-                logger.info(f"Skipping duplicate match: {match.get('reddit_title', '')[:50]}...")
+                logger.debug(f"Skipping duplicate match: {match.get('reddit_title', '')[:50]}...")
+        
+        if len(unique_matches) < len(matches):
+            logger.info(f"Skipped {len(matches) - len(unique_matches)} duplicate matches")
+        return unique_matches
+    
+    def add_unique_matches(self, matches: List[Dict[str, Any]]) -> int:
+        """Add only unique matches to avoid duplicates."""
+        if not matches:
+            return 0
+        
+        unique_matches = self.filter_unique_matches(matches)
         
         if unique_matches:
             logger.info(f"Adding {len(unique_matches)} unique matches (filtered {len(matches) - len(unique_matches)} duplicates)")
-            return self.add_product_matches(unique_matches)
+            try:
+                return self.add_product_matches(unique_matches)
+            except Exception:
+                return 0
         else:
             logger.info("No unique matches to add")
             return 0
     
     def update_match_status(self, row_number: int, status: str):
         """Update the status of a specific match."""
+        self.update_match_statuses([(row_number, status)])
+    
+    def update_match_statuses(self, updates: List[Tuple[Union[int, Tuple[str, str], Dict[str, Any]], str]]) -> int:
+        """Set the status of many matches in one batched request.
+        
+        Each update is (target, status), where target is a row number, a
+        (Reddit title, TikTok URL) key or a match record. Keys are resolved
+        through the saved key-to-row index, so the sheet is only read in full
+        if the index is missing or the worksheet's row count has changed.
+        Updates to consecutive rows are coalesced into one range. Returns the number of rows updated.
+        """
+        if not updates:
+            return 0
+        
         try:
-            if not self.worksheet:
-                self._get_or_create_worksheet()
+            self._ensure_worksheet()
+            
+            from gspread.utils import rowcol_to_a1
+            status_col = self.headers.index('Status') + 1
+            
+            # Resolve targets to row numbers; a later update of the same row wins
+            statuses: Dict[int, str] = {}
+            unresolved = 0
+            reread = False
+            for target, status in updates:
+                if isinstance(target, int):
+                    row_number = target
+                else:
+                    key = self.match_key(target) if isinstance(target, dict) else (target[0].lower(), target[1])
+                    # Keys appended by other workers since the last read need a fresh read, once per call
+                    if not self._row_index_current() or (key not in self.row_index and not reread):
+                        self.get_existing_matches()
+                        reread = True
+                    row_number = self.row_index.row_of(key)
+                
+                if row_number is None or row_number < 2:
+                    unresolved += 1
+                    continue
+                statuses[row_number] = status
             
-            # Find status column (last column)
-            status_col = len(self.headers)
+            if unresolved:
+                logger.warning(f"Skipped {unresolved} status updates for matches not in {self.worksheet.title}")
             
-            # Update status
-            self.worksheet.update_cell(row_number, status_col, status)
-            logger.info(f"Updated row {row_number} status to: {status}")
+            # Runs of consecutive rows become one range each
+            ranges = []
+            for row_number in sorted(statuses):
+                if ranges and row_number == ranges[-1]['end'] + 1:
+                    ranges[-1]['end'] = row_number
+                    ranges[-1]['values'].append([statuses[row_number]])
+                else:
+                    ranges.append({'start': row_number, 'end': row_number, 'values': [[statuses[row_number]]]})
             
+            # Keep the status counts current without a recount when the old status is known
+            title = self.worksheet.title
+            indexed = self._row_index_verified and self.row_index.title == title
+            for row_number, status in statuses.items():
+                old = self.row_index.status_of(row_number) if indexed else None
+                if old is None:
+                    self.aggregates.mark_stale(title)
+                elif old != status:
+                    self.aggregates.change_status(title, old, status)
+                if indexed:
+                    self.row_index.set_status(row_number, status)
+            
+            if ranges:
+                self.worksheet.batch_update([
+                    {
+                        'range': f"{rowcol_to_a1(r['start'], status_col)}:{rowcol_to_a1(r['end'], status_col)}",
+                        'values': r['values']
+                    }
+                    for r in ranges
+                ])
+            
+            self._save_aggregates()
+            if indexed:
+                self._save_row_index()
+            logger.info(f"Updated status of {len(statuses)} rows in {len(ranges)} ranges")
+            return len(statuses)
+        
         except Exception as e:
-            logger.error(f"Failed to update match status: {e}")
+            logger.error(f"Failed to update match statuses: {e}")
+            return 0
     
-    def get_sheet_stats(self) -> Dict[str, Any]:
-        """Get statistics about the sheet."""
+    def update_reddit_engagement(self, engagement: Dict[str, Dict[str, Any]]) -> int:
+        """Write fresh Reddit scores and comment counts, keyed by Reddit URL, to the sheet.
+        
+        Each entry may list the worksheets its post's matches were written to
+        under 'worksheets'; entries without one are looked up in the hot
+        worksheet. Every affected worksheet gets one batched update, and
+        partitions that have been archived are skipped.
+        """
+        if not engagement:
+            return 0
+        
         try:
-            if not self.worksheet:
-                self._get_or_create_worksheet()
+            self._ensure_worksheet()
             
-            all_values = self.worksheet.get_all_values()
-            total_rows = len(all_values) - 1  # Exclude header
+            from gspread import WorksheetNotFound
+            from gspread.utils import rowcol_to_a1
+            url_col = self.headers.index('Reddit URL') + 1
+            score_col = self.headers.index('Reddit Score') + 1
+            comments_col = self.headers.index('Reddit Comments') + 1
             
-            # Count by category
-            categories = {}
-            statuses = {}
+            by_worksheet: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for url, fresh in engagement.items():
+                for title in fresh.get('worksheets') or [self.worksheet.title]:
+                    by_worksheet.setdefault(title, {})[url] = fresh
             
-            if len(all_values) > 1:
-                headers = all_values[0]
-                category_idx = headers.index('Category') if 'Category' in headers else -1
-                status_idx = headers.index('Status') if 'Status' in headers else -1
+            sheet = None
+            rows = 0
+            for title, fresh_by_url in by_worksheet.items():
+                if title == self.worksheet.title:
+                    worksheet = self.worksheet
+                else:
+                    sheet = sheet or self.session.open_spreadsheet(name=self.sheet_name, key=self.sheet_id, create=True)
+                    try:
+                        worksheet = self.session.get_worksheet(sheet, title)
+                    except WorksheetNotFound:
+                        logger.info(f"Worksheet {title} has been archived, skipping its engagement updates")
+                        continue
                 
-                for row in all_values[1:]:
-                    if category_idx >= 0 and category_idx < len(row):
-                        category = row[category_idx] or 'Unknown'
-                        categories[category] = categories.get(category, 0) + 1
-                    
-                    if status_idx >= 0 and status_idx < len(row):
-                        status = row[status_idx] or 'Unknown'
-                        statuses[status] = statuses.get(status, 0) + 1
+                # Several matches can share a Reddit post, so every row with the URL is updated
+                updates = []
+                for row_number, url in enumerate(worksheet.col_values(url_col)[1:], start=2):
+                    fresh = fresh_by_url.get(url)
+                    if fresh is None:
+                        continue
+                    updates.append({'range': rowcol_to_a1(row_number, score_col), 'values': [[str(fresh['score'])]]})
+                    updates.append({'range': rowcol_to_a1(row_number, comments_col), 'values': [[str(fresh['num_comments'])]]})
+                
+                if updates:
+                    worksheet.batch_update(updates)
+                rows += len(updates) // 2
+            
+            logger.info(f"Updated Reddit engagement on {rows} rows in {len(by_worksheet)} worksheets")
+            return rows
+        
+        except Exception as e:
+            logger.error(f"Failed to update Reddit engagement: {e}")
+            return 0
+    
+    def _save_aggregates(self):
+        """Persist the stats counts; a failed save only costs a recount later."""
+        try:
+            self.aggregates.save()
+        except OSError as e:
+            logger.warning(f"Failed to save match aggregates: {e}")
+    
+    def get_sheet_stats(self, refresh: bool = False, days: int = 14) -> Dict[str, Any]:
+        """Get statistics about the sheet from the local aggregates.
+        
+        The hot worksheet is only read when its counts are stale, older than
+        SHEET_STATS_RECONCILE_HOURS, or refresh is set. Daily counts cover
+        the last `days` days.
+        """
+        try:
+            hot = self._partition_name()
+            if refresh or self.aggregates.needs_reconcile(hot, self.stats_reconcile_seconds):
+                self._read_matches()
+            
+            # Older partitions, counted without reading them
+            older = {
+                title: partition for title, partition in self.partition_index.partitions.items()
+                if title != hot
+            } if self.monthly_partitions else {}
+            
+            totals = self.aggregates.totals([hot] + list(older))
+            hot_totals = self.aggregates.totals([hot])
+            # Partitions indexed before aggregates existed only have a row count
+            totals['total_matches'] += sum(
+                partition.get('rows', 0) for title, partition in older.items()
+                if title not in self.aggregates.worksheets
+            )
             
             return {
-                'total_matches': total_rows,
-                'categories': categories,
-                'statuses': statuses,
+                'total_matches': totals['total_matches'],
+                'hot_matches': hot_totals['total_matches'],
+                'categories': totals['categories'],
+                'statuses': totals['statuses'],
+                'subreddits': totals['subreddits'],
+                'daily_matches': dict(list(totals['days'].items())[-days:]),
                 'sheet_name': self.sheet_name,
-                'worksheet_name': self.worksheet_name
+                'worksheet_name': hot,
+                'older_partitions': len(older),
+                'archived_partitions': sum(1 for p in older.values() if p.get('archive'))
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to get sheet stats: {e}")
             return {}
     
-    def cleanup_old_matches(self, days_old: int = 30):
-        """Remove matches older than specified days."""
+    def cleanup_old_matches(self, days_old: int = None) -> int:
+        """Archive monthly partitions that ended more than days_old days ago.
+        
+        Each partition's rows are written to a gzipped JSON-lines file in
+        SHEET_ARCHIVE_DIR, its keys are recorded in the partition index (so
+        archived matches are still recognised as duplicates), and the
+        worksheet is deleted. Returns the number of partitions archived.
+        """
+        if not self.monthly_partitions:
+            logger.info("Worksheet partitioning is disabled, nothing to archive")
+            return 0
+        
+        if days_old is None:
+            days_old = self.archive_after_days
+        cutoff = datetime.now() - timedelta(days=days_old)
+        archived = 0
+        
         try:
-            if not self.worksheet:
-                self._get_or_create_worksheet()
-            
-            # This would require parsing dates and removing old rows
-            # Implementation depends on specific requirements
-            logger.info(f"Cleanup function not implemented yet")
+            self._ensure_worksheet()
+            sheet = self.worksheet.spreadsheet
             
+            for worksheet in self._partition_worksheets():
+                month = partition_month(self.worksheet_name, worksheet.title)
+                if month is None or worksheet.title == self.worksheet.title or partition_end(month) > cutoff:
+                    continue
+                
+                values = worksheet.get_all_values()
+                headers, rows = (values[0], values[1:]) if values else (self.headers, [])
+                path = os.path.join(self.archive_dir, f"{worksheet.title}.jsonl.gz")
+                archive_rows(path, headers, rows)
+                
+                records = [dict(zip(headers, row)) for row in rows]
+                self.partition_index.add(worksheet.title, [self.row_key(record) for record in records])
+                if worksheet.title not in self.aggregates.worksheets:
+                    self.aggregates.replace(worksheet.title, records)
+                    self._save_aggregates()
+                self.partition_index.mark_archived(worksheet.title, path, len(rows))
+                self.partition_index.save()
+                
+                # The rows are safe on disk and in the index before the worksheet goes
+                sheet.del_worksheet(worksheet)
+                self.session.forget_worksheet(sheet.id, worksheet.title)
+                archived += 1
+                logger.info(f"Archived {len(rows)} matches from {worksheet.title} to {path}")
+        
         except Exception as e:
             logger.error(f"Failed to cleanup old matches: {e}")
+        
+        return archived
 
 if __name__ == "__main__":
     # Test the ProductFinderSheets
@@ -360,6 +676,6 @@ if __name__ == "__main__":
         # Get stats
         stats = sheets.get_sheet_stats()
         print(f"Sheet stats: {stats}")
-        
+    
     except Exception as e:
         logger.error(f"Test failed: {e}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from typing import List, NamedTuple, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Most fullnames Reddit's /api/info accepts per request
+INFO_BATCH_SIZE = 100
+
+class RedditPost(NamedTuple):
+    """The listing fields the scanner uses, named like PRAW's Submission attributes."""
+    id: str
+    title: str
+    selftext: str
+    permalink: str
+    score: int
+    num_comments: int
+    created_utc: float
+    author: Optional[str]
+
+def parse_listing(payload: dict) -> List[RedditPost]:
+    """Turn a Reddit listing JSON payload into compact post records."""
+    posts = []
+    
+    for child in (payload.get('data') or {}).get('children') or []:
+        if child.get('kind') != 't3':
+            continue
+        
+        data = child.get('data') or {}
+        author = data.get('author')
+        posts.append(RedditPost(
+            id=data.get('id', ''),
+            title=data.get('title', ''),
+            selftext=data.get('selftext', '') or '',
+            permalink=data.get('permalink', ''),
+            score=int(data.get('score', 0) or 0),
+            num_comments=int(data.get('num_comments', 0) or 0),
+            created_utc=float(data.get('created_utc', 0) or 0),
+            author=None if author in (None, '[deleted]') else author
+        ))
+    
+    return posts
+
+class RedditJSONClient:
+    """Minimal Reddit API client that reads listing JSON directly.
+    
+    Uses application-only OAuth (client credentials) with the token cached
+    until shortly before it expires, and one pooled HTTP session, so it is
+    safe to share between threads. api_base and auth_url can point at a
+    local stand-in server for testing.
+    """
+    
+    def __init__(self, client_id: str, client_secret: str, user_agent: str,
+                 api_base: str = 'https://oauth.reddit.com',
+                 auth_url: str = 'https://www.reddit.com/api/v1/access_token',
+                 pool_size: int = 10, timeout: float = 15):
+        """Initialize the client."""
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_base = api_base.rstrip('/')
+        self.auth_url = auth_url
+        self.timeout = timeout
+        
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+    
+    def _get_token(self, force_refresh: bool = False) -> str:
+        """Return a cached access token, fetching a new one when it is about to expire."""
+        with self._token_lock:
+            if not force_refresh and self._token and time.time() < self._token_expires_at:
+                return self._token
+            
+            response = self.session.post(
+                self.auth_url,
+                auth=(self.client_id, self.client_secret),
+                data={'grant_type': 'client_credentials'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            token = response.json()
+            
+            self._token = token['access_token']
+            # Refresh a minute early so a request never carries an expired token
+            self._token_expires_at = time.time() + int(token.get('expires_in', 3600)) - 60
+            logger.info("Obtained Reddit access token")
+            return self._token
+    
+    def _get(self, path: str, params: dict) -> dict:
+        """GET an API path, refreshing the token once if it was rejected."""
+        for attempt in range(2):
+            response = self.session.get(
+                f"{self.api_base}{path}",
+                params=params,
+                headers={'Authorization': f"bearer {self._get_token(force_refresh=attempt > 0)}"},
+                timeout=self.timeout
+            )
+            if response.status_code != 401:
+                break
+        
+        response.raise_for_status()
+        self._respect_rate_limit(response)
+        return response.json()
+    
+    def _respect_rate_limit(self, response: requests.Response):
+        """Pause until the rate-limit window resets once it is used up."""
+        try:
+            remaining = float(response.headers.get('X-Ratelimit-Remaining', 1))
+            reset = float(response.headers.get('X-Ratelimit-Reset', 0))
+        except ValueError:
+            return
+        
+        if remaining < 1 and reset > 0:
+            logger.warning(f"Reddit rate limit reached, waiting {reset:.0f}s")
+            time.sleep(reset)
+    
+    def listing(self, subreddit: str, sort: str = 'hot', limit: int = 100) -> List[RedditPost]:
+        """Fetch one page of a subreddit listing."""
+        payload = self._get(f"/r/{subreddit}/{sort}", {'limit': limit, 'raw_json': 1})
+        return parse_listing(payload)
+    
+    def info(self, fullnames: List[str]) -> List[RedditPost]:
+        """Look up posts by fullname (t3_<id>), 100 per request."""
+        posts = []
+        for start in range(0, len(fullnames), INFO_BATCH_SIZE):
+            batch = fullnames[start:start + INFO_BATCH_SIZE]
+            payload = self._get('/api/info', {'id': ','.join(batch), 'raw_json': 1})
+            posts.extend(parse_listing(payload))
+        return posts
@@ -1,15 +1,21 @@
 import os
-import praw
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-import re
+from content_parser import (PAIN_KEYWORDS, is_pain_related, extract_problem_category, get_parse_pool,
+                            extract_product_terms)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ways of turning a problem into a TikTok search query (see _generate_search_query)
+QUERY_TEMPLATES = ('keywords', 'category', 'product')
+
+# Most posts one listing request returns
+MAX_LISTING_LIMIT = 100
+
 class RedditScanner:
     def __init__(self):
         """Initialize Reddit scanner with PRAW."""
@@ -23,12 +29,29 @@ class RedditScanner:
         if not all([self.client_id, self.client_secret]):
             raise ValueError("Reddit API credentials must be set in .env file")
         
-        # Initialize Reddit instance
-        self.reddit = praw.Reddit(
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            user_agent=self.user_agent
-        )
+        # 'praw' uses PRAW Submission objects; 'json' reads listing JSON directly
+        # into compact records, without building an object per post
+        self.client_mode = os.getenv('REDDIT_CLIENT_MODE', 'praw').lower()
+        self.reddit = None
+        self.json_client = None
+        
+        if self.client_mode == 'json':
+            from reddit_json_client import RedditJSONClient
+            self.json_client = RedditJSONClient(
+                self.client_id,
+                self.client_secret,
+                self.user_agent,
+                api_base=os.getenv('REDDIT_API_BASE', 'https://oauth.reddit.com'),
+                auth_url=os.getenv('REDDIT_AUTH_URL', 'https://www.reddit.com/api/v1/access_token')
+            )
+        else:
+            # Initialize Reddit instance (PRAW is only imported once a scanner is needed)
+            import praw
+            self.reddit = praw.Reddit(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                user_agent=self.user_agent
+            )
         
         # Target subreddits for pain-related posts
         self.target_subreddits = [
@@ -51,88 +74,71 @@ class RedditScanner:
         ]
         
         # Pain-related keywords for detection
-        self.pain_keywords = [
-            'pain', 'hurt', 'ache', 'sore', 'relief', 'chronic', 'suffering',
-            'uncomfortable', 'stiff', 'tender', 'throbbing', 'burning',
-            'sharp', 'dull', 'constant', 'severe', 'mild', 'moderate',
-            'can\'t sleep', 'sleepless', 'insomnia', 'tired', 'exhausted',
-            'inflammation', 'swollen', 'numb', 'tingling', 'weakness',
-            'mobility', 'difficulty', 'struggle', 'help', 'solution',
-            'treatment', 'therapy', 'medication', 'supplement', 'device',
-            'product', 'recommend', 'suggestion', 'advice', 'what works'
-        ]
+        self.pain_keywords = list(PAIN_KEYWORDS)
+        
+        # Post classification runs in worker processes when configured
+        self.parse_pool = get_parse_pool()
         
         logger.info("RedditScanner initialized successfully")
     
     def _is_pain_related(self, text: str) -> bool:
         """Check if text contains pain-related keywords."""
-        text_lower = text.lower()
-        
-        # Check for direct keyword matches
-        for keyword in self.pain_keywords:
-            if keyword in text_lower:
-                return True
-        
-        # Check for pain-related patterns
-        pain_patterns = [
-            r'\b(my|have|got|experiencing)\s+\w*pain\w*',
-            r'\b(relief|help|solution)\s+(for|with|from)',
-            r'\b(what|any|best)\s+\w*\s+(works|helps|relieves)',
-            r'\b(recommend|suggest|advice)\s+\w*\s+(for|to)',
-            r'\b(can\'t|cannot|unable)\s+(sleep|walk|sit|stand|move)',
-            r'\b(need|looking for|searching for)\s+\w*\s+(help|relief|solution)'
-        ]
-        
-        for pattern in pain_patterns:
-            if re.search(pattern, text_lower):
-                return True
-        
-        return False
+        return is_pain_related(text, self.pain_keywords)
     
     def _extract_problem_category(self, title: str, content: str) -> str:
         """Extract problem category from post content."""
-        combined_text = f"{title} {content}".lower()
-        
-        categories = {
-            'Back Pain': ['back', 'spine', 'lumbar', 'sciatica', 'disc'],
-            'Neck Pain': ['neck', 'cervical', 'whiplash'],
-            'Knee Pain': ['knee', 'patella', 'meniscus'],
-            'Foot Care': ['foot', 'feet', 'plantar', 'heel', 'arch', 'toe'],
-            'Sleep Issues': ['sleep', 'insomnia', 'tired', 'exhausted', 'bed'],
-            'Joint Pain': ['joint', 'arthritis', 'rheumatoid', 'osteoarthritis'],
-            'Muscle Pain': ['muscle', 'strain', 'spasm', 'cramp'],
-            'Headache/Migraine': ['headache', 'migraine', 'head', 'temple'],
-            'Shoulder Pain': ['shoulder', 'rotator', 'cuff'],
-            'General Pain': ['chronic', 'fibromyalgia', 'widespread', 'overall']
-        }
+        return extract_problem_category(title, content)
+    
+    def _fetch_hot(self, subreddit_name: str, limit: int = 100):
+        """Fetch hot posts as PRAW submissions or compact records with the same attribute names."""
+        if self.json_client:
+            return self.json_client.listing(subreddit_name, 'hot', limit)
+        return self.reddit.subreddit(subreddit_name).hot(limit=limit)
+    
+    def fetch_engagement(self, fullnames: List[str]) -> Dict[str, Dict[str, int]]:
+        """Look up current score and comment count for posts by fullname, 100 per request."""
+        engagement = {}
         
-        for category, keywords in categories.items():
-            if any(keyword in combined_text for keyword in keywords):
-                return category
+        if self.json_client:
+            for post in self.json_client.info(fullnames):
+                engagement[f"t3_{post.id}"] = {'score': post.score, 'num_comments': post.num_comments}
+        else:
+            # PRAW batches fullnames into /api/info requests of 100
+            for submission in self.reddit.info(fullnames=fullnames):
+                engagement[submission.fullname] = {
+                    'score': submission.score,
+                    'num_comments': submission.num_comments
+                }
         
-        return 'General Pain'
+        return engagement
     
-    def scan_subreddit(self, subreddit_name: str, days_back: int = 7) -> List[Dict[str, Any]]:
-        """Scan a specific subreddit for pain-related posts."""
+    def scan_subreddit(self, subreddit_name: str, days_back: int = 7,
+                       limit: int = MAX_LISTING_LIMIT) -> List[Dict[str, Any]]:
+        """Scan a specific subreddit for pain-related posts among its `limit` hottest."""
         try:
-            subreddit = self.reddit.subreddit(subreddit_name)
             posts = []
             
             # Calculate cutoff date
             cutoff_date = datetime.now() - timedelta(days=days_back)
             
             # Get recent posts (hot, new, top)
-            for submission in subreddit.hot(limit=100):
-                post_date = datetime.fromtimestamp(submission.created_utc)
-                
+            submissions = []
+            for submission in self._fetch_hot(subreddit_name, limit):
                 # Skip posts older than cutoff
-                if post_date < cutoff_date:
+                if datetime.fromtimestamp(submission.created_utc) < cutoff_date:
                     continue
-                
+                submissions.append(submission)
+            
+            # Classify the whole batch at once (in worker processes when configured)
+            categories = self.parse_pool.classify_posts(
+                [(submission.title, submission.selftext) for submission in submissions],
+                self.pain_keywords
+            )
+            
+            for submission, category in zip(submissions, categories):
                 # Check if post is pain-related
-                full_text = f"{submission.title} {submission.selftext}"
-                if self._is_pain_related(full_text):
-                    category = self._extract_problem_category(submission.title, submission.selftext)
+                if category is not None:
+                    post_date = datetime.fromtimestamp(submission.created_utc)
                     
                     post_data = {
                         'title': submission.title,
@@ -148,7 +154,7 @@ class RedditScanner:
                     }
                     
                     posts.append(post_data)
-                    logger.info(f"Found pain-related post: {submission.title[:50]}...")
+                    logger.debug(f"Found pain-related post: {submission.title[:50]}...")
             
             logger.info(f"Found {len(posts)} pain-related posts in r/{subreddit_name}")
             return posts
@@ -157,15 +163,22 @@ class RedditScanner:
             logger.error(f"Error scanning r/{subreddit_name}: {e}")
             return []
     
-    def scan_all_subreddits(self, days_back: int = 7) -> List[Dict[str, Any]]:
-        """Scan all target subreddits for pain-related posts."""
+    def scan_all_subreddits(self, days_back: int = 7,
+                            post_limits: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Scan all target subreddits for pain-related posts.
+        
+        post_limits caps the posts fetched per subreddit; subreddits it gives
+        no posts are skipped.
+        """
         all_posts = []
+        subreddits = [s for s in self.target_subreddits if post_limits is None or post_limits.get(s, 0) > 0]
         
-        logger.info(f"Starting scan of {len(self.target_subreddits)} subreddits...")
+        logger.info(f"Starting scan of {len(subreddits)} subreddits...")
         
-        for subreddit_name in self.target_subreddits:
+        for subreddit_name in subreddits:
             try:
-                posts = self.scan_subreddit(subreddit_name, days_back)
+                limit = post_limits[subreddit_name] if post_limits else MAX_LISTING_LIMIT
+                posts = self.scan_subreddit(subreddit_name, days_back, limit)
                 all_posts.extend(posts)
                 
                 # Add small delay to avoid rate limiting
@@ -182,32 +195,48 @@ class RedditScanner:
         logger.info(f"Total pain-related posts found: {len(all_posts)}")
         return all_posts
     
-    def get_top_problems(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get top pain-related problems from Reddit."""
-        posts = self.scan_all_subreddits()
+    def get_top_problems(self, limit: Optional[int] = 20,
+                         post_limits: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Get top pain-related problems from Reddit (all of them if limit is None)."""
+        posts = self.scan_all_subreddits(post_limits=post_limits)
         
         # Filter and limit results
         top_posts = posts[:limit]
         
         # Format for easier processing
-        problems = []
-        for post in top_posts:
-            problem = {
-                'reddit_title': post['title'],
-                'reddit_content': post['content'],
-                'reddit_url': post['url'],
-                'category': post['category'],
-                'subreddit': post['subreddit'],
-                'score': post['score'],
-                'date': post['created_date'],
-                'search_query': self._generate_search_query(post['title'], post['content'])
-            }
-            problems.append(problem)
-        
-        return problems
+        return [self.post_to_problem(post) for post in top_posts]
     
-    def _generate_search_query(self, title: str, content: str) -> str:
-        """Generate TikTok search query from Reddit post."""
+    def post_to_problem(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a scanned post into a problem record."""
+        return {
+            'reddit_title': post['title'],
+            'reddit_content': post['content'],
+            'reddit_url': post['url'],
+            'category': post['category'],
+            'subreddit': post['subreddit'],
+            'score': post['score'],
+            'num_comments': post['num_comments'],
+            'date': post['created_date'],
+            'search_query': self._generate_search_query(post['title'], post['content']),
+            'query_template': 'keywords'
+        }
+    
+    def _generate_search_query(self, title: str, content: str, template: str = 'keywords',
+                               category: str = 'General Pain') -> str:
+        """Generate TikTok search query from Reddit post.
+        
+        'keywords' combines pain types and product words found in the post,
+        'category' searches for products for the problem category, and
+        'product' pairs the category with a product the post names.
+        """
+        if template == 'category':
+            return f"{category.split('/')[0].lower()} relief product"
+        
+        if template == 'product':
+            products = [term for term in extract_product_terms(f"{title} {content}") if ' ' not in term]
+            if products:
+                return f"{category.split('/')[0].lower()} {products[0]}"
+        
         # Combine title and content
         combined = f"{title} {content}".lower()
         
@@ -0,0 +1,48 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+class ScanCheckpoint:
+    """Persist in-progress scan state to local disk so a restart can resume it.
+    
+    State is written atomically (temp file + rename), so a crash mid-write
+    leaves the previous checkpoint intact.
+    """
+    
+    def __init__(self, path: str = 'scan_checkpoint.json', max_age_hours: float = 24):
+        """Initialize the checkpoint store."""
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+    
+    def save(self, state: Dict[str, Any]):
+        """Write the scan state to disk."""
+        state = dict(state, updated_at=time.time())
+        
+        with self._lock:
+            atomic_write_json(self.path, state, fsync=True)
+    
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load the last checkpoint, ignoring it if missing, corrupt or stale."""
+        with self._lock:
+            state = load_json(self.path, 'checkpoint')
+            if state is None:
+                return None
+        
+        age = time.time() - state.get('updated_at', 0)
+        if age > self.max_age_seconds:
+            logger.info(f"Ignoring checkpoint older than {self.max_age_seconds / 3600:.0f}h")
+            return None
+        
+        return state
+    
+    def clear(self):
+        """Remove the checkpoint after a cycle completes."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
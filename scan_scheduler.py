@@ -0,0 +1,282 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Container, Dict, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class ScheduledJob:
+    """A recurring job with its own cadence, priority and concurrency limit."""
+    
+    def __init__(self, name: str, func: Callable[[], object],
+                 interval: Union[float, Callable[[], float]], priority: int = 0,
+                 max_concurrency: int = 1, run_immediately: bool = True):
+        """Initialize a scheduled job.
+        
+        interval is either a number of seconds or a callable returning one,
+        so that cadence can adapt between runs.
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority
+        self.max_concurrency = max(1, max_concurrency)
+        
+        self.next_run = time.time() if run_immediately else time.time() + self.interval_seconds()
+        self.running = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.last_error: Optional[str] = None
+        
+        # Each job gets its own pool so a slow job can never starve another
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix=f"job-{name}"
+        )
+    
+    def interval_seconds(self) -> float:
+        """Return the current interval in seconds."""
+        interval = self.interval() if callable(self.interval) else self.interval
+        return max(1.0, float(interval))
+    
+    def is_due(self, now: float) -> bool:
+        """Check if the job should be dispatched now."""
+        return self.next_run <= now and self.running < self.max_concurrency
+
+class JobScheduler:
+    """In-process scheduler running independent jobs on separate worker pools.
+    
+    Due jobs are dispatched highest priority first. A job that is still
+    running at its concurrency limit stays due and is dispatched as soon as
+    a slot frees up, without holding back any other job.
+    """
+    
+    def __init__(self, max_running: Optional[int] = None):
+        """Initialize the scheduler.
+        
+        max_running optionally caps the number of job runs in flight across
+        all jobs; when the cap is reached, higher priority jobs go first.
+        """
+        self.max_running = max_running
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+    
+    def add_job(self, name: str, func: Callable[[], object],
+                interval: Union[float, Callable[[], float]], priority: int = 0,
+                max_concurrency: int = 1, run_immediately: bool = True) -> ScheduledJob:
+        """Register a recurring job."""
+        job = ScheduledJob(name, func, interval, priority, max_concurrency, run_immediately)
+        with self._condition:
+            self.jobs[name] = job
+            self._condition.notify()
+        logger.info(f"Scheduled job '{name}' every {job.interval_seconds():.0f}s "
+                    f"(priority {priority}, concurrency {job.max_concurrency})")
+        return job
+    
+    def trigger(self, name: str):
+        """Make a job due immediately."""
+        with self._condition:
+            job = self.jobs.get(name)
+            if job:
+                job.next_run = min(job.next_run, time.time())
+                self._condition.notify()
+    
+    def _total_running(self) -> int:
+        return sum(job.running for job in self.jobs.values())
+    
+    def _dispatch_due(self, now: float) -> List[ScheduledJob]:
+        """Pick due jobs in priority order, respecting concurrency limits."""
+        due = [job for job in self.jobs.values() if job.is_due(now)]
+        due.sort(key=lambda job: (-job.priority, job.next_run))
+        
+        dispatched = []
+        running = self._total_running()
+        for job in due:
+            if self.max_running is not None and running >= self.max_running:
+                break
+            job.running += 1
+            job.next_run = now + job.interval_seconds()
+            running += 1
+            dispatched.append(job)
+        
+        return dispatched
+    
+    def _run_job(self, job: ScheduledJob):
+        """Execute a job and record its outcome."""
+        start = time.time()
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Job '{job.name}' failed: {e}")
+        finally:
+            with self._condition:
+                job.running -= 1
+                job.runs += 1
+                job.last_duration = time.time() - start
+                self._condition.notify()
+    
+    def _seconds_until_next(self, now: float) -> float:
+        """Time until the next job could be dispatched."""
+        waiting = [job.next_run - now for job in self.jobs.values()
+                   if job.running < job.max_concurrency]
+        if not waiting:
+            return 60.0
+        return min(60.0, max(0.0, min(waiting)))
+    
+    def run_forever(self):
+        """Dispatch jobs until stop is called."""
+        logger.info(f"Job scheduler started with {len(self.jobs)} jobs")
+        
+        with self._condition:
+            while not self._stopped:
+                now = time.time()
+                for job in self._dispatch_due(now):
+                    job.executor.submit(self._run_job, job)
+                
+                self._condition.wait(timeout=self._seconds_until_next(time.time()))
+        
+        logger.info("Job scheduler stopped")
+    
+    def stop(self, wait: bool = False):
+        """Stop dispatching jobs and shut down the worker pools."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        
+        for job in self.jobs.values():
+            job.executor.shutdown(wait=wait)
+    
+    def get_status(self) -> Dict[str, Dict[str, object]]:
+        """Return a snapshot of job state."""
+        with self._condition:
+            return {
+                name: {
+                    'priority': job.priority,
+                    'interval_seconds': round(job.interval_seconds(), 1),
+                    'running': job.running,
+                    'runs': job.runs,
+                    'failures': job.failures,
+                    'last_duration': round(job.last_duration, 2),
+                    'last_error': job.last_error,
+                    'next_run_in': round(max(0.0, job.next_run - time.time()), 1)
+                }
+                for name, job in self.jobs.items()
+            }
+
+class YieldTracker:
+    """Track per-key yield and derive refresh intervals from it.
+    
+    Yield is an exponentially weighted average of results per attempt. Keys
+    with the highest yield are refreshed up to 1 / min_factor times more
+    often than the base interval; keys with no yield stay at the base.
+    """
+    
+    def __init__(self, alpha: float = 0.3, min_factor: float = 0.25):
+        """Initialize the tracker."""
+        self.alpha = alpha
+        self.min_factor = min_factor
+        self.scores: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, key: str, produced: int, attempts: int = 1):
+        """Record that attempts units of work on key produced produced results."""
+        observed = produced / max(1, attempts)
+        with self._lock:
+            previous = self.scores.get(key)
+            if previous is None:
+                self.scores[key] = observed
+            else:
+                self.scores[key] = self.alpha * observed + (1 - self.alpha) * previous
+    
+    def hotness(self, key: str) -> float:
+        """Return the key's yield relative to the best key, in [0, 1]."""
+        with self._lock:
+            best = max(self.scores.values(), default=0.0)
+            if best <= 0:
+                return 0.0
+            return self.scores.get(key, 0.0) / best
+    
+    def interval_for(self, key: str, base_seconds: float, hotness: Optional[float] = None) -> float:
+        """Return the refresh interval for a key given a base interval."""
+        if hotness is None:
+            hotness = self.hotness(key)
+        factor = 1.0 - (1.0 - self.min_factor) * min(1.0, max(0.0, hotness))
+        return base_seconds * factor
+
+class CycleGoal:
+    """Stopping rules for one scan cycle, checked as matches arrive.
+    
+    Matches are checked against a dedup index of (Reddit title, TikTok URL)
+    keys, checked against the keys already in the sheet, so only new unique
+    matches count. The cycle is done once target_new_matches are found or
+    its wall-clock or browser-time budget is spent; a category stops taking
+    matches once it has category_quota of them. A limit of 0 is no limit.
+    """
+    
+    def __init__(self, target_new_matches: int = 0, category_quota: int = 0,
+                 time_budget_seconds: float = 0, browser_budget_seconds: float = 0,
+                 known_keys: Optional[Container[Tuple[str, str]]] = None):
+        """Initialize the goal; the wall-clock budget starts now."""
+        self.target_new_matches = target_new_matches
+        self.category_quota = category_quota
+        self.time_budget_seconds = time_budget_seconds
+        self.browser_budget_seconds = browser_budget_seconds
+        self.started = time.time()
+        self.browser_seconds = 0.0
+        self.new_matches = 0
+        self.category_counts: Dict[str, int] = {}
+        self._known = known_keys if known_keys is not None else set()
+        self._keys: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(match: Dict) -> Tuple[str, str]:
+        """Dedup key of a match, as the sheet compares them."""
+        return (match.get('reddit_title', '').lower(), match.get('tiktok_url', ''))
+    
+    def admit(self, matches: List[Dict]) -> List[Dict]:
+        """Return the matches that are new and within their category's quota, and count them."""
+        admitted = []
+        
+        with self._lock:
+            for match in matches:
+                key = self.key(match)
+                category = match.get('category', '')
+                if key in self._keys or key in self._known:
+                    continue
+                if self.category_quota and self.category_counts.get(category, 0) >= self.category_quota:
+                    continue
+                
+                self._keys.add(key)
+                self.category_counts[category] = self.category_counts.get(category, 0) + 1
+                self.new_matches += 1
+                admitted.append(match)
+        
+        return admitted
+    
+    def record_browser_time(self, seconds: float):
+        """Charge time spent in live TikTok searches to the browser budget."""
+        with self._lock:
+            self.browser_seconds += seconds
+    
+    def category_full(self, category: str) -> bool:
+        """Whether a category has reached its quota."""
+        with self._lock:
+            return bool(self.category_quota) and self.category_counts.get(category, 0) >= self.category_quota
+    
+    def reason(self) -> Optional[str]:
+        """Why the cycle should stop now, or None to keep going."""
+        with self._lock:
+            if self.target_new_matches and self.new_matches >= self.target_new_matches:
+                return f"found {self.new_matches} new matches"
+            if self.time_budget_seconds and time.time() - self.started >= self.time_budget_seconds:
+                return f"used its {self.time_budget_seconds / 60:.0f}-minute time budget"
+            if self.browser_budget_seconds and self.browser_seconds >= self.browser_budget_seconds:
+                return f"used its {self.browser_budget_seconds / 60:.0f} browser-minutes"
+            return None
@@ -0,0 +1,212 @@
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+    
+    Every successful request grows the limit by about one slot per window
+    of requests; every blocked request cuts it by decrease_factor.
+    """
+    
+    def __init__(self, min_limit: int = 1, max_limit: int = 4, initial_limit: float = 1.0,
+                 decrease_factor: float = 0.5):
+        """Initialize the controller."""
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, timeout: float = None) -> bool:
+        """Wait for a free slot under the current limit."""
+        deadline = None if timeout is None else time.time() + timeout
+        
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            
+            self.in_flight += 1
+            return True
+    
+    def release(self, success: Optional[bool]):
+        """Free a slot and adjust the limit from the request's outcome (None leaves it as is)."""
+        with self._condition:
+            self.in_flight -= 1
+            
+            if success:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            elif success is not None:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            
+            self._condition.notify_all()
+
+class CircuitBreaker:
+    """Stop sending requests after repeated blocks, then probe for recovery.
+    
+    closed: requests flow. open: requests are refused until the cooldown
+    passes. half_open: a single probe request is let through; success
+    closes the circuit, failure reopens it with a doubled cooldown.
+    
+    Every state change starts a new generation, and each request is tagged
+    with the generation it was let through in. Outcomes of requests from an
+    earlier generation are ignored, so a slow request sent before the
+    circuit opened can't close it in place of the probe.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 300,
+                 max_cooldown_seconds: float = 3600):
+        """Initialize the circuit breaker."""
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max(cooldown_seconds, max_cooldown_seconds)
+        self.cooldown = cooldown_seconds
+        
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.generation = 1
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> Optional[int]:
+        """Return the generation a request sent now belongs to, or None if it may not be sent."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.generation
+            
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self.generation += 1
+                logger.info("Circuit half-open, sending a probe request")
+            
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return self.generation
+            
+            return None
+    
+    def record_success(self, generation: int):
+        """Record a successful request."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            
+            if self.state == self.HALF_OPEN:
+                logger.info("Probe succeeded, circuit closed")
+                self.state = self.CLOSED
+                self.generation += 1
+                self.cooldown = self.base_cooldown
+                self.probe_in_flight = False
+            self.consecutive_failures = 0
+    
+    def record_failure(self, generation: int):
+        """Record a blocked request."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            
+            self.consecutive_failures += 1
+            
+            if self.state == self.HALF_OPEN:
+                # Still blocked: back off for longer
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+            
+            self.probe_in_flight = False
+    
+    def record_inconclusive(self, generation: int):
+        """Record a request that failed for reasons unrelated to blocking."""
+        with self._lock:
+            if generation == self.generation and self.state == self.HALF_OPEN:
+                # Let another probe through
+                self.probe_in_flight = False
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.generation += 1
+        self.opened_at = time.time()
+        logger.warning(f"Circuit open after {self.consecutive_failures} blocked requests, "
+                       f"cooling down for {self.cooldown:.0f}s")
+    
+    def seconds_until_retry(self) -> float:
+        """Time left in the current cooldown."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.time())
+
+class ScrapeBlockedError(Exception):
+    """Raised when the site is blocking us or the circuit is open."""
+
+class ScrapeGuard:
+    """Adaptive concurrency and circuit breaking for one scraped site."""
+    
+    def __init__(self, controller: AIMDController, breaker: CircuitBreaker):
+        """Initialize the guard."""
+        self.controller = controller
+        self.breaker = breaker
+        self.blocked_requests = 0
+        self.total_requests = 0
+    
+    def begin(self, timeout: float = None) -> Optional[int]:
+        """Take a concurrency slot for one request.
+        
+        Returns a ticket (the breaker generation) to hand back to end().
+        Raises ScrapeBlockedError while the circuit is open. Returns None if
+        no slot frees up within the timeout.
+        """
+        ticket = self.breaker.allow_request()
+        if ticket is None:
+            raise ScrapeBlockedError(
+                f"circuit open, retry in {self.breaker.seconds_until_retry():.0f}s"
+            )
+        
+        if not self.controller.acquire(timeout):
+            self.breaker.record_inconclusive(ticket)
+            return None
+        
+        self.total_requests += 1
+        return ticket
+    
+    def end(self, ticket: int, blocked: Optional[bool]):
+        """Release a slot: blocked=True shrinks the limit and counts towards opening
+        the circuit, False grows it, None (unrelated failure) changes nothing."""
+        if blocked:
+            self.blocked_requests += 1
+            self.controller.release(success=False)
+            self.breaker.record_failure(ticket)
+        elif blocked is None:
+            self.controller.release(success=None)
+            self.breaker.record_inconclusive(ticket)
+        else:
+            self.controller.release(success=True)
+            self.breaker.record_success(ticket)
+    
+    def is_open(self) -> bool:
+        """Check whether requests are currently refused, without using up a probe."""
+        return self.breaker.seconds_until_retry() > 0
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Return a snapshot of the guard state."""
+        return {
+            'concurrency_limit': round(self.controller.limit, 2),
+            'in_flight': self.controller.in_flight,
+            'circuit': self.breaker.state,
+            'retry_in_seconds': round(self.breaker.seconds_until_retry()),
+            'blocked_requests': self.blocked_requests,
+            'total_requests': self.total_requests
+        }
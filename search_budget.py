@@ -0,0 +1,147 @@
+import time
+import random
+import logging
+import threading
+from typing import Dict, List
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+class BudgetBandit:
+    """Split a search budget between arms by how many sheet matches each produces per unit of cost.
+    
+    Arms are strings such as 'subreddit:backpain' or 'category:Foot Care'.
+    Each arm's match rate per unit of cost (an API call, a browser-minute)
+    has a Gamma posterior; budgets are split by Thompson sampling from it, so
+    proven arms get most of the budget while uncertain ones are still tried
+    now and then. Old observations are discounted each round so the
+    allocation follows yields that change over time. Observations are saved
+    at most every `save_interval` seconds as they come in, so costs of scans
+    that found nothing survive a restart too.
+    """
+    
+    def __init__(self, path: str = 'search_budget.json', discount: float = 0.98,
+                 prior_matches: float = 1.0, prior_cost: float = 1.0, save_interval: float = 60):
+        """Initialize the bandit and load any saved observations."""
+        self.path = path
+        self.discount = discount
+        self.prior_matches = prior_matches
+        self.prior_cost = prior_cost
+        self.save_interval = save_interval
+        self._saved_at = time.time()
+        self._lock = threading.Lock()
+        self.arms: Dict[str, Dict[str, float]] = load_json(self.path, 'search budget file', {})
+    
+    def _arm(self, arm: str) -> Dict[str, float]:
+        return self.arms.setdefault(arm, {'matches': 0.0, 'cost': 0.0})
+    
+    def record_cost(self, arm: str, cost: float = 1.0):
+        """Record budget spent on an arm."""
+        with self._lock:
+            self._arm(arm)['cost'] += cost
+        self._save_if_due()
+    
+    def record_reward(self, arm: str, matches: float = 1.0):
+        """Record new sheet matches an arm produced."""
+        with self._lock:
+            self._arm(arm)['matches'] += matches
+        self._save_if_due()
+    
+    def _save_if_due(self):
+        """Save if the last save is more than save_interval seconds old."""
+        if time.time() - self._saved_at < self.save_interval:
+            return
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Failed to save search budget: {e}")
+    
+    def _sample(self, arm: str) -> float:
+        """Draw a match rate from the arm's posterior (call with the lock held)."""
+        stats = self._arm(arm)
+        return random.gammavariate(self.prior_matches + stats['matches'], 1.0 / (self.prior_cost + stats['cost']))
+    
+    def decay(self, arms: List[str]):
+        """Start a new round for arms picked with choose(), discounting their observations."""
+        with self._lock:
+            self._decay(arms)
+    
+    def _decay(self, arms: List[str]):
+        for arm in arms:
+            stats = self._arm(arm)
+            stats['matches'] *= self.discount
+            stats['cost'] *= self.discount
+    
+    def choose(self, arms: List[str]) -> str:
+        """Pick one arm, each with the probability that it has the best rate.
+        
+        Doesn't discount anything, since it is called once per item; call
+        decay() once per round for these arms.
+        """
+        with self._lock:
+            return max(arms, key=self._sample)
+    
+    def allocate(self, arms: List[str], total: int, minimum: int = 1,
+                 maximum: int = None) -> Dict[str, int]:
+        """Split total units between arms in proportion to sampled rates.
+        
+        Arms whose share would fall below minimum get nothing this round and
+        their share goes to the others; no arm gets more than maximum. Starts
+        a new round, so observations so far are discounted.
+        """
+        if not arms:
+            return {}
+        
+        with self._lock:
+            self._decay(arms)
+            rates = {arm: self._sample(arm) for arm in arms}
+        
+        # The lowest arm drops out while it can't reach the minimum, but one arm always stays
+        active = sorted(arms, key=rates.get, reverse=True)
+        shares = self._split(active, rates, total, maximum)
+        while len(active) > 1 and shares[active[-1]] < minimum:
+            active.pop()
+            shares = self._split(active, rates, total, maximum)
+        
+        allocation = {arm: int(shares.get(arm, 0)) for arm in arms}
+        # Hand out the units lost to rounding down, largest remainders first
+        leftover = round(sum(shares.values())) - sum(allocation.values())
+        for arm in sorted(shares, key=lambda a: shares[a] - int(shares[a]), reverse=True)[:leftover]:
+            allocation[arm] += 1
+        
+        self._save_if_due()
+        return allocation
+    
+    @staticmethod
+    def _split(arms: List[str], rates: Dict[str, float], total: int, maximum: int = None) -> Dict[str, float]:
+        """Proportional shares of total, with shares over maximum capped and the excess re-split."""
+        shares = {}
+        free = list(arms)
+        remaining = total
+        
+        while free:
+            weight = sum(rates[arm] for arm in free)
+            over = [arm for arm in free if maximum is not None and remaining * rates[arm] / weight > maximum]
+            if not over:
+                shares.update({arm: remaining * rates[arm] / weight for arm in free})
+                break
+            for arm in over:
+                shares[arm] = maximum
+                remaining -= maximum
+                free.remove(arm)
+        
+        return shares
+    
+    def get_status(self, prefix: str = '') -> Dict[str, float]:
+        """Mean match rate per arm, optionally only arms starting with prefix."""
+        with self._lock:
+            return {
+                arm: round((self.prior_matches + stats['matches']) / (self.prior_cost + stats['cost']), 3)
+                for arm, stats in self.arms.items() if arm.startswith(prefix)
+            }
+    
+    def save(self):
+        """Write the observations to disk atomically."""
+        with self._lock:
+            self._saved_at = time.time()
+            atomic_write_json(self.path, self.arms)
@@ -0,0 +1,167 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from json_store import atomic_open, atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+MatchKey = Tuple[str, str]
+
+def partition_title(base: str, when: datetime) -> str:
+    """Worksheet title of the monthly partition holding `when`, e.g. Product_Matches_2026_10."""
+    return f"{base}_{when:%Y_%m}"
+
+def partition_month(base: str, title: str) -> Optional[datetime]:
+    """First day of the month a partition title covers, or None if it isn't a partition."""
+    match = re.fullmatch(re.escape(base) + r'_(\d{4})_(\d{2})', title)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+def partition_end(month: datetime) -> datetime:
+    """First day of the month after a partition's month."""
+    return (month + timedelta(days=32)).replace(day=1)
+
+def key_digest(key: MatchKey) -> str:
+    """Short stable digest of a (Reddit title, TikTok URL) key."""
+    return hashlib.blake2b('\t'.join(key).encode('utf-8'), digest_size=8).hexdigest()
+
+def archive_rows(path: str, headers: List[str], rows: List[List[str]]):
+    """Write worksheet rows as gzipped JSON lines, one object per row."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    with atomic_open(path, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(headers, row + [''] * (len(headers) - len(row))))) + '\n')
+
+def read_archive(path: str) -> List[Dict[str, Any]]:
+    """Read the rows of an archived partition."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class PartitionIndex:
+    """Which worksheet partition (or archive file) holds each match key.
+    
+    Keys are stored as short digests, so the index stays small while the
+    hot worksheet only holds the current month and older months live in
+    other worksheets or compressed archives.
+    """
+    
+    def __init__(self, path: str = 'sheet_partitions.json'):
+        """Initialize the index and load it from disk if present."""
+        self.path = path
+        self._lock = threading.Lock()
+        state = load_json(self.path, 'partition index', {})
+        self.partitions: Dict[str, Dict[str, Any]] = state.get('partitions', {})
+        self.keys: Dict[str, str] = state.get('keys', {})
+    
+    def add(self, title: str, keys: Iterable[MatchKey], rows: int = None):
+        """Record keys as held by a partition."""
+        with self._lock:
+            partition = self.partitions.setdefault(title, {'rows': 0, 'archive': None})
+            for key in keys:
+                self.keys[key_digest(key)] = title
+            if rows is not None:
+                partition['rows'] = rows
+    
+    def mark_archived(self, title: str, path: str, rows: int):
+        """Record that a partition's rows now live in an archive file."""
+        with self._lock:
+            self.partitions.setdefault(title, {})
+            self.partitions[title].update({'rows': rows, 'archive': path})
+    
+    def partition_of(self, key: MatchKey) -> Optional[str]:
+        """Partition holding a key, if any."""
+        with self._lock:
+            return self.keys.get(key_digest(key))
+    
+    def __contains__(self, key: MatchKey) -> bool:
+        return self.partition_of(key) is not None
+    
+    def has(self, title: str) -> bool:
+        """Whether a partition's keys have been indexed."""
+        with self._lock:
+            return title in self.partitions
+    
+    def save(self):
+        """Write the index to disk atomically."""
+        with self._lock:
+            atomic_write_json(self.path, {'partitions': self.partitions, 'keys': self.keys})
+
+class KnownMatchKeys:
+    """Match keys in the hot worksheet plus those the partition index knows about."""
+    
+    def __init__(self, hot: Set[MatchKey], index: Optional[PartitionIndex] = None):
+        """Initialize from the hot worksheet's keys and the index of older partitions."""
+        self.hot = hot
+        self.index = index
+    
+    def __contains__(self, key: MatchKey) -> bool:
+        return key in self.hot or (self.index is not None and key in self.index)
+
+class RowIndex:
+    """Row number and status of each match key in the hot worksheet, kept on disk.
+    
+    Lets a new process (a status update from the command line, say) find
+    rows without reading the whole worksheet. The index is only valid for
+    the worksheet title and row count it was built from.
+    """
+    
+    def __init__(self, path: str = 'sheet_row_index.json'):
+        """Initialize the index and load it from disk if present."""
+        self.path = path
+        self._lock = threading.Lock()
+        state = load_json(self.path, 'row index', {})
+        self.title: Optional[str] = state.get('title')
+        self.row_count: int = state.get('row_count', 0)
+        self.rows: Dict[str, int] = state.get('rows', {})
+        self.statuses: Dict[int, str] = {int(row): status for row, status in state.get('statuses', {}).items()}
+    
+    def reset(self, title: Optional[str], row_count: int = 0):
+        """Start over for a worksheet (None marks the index as unknown)."""
+        with self._lock:
+            self.title = title
+            self.row_count = row_count
+            self.rows = {}
+            self.statuses = {}
+    
+    def add(self, key: MatchKey, row_number: int, status: str):
+        """Record a row; a key already indexed keeps its first row."""
+        with self._lock:
+            self.rows.setdefault(key_digest(key), row_number)
+            self.statuses[row_number] = status
+            self.row_count = max(self.row_count, row_number)
+    
+    def row_of(self, key: MatchKey) -> Optional[int]:
+        """Row holding a key, if indexed."""
+        with self._lock:
+            return self.rows.get(key_digest(key))
+    
+    def __contains__(self, key: MatchKey) -> bool:
+        return self.row_of(key) is not None
+    
+    def status_of(self, row_number: int) -> Optional[str]:
+        """Last known status of a row."""
+        with self._lock:
+            return self.statuses.get(row_number)
+    
+    def set_status(self, row_number: int, status: str):
+        """Record a row's new status."""
+        with self._lock:
+            self.statuses[row_number] = status
+    
+    def save(self):
+        """Write the index to disk atomically."""
+        with self._lock:
+            atomic_write_json(self.path, {
+                'title': self.title,
+                'row_count': self.row_count,
+                'rows': self.rows,
+                'statuses': self.statuses
+            })
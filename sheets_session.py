@@ -0,0 +1,192 @@
+import os
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set, Tuple
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+
+logger = logging.getLogger(__name__)
+
+SCOPE = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+class SheetsSession:
+    """One authorized Google Sheets client per service account, shared in-process.
+    
+    Spreadsheet and worksheet handles are cached by spreadsheet ID, so a
+    spreadsheet name costs a single Drive search per process, and header
+    validation is tracked so it runs once per worksheet per process.
+    """
+    
+    def __init__(self, service_account_file: str, refresh_margin_seconds: int = 300):
+        """Initialize the session and authorize the client."""
+        self.service_account_file = service_account_file
+        self.refresh_margin_seconds = refresh_margin_seconds
+        
+        self._lock = threading.RLock()
+        self._spreadsheet_ids: Dict[str, str] = {}
+        self._spreadsheets: Dict[str, gspread.Spreadsheet] = {}
+        self._worksheets: Dict[Tuple[str, str], gspread.Worksheet] = {}
+        self._validated: Set[Tuple[str, str]] = set()
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
+        
+        self.client = self._authorize()
+    
+    def _authorize(self) -> gspread.Client:
+        """Set up Google Sheets API connection."""
+        try:
+            # Add credentials to the account
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(
+                self.service_account_file, SCOPE
+            )
+            
+            # Authorize the client
+            gc = gspread.authorize(credentials)
+            logger.info("Google Sheets API connection established")
+            return gc
+        
+        except Exception as e:
+            logger.error(f"Failed to setup Google Sheets connection: {e}")
+            raise
+    
+    def open_spreadsheet(self, name: str = None, key: str = None,
+                         create: bool = False) -> gspread.Spreadsheet:
+        """Open a spreadsheet by key, or by name with the name resolved once per process."""
+        with self._lock:
+            if not key and name in self._spreadsheet_ids:
+                key = self._spreadsheet_ids[name]
+            
+            if key and key in self._spreadsheets:
+                return self._spreadsheets[key]
+            
+            if key:
+                sheet = self.client.open_by_key(key)
+            else:
+                try:
+                    sheet = self.client.open(name)
+                    logger.info(f"Opened existing sheet: {name}")
+                except gspread.SpreadsheetNotFound:
+                    if not create:
+                        raise
+                    # Create new sheet if it doesn't exist
+                    sheet = self.client.create(name)
+                    logger.info(f"Created new sheet: {name}")
+            
+            if name:
+                self._spreadsheet_ids[name] = sheet.id
+            self._spreadsheets[sheet.id] = sheet
+            return sheet
+    
+    def get_worksheet(self, sheet: gspread.Spreadsheet, title: str,
+                      rows: int = 1000, cols: int = 26,
+                      on_create: Optional[Callable[[gspread.Worksheet], None]] = None,
+                      create: bool = False) -> gspread.Worksheet:
+        """Return a cached worksheet handle, creating the worksheet if requested."""
+        cache_key = (sheet.id, title)
+        
+        with self._lock:
+            if cache_key in self._worksheets:
+                return self._worksheets[cache_key]
+            
+            try:
+                worksheet = sheet.worksheet(title)
+                logger.info(f"Found existing worksheet: {title}")
+            except gspread.WorksheetNotFound:
+                if not create:
+                    raise
+                worksheet = sheet.add_worksheet(title=title, rows=rows, cols=cols)
+                logger.info(f"Created new worksheet: {title}")
+                if on_create:
+                    on_create(worksheet)
+            
+            self._worksheets[cache_key] = worksheet
+            return worksheet
+    
+    def forget_worksheet(self, sheet_id: str, title: str):
+        """Drop a cached worksheet handle, e.g. after the worksheet is deleted."""
+        with self._lock:
+            self._worksheets.pop((sheet_id, title), None)
+            self._validated.discard((sheet_id, title))
+    
+    def is_validated(self, worksheet: gspread.Worksheet) -> bool:
+        """Check whether headers were already validated in this process."""
+        with self._lock:
+            return (worksheet.spreadsheet.id, worksheet.title) in self._validated
+    
+    def mark_validated(self, worksheet: gspread.Worksheet):
+        """Record that a worksheet's headers have been validated."""
+        with self._lock:
+            self._validated.add((worksheet.spreadsheet.id, worksheet.title))
+    
+    def _token_expiry(self) -> Optional[datetime]:
+        """Expiry of the current access token, if the credentials expose it."""
+        auth = getattr(self.client, 'auth', None)
+        return getattr(auth, 'expiry', None)
+    
+    def refresh_token(self):
+        """Refresh the access token now."""
+        auth = getattr(self.client, 'auth', None)
+        
+        if hasattr(auth, 'refresh'):
+            from google.auth.transport.requests import Request
+            auth.refresh(Request())
+        else:
+            # Older clients keep oauth2client credentials around
+            self.client.login()
+        
+        logger.info("Refreshed Google Sheets access token")
+    
+    def _refresh_loop(self):
+        """Refresh the token ahead of expiry so requests never wait on it."""
+        while not self._stop_refresh.is_set():
+            expiry = self._token_expiry()
+            if expiry is None:
+                # No token issued yet (or no expiry exposed): refresh on a fixed cadence
+                wait = 45 * 60
+            else:
+                wait = (expiry - datetime.utcnow()).total_seconds() - self.refresh_margin_seconds
+            
+            if self._stop_refresh.wait(max(0.0, wait)):
+                break
+            
+            try:
+                self.refresh_token()
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+                self._stop_refresh.wait(60)
+    
+    def start_token_refresh(self):
+        """Start the background token refresh thread."""
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            
+            self._stop_refresh.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name='sheets-token-refresh', daemon=True
+            )
+            self._refresh_thread.start()
+    
+    def stop_token_refresh(self):
+        """Stop the background token refresh thread."""
+        self._stop_refresh.set()
+
+_sessions: Dict[str, SheetsSession] = {}
+_sessions_lock = threading.Lock()
+
+def get_sheets_session(service_account_file: str) -> SheetsSession:
+    """Return the shared session for a service account file, creating it once."""
+    path = os.path.abspath(service_account_file)
+    
+    with _sessions_lock:
+        session = _sessions.get(path)
+        if session is None:
+            session = SheetsSession(service_account_file)
+            session.start_token_refresh()
+            _sessions[path] = session
+        
+        return session
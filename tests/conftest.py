@@ -0,0 +1,11 @@
+import pytest
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """A ProductFinderBot without external services, keeping its state files in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SCAN_CHECKPOINT_FILE', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setenv('METRICS_FILE', str(tmp_path / 'metrics.json'))
+    monkeypatch.setenv('ENABLE_SEARCH_BUDGET', 'false')
+    from product_finder_bot import ProductFinderBot
+    return ProductFinderBot()
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+import metrics_store
+from metrics_store import DAY, HOUR, RESOLUTIONS, MetricsStore
+
+NOW = 1_800_000_000.0
+
+def test_summary_over_window(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.json'))
+    store.record('scan_seconds', 2, when=NOW - 30)
+    store.record('scan_seconds', 4, when=NOW - 90)
+    store.record('scan_seconds', 100, when=NOW - 2 * HOUR)
+    
+    assert store.summary('scan_seconds', HOUR, NOW) == {'count': 2, 'sum': 6, 'mean': 3.0, 'max': 4}
+    assert store.summary('scan_seconds', DAY, NOW)['count'] == 3
+    assert store.summary('missing', HOUR, NOW)['count'] == 0
+
+def test_ring_reuses_buckets_that_rolled_out(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.json'))
+    width, size = RESOLUTIONS['minute']
+    store.record('scans', when=NOW)
+    store.record('scans', when=NOW + width * size)
+    
+    ring = store.series['scans']['minute']
+    assert len(ring) == size
+    assert sum(bucket[1] for bucket in ring if bucket) == 1
+    assert store.totals['scans'] == 2
+
+def test_older_record_does_not_overwrite_newer_bucket(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.json'))
+    width, size = RESOLUTIONS['minute']
+    store.record('scans', when=NOW)
+    store.record('scans', when=NOW - width * size)
+    
+    assert store.summary('scans', 60, NOW + 1)['count'] == 1
+
+def test_trend_compares_with_previous_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_store, 'time', SimpleNamespace(time=lambda: NOW))
+    store = MetricsStore(str(tmp_path / 'metrics.json'), save_interval=3600)
+    store.record('matches_added', 4, when=NOW - 10)
+    store.record('matches_added', 2, when=NOW - HOUR - 10)
+    
+    assert store.trend('matches_added', HOUR) == {'current': 4, 'previous': 2, 'change_pct': 100.0}
+
+def test_series_and_totals_survive_restart(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    store = MetricsStore(path)
+    store.record('scans', when=NOW)
+    store.save()
+    
+    restored = MetricsStore(path)
+    assert restored.totals == {'scans': 1}
+    assert restored.last_recorded == {'scans': NOW}
+    assert restored.summary('scans', HOUR, NOW + 1)['count'] == 1
+
+def test_stats_totals_come_from_the_metrics_store(bot, tmp_path, monkeypatch):
+    bot._count('scans')
+    bot._count('matches_added', 3)
+    bot.metrics.save()
+    
+    monkeypatch.setenv('METRICS_FILE', str(tmp_path / 'metrics.json'))
+    from product_finder_bot import ProductFinderBot
+    stats = ProductFinderBot().get_stats()
+    
+    assert stats['total_scans'] == 1
+    assert stats['total_matches_added'] == 3
+    assert stats['last_scan_time'] is not None
@@ -0,0 +1,99 @@
+from near_duplicates import SimHashIndex, VideoFingerprintIndex, hamming_distance, simhash
+
+TEXT = 'my lower back hurts every morning after sleeping on this old mattress what helps'
+
+def problem(n: int, title: str):
+    return {
+        'reddit_url': f'https://reddit.com/r/test/comments/p{n}/post/',
+        'reddit_title': title,
+        'reddit_content': '',
+        'subreddit': 'test',
+        'category': 'pain',
+        'score': 100,
+        'search_query': f'query {n}'
+    }
+
+def test_similar_texts_get_close_fingerprints():
+    assert simhash(TEXT) == simhash(TEXT.upper() + '!')
+    assert hamming_distance(simhash(TEXT), simhash(TEXT + ' please')) <= 8
+    assert hamming_distance(simhash(TEXT), simhash('cheap phone stand for my desk setup')) > 16
+
+def test_index_finds_keys_within_distance():
+    index = SimHashIndex(max_distance=3)
+    index.add('a', 0b0001)
+    index.add('b', 0b0111)
+    index.add('far', (1 << 64) - 1)
+    
+    assert index.within(0) == [('a', 1), ('b', 3)]
+    assert index.nearest(0b0110) == ('b', 1)
+    assert index.nearest(1 << 40 | 1 << 50 | 1 << 60 | 1 << 20) is None
+
+def test_index_remove():
+    index = SimHashIndex(max_distance=3)
+    index.add('a', 0b0001)
+    index.remove('a')
+    index.remove('missing')
+    
+    assert index.nearest(0b0001) is None
+    assert len(index) == 0
+
+def test_near_duplicate_problem_is_folded_into_queued_one(bot):
+    assert bot._enqueue_problems([problem(1, TEXT), problem(2, TEXT + '?')]) == 2
+    
+    assert [p['reddit_url'] for p in bot.pending_problems] == [problem(1, TEXT)['reddit_url']]
+    duplicate = bot.pending_problems[0]['duplicates'][0]
+    assert duplicate['reddit_url'] == problem(2, TEXT)['reddit_url']
+    assert duplicate['search_query'] == 'query 1'
+
+def test_problem_representatives_are_capped(bot):
+    bot.max_problem_reps = 2
+    titles = [TEXT, 'cheap phone stand for my desk setup at home', 'best shoes for standing all day at work']
+    bot._enqueue_problems([problem(n, title) for n, title in enumerate(titles)])
+    
+    assert list(bot._problem_reps) == [problem(1, '')['reddit_url'], problem(2, '')['reddit_url']]
+    assert len(bot._problem_index) == 2
+    
+    # The evicted representative no longer folds its duplicates
+    bot._enqueue_problems([problem(3, TEXT + '?')])
+    assert len(bot.pending_problems) == 4
+
+CLIP = 'amazing kitchen gadget slices vegetables instantly best tool for meal prep every home cook needs this chopper'
+
+def video(n: int, description: str = CLIP, duration: int = 30, views: int = 10):
+    return {'url': f'https://tiktok.com/@u{n}/video/{n}', 'description': description,
+            'duration': duration, 'views': views, 'author': f'u{n}'}
+
+def test_reposts_collapse_into_first_video():
+    index = VideoFingerprintIndex()
+    collapsed = index.collapse([video(1), video(2, CLIP + ' wow', views=5), video(3, 'something else entirely here today')])
+    
+    assert [v['url'] for v in collapsed] == [video(1)['url'], video(3)['url']]
+    assert collapsed[0]['views'] == 15
+    assert collapsed[0]['reposts'] == 1
+
+def test_duration_is_checked_against_every_candidate():
+    index = VideoFingerprintIndex()
+    index.add(video(1, duration=10))
+    index.add(video(2, CLIP + ' wow', duration=30))
+    
+    assert index.add(video(3, duration=30))['url'] == video(2)['url']
+
+def test_returned_records_are_copies():
+    index = VideoFingerprintIndex()
+    record = index.add(video(1))
+    record['total_views'] = 0
+    record['repost_urls'].append('x')
+    
+    assert index.add(video(2, views=5))['total_views'] == 15
+    assert index.add(video(1))['repost_urls'] == [video(2)['url']]
+
+def test_oldest_videos_are_evicted_with_their_reposts():
+    index = VideoFingerprintIndex(max_entries=3)
+    index.add(video(1))
+    index.add(video(2))
+    index.add(video(3, 'something else entirely here today'))
+    index.add(video(4, 'another unrelated clip about shoes'))
+    
+    # The first video and its repost left together, so a new copy starts fresh
+    assert index.add(video(5))['url'] == video(5)['url']
+    assert index.add(video(5))['total_views'] == 10
@@ -0,0 +1,107 @@
+import re
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('gspread')
+import product_finder_sheets
+from product_finder_sheets import ProductFinderSheets
+
+HEADERS = ['Reddit Title', 'TikTok Title', 'Category', 'TikTok URL', 'Description', 'Views', 'Source',
+           'Reddit URL', 'Reddit Subreddit', 'Reddit Score', 'TikTok Author', 'Match Score', 'Date Added',
+           'Search Query', 'Status', 'Reddit Comments']
+
+class FakeWorksheet:
+    """Worksheet holding rows in memory and recording the requests made to it."""
+    
+    def __init__(self, title: str, rows):
+        self.title = title
+        self.rows = rows
+        self.full_reads = 0
+        self.batch_updates = []
+    
+    def get_all_values(self):
+        self.full_reads += 1
+        return [list(row) for row in self.rows]
+    
+    def get(self, range_name: str):
+        first, last = (int(n) for n in re.findall(r'[A-Z]+(\d+)', range_name))
+        return [list(row) for row in self.rows[first - 1:last]]
+    
+    def batch_update(self, data):
+        self.batch_updates.append(data)
+    
+    def append_rows(self, rows):
+        first = len(self.rows) + 1
+        self.rows.extend(rows)
+        return {'updates': {'updatedRange': f"'{self.title}'!A{first}:P{len(self.rows)}"}}
+    
+    def columns_auto_resize(self, start, end):
+        pass
+
+def make_worksheet(count: int) -> FakeWorksheet:
+    rows = [list(HEADERS)]
+    for n in range(count):
+        row = dict.fromkeys(HEADERS, '')
+        row.update({'Reddit Title': f'Problem {n}', 'TikTok URL': f'https://tiktok.com/@u/video/{n}', 'Status': 'New'})
+        rows.append(list(row.values()))
+    return FakeWorksheet('Product_Matches', rows)
+
+@pytest.fixture
+def open_sheets(tmp_path, monkeypatch):
+    """Build ProductFinderSheets clients on a fake worksheet, sharing state files in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GOOGLE_WORKSHEET_PARTITIONING', 'none')
+    
+    def open_on(worksheet: FakeWorksheet) -> ProductFinderSheets:
+        session = SimpleNamespace(
+            client=None,
+            open_spreadsheet=lambda **kwargs: None,
+            get_worksheet=lambda sheet, title, **kwargs: worksheet,
+            is_validated=lambda ws: True
+        )
+        monkeypatch.setattr(product_finder_sheets, 'get_sheets_session', lambda path: session)
+        return ProductFinderSheets()
+    
+    return open_on
+
+def key(n: int):
+    return (f'Problem {n}', f'https://tiktok.com/@u/video/{n}')
+
+def test_consecutive_rows_are_coalesced(open_sheets):
+    worksheet = make_worksheet(5)
+    sheets = open_sheets(worksheet)
+    
+    assert sheets.update_match_statuses([(key(0), 'Posted'), (key(1), 'Posted'), (key(3), 'Skipped'), (6, 'Old')]) == 4
+    assert worksheet.full_reads == 1
+    assert worksheet.batch_updates == [[
+        {'range': 'O2:O3', 'values': [['Posted'], ['Posted']]},
+        {'range': 'O5:O6', 'values': [['Skipped'], ['Old']]}
+    ]]
+
+def test_saved_row_index_avoids_full_read(open_sheets):
+    worksheet = make_worksheet(3)
+    open_sheets(worksheet).update_match_statuses([(key(0), 'Posted')])
+    
+    # A new process trusts the saved index once the row count matches
+    assert open_sheets(worksheet).update_match_statuses([(key(2), 'Posted')]) == 1
+    assert worksheet.full_reads == 1
+    assert worksheet.batch_updates[-1] == [{'range': 'O4:O4', 'values': [['Posted']]}]
+
+def test_appended_rows_extend_saved_index(open_sheets):
+    worksheet = make_worksheet(2)
+    sheets = open_sheets(worksheet)
+    sheets.get_existing_matches()
+    sheets.add_product_matches([{'reddit_title': 'Problem 9', 'tiktok_url': key(9)[1]}])
+    
+    assert open_sheets(worksheet).update_match_statuses([(key(9), 'Posted')]) == 1
+    assert worksheet.full_reads == 1
+    assert worksheet.batch_updates[-1] == [{'range': 'O4:O4', 'values': [['Posted']]}]
+
+def test_saved_row_index_is_rebuilt_when_row_count_changed(open_sheets):
+    worksheet = make_worksheet(3)
+    open_sheets(worksheet).update_match_statuses([(key(0), 'Posted')])
+    
+    # Another writer appended a row the saved index doesn't know about
+    worksheet.rows.append(make_worksheet(4).rows[-1])
+    assert open_sheets(worksheet).update_match_statuses([(key(1), 'Posted')]) == 1
+    assert worksheet.full_reads == 2
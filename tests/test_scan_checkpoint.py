@@ -0,0 +1,66 @@
+import json
+import time
+from scan_checkpoint import ScanCheckpoint
+
+def problem(n: int, title: str = None):
+    return {
+        'reddit_url': f'https://reddit.com/r/test/comments/p{n}/post/',
+        'reddit_title': title or f'unrelated problem number {n} with words w{n} x{n} y{n}',
+        'reddit_content': '',
+        'subreddit': 'test',
+        'category': 'pain',
+        'score': 100,
+        'search_query': f'query {n}'
+    }
+
+def test_round_trip(tmp_path):
+    checkpoint = ScanCheckpoint(str(tmp_path / 'checkpoint.json'))
+    assert checkpoint.load() is None
+    
+    checkpoint.save({'pending_problems': [{'reddit_url': 'a'}]})
+    state = checkpoint.load()
+    assert state['pending_problems'] == [{'reddit_url': 'a'}]
+    assert state['updated_at'] <= time.time()
+    
+    checkpoint.clear()
+    assert checkpoint.load() is None
+
+def test_stale_or_corrupt_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    path.write_text(json.dumps({'updated_at': time.time() - 7200}))
+    assert ScanCheckpoint(str(path), max_age_hours=1).load() is None
+    
+    path.write_text('{"pending_problems": [')
+    assert ScanCheckpoint(str(path)).load() is None
+
+def test_bot_restores_queues_from_checkpoint(bot):
+    bot._enqueue_problems([problem(1), problem(2)])
+    bot.pending_matches.append({'reddit_url': problem(1)['reddit_url'], 'tiktok_url': 'v1'})
+    bot.save_checkpoint()
+    
+    bot.pending_problems = []
+    bot.pending_matches = []
+    bot._seen_problem_urls = {}
+    assert bot.restore_checkpoint()
+    
+    assert [p['reddit_url'] for p in bot.pending_problems] == [problem(1)['reddit_url'], problem(2)['reddit_url']]
+    assert bot.pending_matches[0]['tiktok_url'] == 'v1'
+    assert set(bot._seen_problem_urls) == {problem(1)['reddit_url'], problem(2)['reddit_url']}
+    
+    # Restored problems are not queued a second time
+    assert bot._enqueue_problems([problem(1)]) == 0
+
+def test_seen_problems_expire_after_refresh_interval(bot):
+    bot._enqueue_problems([problem(1)])
+    bot._seen_problem_urls[problem(1)['reddit_url']] -= bot.scan_interval_hours * 3600 + 1
+    
+    bot._enqueue_problems([problem(2)])
+    assert list(bot._seen_problem_urls) == [problem(2)['reddit_url']]
+
+def test_restores_checkpoint_with_url_list(bot, tmp_path):
+    (tmp_path / 'checkpoint.json').write_text(json.dumps({
+        'updated_at': time.time(),
+        'seen_problem_urls': ['https://reddit.com/r/test/comments/old/post/']
+    }))
+    assert bot.restore_checkpoint()
+    assert list(bot._seen_problem_urls) == ['https://reddit.com/r/test/comments/old/post/']
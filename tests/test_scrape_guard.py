@@ -0,0 +1,113 @@
+import pytest
+import scrape_guard
+from scrape_guard import AIMDController, CircuitBreaker, ScrapeBlockedError, ScrapeGuard
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scrape_guard, 'time', clock)
+    return clock
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=2, cooldown_seconds=10, max_cooldown_seconds=25)
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(breaker.allow_request())
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is None
+    assert breaker.seconds_until_retry() == 10
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure(breaker.allow_request())
+    breaker.record_success(breaker.allow_request())
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    trip(breaker)
+    clock.now += 10
+    
+    probe = breaker.allow_request()
+    assert probe is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is None
+    
+    breaker.record_success(probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() is not None
+
+def test_failed_probe_reopens_with_longer_cooldown(breaker, clock):
+    trip(breaker)
+    
+    clock.now += 10
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.cooldown == 20
+    
+    clock.now += 20
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.cooldown == 25
+    
+    clock.now += 25
+    breaker.record_success(breaker.allow_request())
+    assert breaker.cooldown == 10
+
+def test_inconclusive_probe_allows_another(breaker, clock):
+    trip(breaker)
+    clock.now += 10
+    
+    breaker.record_inconclusive(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is not None
+
+def test_request_from_before_opening_cannot_close_circuit(breaker, clock):
+    slow = breaker.allow_request()
+    trip(breaker)
+    clock.now += 10
+    probe = breaker.allow_request()
+    
+    breaker.record_success(slow)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure(slow)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    
+    breaker.record_success(probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_guard_refuses_while_open(breaker):
+    guard = ScrapeGuard(AIMDController(max_limit=2), breaker)
+    for _ in range(2):
+        guard.end(guard.begin(), blocked=True)
+    
+    assert guard.is_open()
+    with pytest.raises(ScrapeBlockedError):
+        guard.begin()
+    assert guard.get_status()['blocked_requests'] == 2
+
+def test_aimd_grows_on_success_and_halves_on_block(clock):
+    controller = AIMDController(max_limit=4)
+    
+    for _ in range(3):
+        assert controller.acquire(timeout=0)
+        controller.release(success=True)
+    assert controller.limit > 2
+    
+    limit = controller.limit
+    controller.acquire(timeout=0)
+    controller.release(success=False)
+    assert controller.limit == max(1, limit / 2)
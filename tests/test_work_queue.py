@@ -0,0 +1,83 @@
+import pytest
+from work_queue import RedisWorkQueue, SQLiteWorkQueue
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path):
+    if request.param == 'redis':
+        fakeredis = pytest.importorskip('fakeredis')
+        return RedisWorkQueue(fakeredis.FakeRedis(), max_attempts=2)
+    return SQLiteWorkQueue(str(tmp_path / 'queue.db'), max_attempts=2)
+
+def test_lease_hides_task_until_acked(queue):
+    assert queue.put('search', {'problem': 1})
+    
+    task = queue.lease(visibility_timeout=60)
+    assert task['type'] == 'search'
+    assert task['payload'] == {'problem': 1}
+    assert task['attempts'] == 1
+    
+    assert queue.lease(visibility_timeout=60) is None
+    assert queue.size() == {'available': 0, 'leased': 1, 'dead': 0}
+    
+    assert queue.ack(task)
+    assert queue.size() == {'available': 0, 'leased': 0, 'dead': 0}
+
+def test_dedup_key_is_free_again_after_ack(queue):
+    assert queue.put('search', {}, dedup_key='post-1')
+    assert not queue.put('search', {}, dedup_key='post-1')
+    
+    queue.ack(queue.lease(visibility_timeout=60))
+    assert queue.put('search', {}, dedup_key='post-1')
+
+def test_delayed_task_is_not_leased_early(queue):
+    queue.put('search', {}, delay=60)
+    assert queue.lease(visibility_timeout=60) is None
+    assert queue.size()['available'] == 1
+
+def test_expired_lease_is_released_and_stale_ack_fails(queue):
+    queue.put('search', {})
+    
+    first = queue.lease(visibility_timeout=0)
+    second = queue.lease(visibility_timeout=60)
+    assert second['id'] == first['id']
+    assert second['attempts'] == 2
+    
+    assert not queue.ack(first)
+    assert queue.ack(second)
+
+def test_nack_makes_task_available_again(queue):
+    queue.put('search', {})
+    
+    task = queue.lease(visibility_timeout=60)
+    assert queue.nack(task, count_attempt=False)
+    
+    task = queue.lease(visibility_timeout=60)
+    assert task['attempts'] == 1
+    assert queue.nack(task)
+    assert queue.lease(visibility_timeout=60)['attempts'] == 2
+
+def test_nack_with_stale_lease_fails(queue):
+    queue.put('search', {})
+    task = queue.lease(visibility_timeout=60)
+    queue.ack(task)
+    assert not queue.nack(task)
+
+def test_task_is_dead_lettered_after_max_attempts(queue):
+    queue.put('search', {}, dedup_key='post-1')
+    
+    for _ in range(2):
+        queue.nack(queue.lease(visibility_timeout=60))
+    
+    assert queue.lease(visibility_timeout=60) is None
+    assert queue.size() == {'available': 0, 'leased': 0, 'dead': 1}
+    
+    # A dead task no longer blocks its dedup key
+    assert queue.put('search', {}, dedup_key='post-1')
+
+def test_worker_nacks_search_without_scraper(bot, caplog):
+    bot._components['tiktok'] = None
+    bot.work_queue.put('tiktok_query', {'problem': {'reddit_url': 'a'}})
+    
+    assert bot.run_worker(max_tasks=1) == 1
+    assert 'TikTok scraper not available' in caplog.text
+    assert bot.work_queue.size() == {'available': 1, 'leased': 0, 'dead': 0}
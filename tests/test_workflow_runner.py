@@ -0,0 +1,31 @@
+import json
+import pytest
+from workflow_runner import iter_json_array
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+ITEMS = [1.5e3, -0.25, 12, 0, True, False, None, 'café ☕ "quoted"', {'a': [1, 2.5e-3]}, []]
+
+@pytest.mark.parametrize('size', range(1, 12))
+def test_every_chunk_size_yields_the_same_items(size):
+    data = json.dumps(ITEMS, ensure_ascii=False).encode('utf-8')
+    assert list(iter_json_array(chunked(data, size))) == ITEMS
+
+def test_number_split_inside_exponent():
+    assert list(iter_json_array([b'[1.', b'5e', b'3]'])) == [1500.0]
+
+def test_number_split_at_every_position():
+    data = b'[123.456e-2, 7]'
+    for split in range(1, len(data)):
+        assert list(iter_json_array([data[:split], data[split:]])) == [1.23456, 7]
+
+def test_top_level_values():
+    assert list(iter_json_array([b'{"k":', b' 1}'])) == [{'k': 1}]
+    assert list(iter_json_array([b'4', b'2'])) == [42]
+    assert list(iter_json_array([b'[', b']'])) == []
+
+@pytest.mark.parametrize('chunks', [[b'[1.]'], [b'[1', b'x]'], [b'[{"a": 1]']])
+def test_malformed_input_raises(chunks):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunks))
@@ -1,24 +1,61 @@
 import os
 import time
+import shutil
 import logging
+import threading
 import requests
 from typing import List, Dict, Any, Optional
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import json
 import re
 from dotenv import load_dotenv
+from content_parser import PRODUCT_KEYWORDS, extract_view_count, extract_video_data, \
+    is_product_related, is_valid_video, get_parse_pool
+from chrome_network import configure_resource_blocking, enable_performance_logging, \
+    enable_resource_blocking, read_network_events, read_network_events_by_target, window_target_id, \
+    summarize_resource_usage, fetch_search_payloads, parse_search_payload, detect_block_page, \
+    detect_blocked_responses
+from scrape_guard import AIMDController, CircuitBreaker, ScrapeGuard, ScrapeBlockedError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Resolved chromedriver binary, shared by every scraper in the process
+_chromedriver_path: Optional[str] = None
+_chromedriver_lock = threading.Lock()
+
+def resolve_chromedriver_path() -> str:
+    """Resolve the chromedriver binary once per process.
+    
+    CHROMEDRIVER_PATH pins a local binary. With CHROMEDRIVER_OFFLINE=true the
+    pinned path (or a chromedriver on PATH) is required and webdriver-manager
+    is never consulted, so air-gapped nodes never stall on a version lookup.
+    """
+    global _chromedriver_path
+    
+    with _chromedriver_lock:
+        if _chromedriver_path:
+            return _chromedriver_path
+        
+        pinned = os.getenv('CHROMEDRIVER_PATH')
+        offline = os.getenv('CHROMEDRIVER_OFFLINE', 'false').lower() == 'true'
+        
+        if pinned:
+            if not os.path.isfile(pinned) or not os.access(pinned, os.X_OK):
+                raise FileNotFoundError(f"CHROMEDRIVER_PATH is not an executable file: {pinned}")
+            path = pinned
+        elif offline:
+            path = shutil.which('chromedriver')
+            if not path:
+                raise FileNotFoundError("CHROMEDRIVER_OFFLINE is set but no CHROMEDRIVER_PATH or chromedriver on PATH")
+        else:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+        
+        _chromedriver_path = path
+        logger.info(f"Using chromedriver at {path}")
+        return path
+
 class TikTokScraper:
     def __init__(self):
         """Initialize TikTok scraper."""
@@ -27,6 +64,27 @@ class TikTokScraper:
         # Configuration
         self.min_views = int(os.getenv('MIN_TIKTOK_VIEWS', '10000'))  # Minimum views for viral content
         self.max_results = int(os.getenv('MAX_TIKTOK_RESULTS', '10'))  # Max results per search
+        self.block_resources = os.getenv('TIKTOK_BLOCK_RESOURCES', 'true').lower() == 'true'
+        # 'network' reads search results from TikTok's API responses, 'dom' parses the rendered page
+        self.capture_mode = os.getenv('TIKTOK_CAPTURE_MODE', 'network').lower()
+        # Concurrent searches hosted as tabs of a single browser by search_many
+        self.tabs_per_browser = max(1, int(os.getenv('TIKTOK_TABS_PER_BROWSER', '1')))
+        
+        # Concurrent searches grow towards TIKTOK_MAX_CONCURRENCY while TikTok
+        # serves results and halve on every captcha or rate-limit page; repeated
+        # blocks open the circuit and pause searching for a cooldown
+        self.guard = ScrapeGuard(
+            AIMDController(max_limit=int(os.getenv('TIKTOK_MAX_CONCURRENCY', '3'))),
+            CircuitBreaker(
+                failure_threshold=int(os.getenv('TIKTOK_BREAKER_THRESHOLD', '3')),
+                cooldown_seconds=float(os.getenv('TIKTOK_BREAKER_COOLDOWN_SECONDS', '300')),
+                max_cooldown_seconds=float(os.getenv('TIKTOK_BREAKER_MAX_COOLDOWN_SECONDS', '3600'))
+            )
+        )
+        
+        # Selenium is imported here rather than at module load so that
+        # commands which never launch a browser stay fast
+        from selenium.webdriver.chrome.options import Options
         
         # Initialize Chrome driver options
         self.chrome_options = Options()
@@ -37,83 +95,119 @@ class TikTokScraper:
         self.chrome_options.add_argument('--window-size=1920,1080')
         self.chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
         
+        # Drop media, images, fonts and trackers; network events are logged
+        # so the savings can be reported per page
+        if self.block_resources:
+            configure_resource_blocking(self.chrome_options)
+        if self.block_resources or self.capture_mode == 'network':
+            enable_performance_logging(self.chrome_options)
+        
+        # Resource usage of the last page and running totals; searches run
+        # on several threads, so updates hold the lock
+        self._resource_lock = threading.Lock()
+        self.last_resource_report: Dict[str, Any] = {}
+        self.resource_totals = {'pages': 0, 'requests_blocked': 0, 'estimated_bytes_saved': 0, 'bytes_loaded': 0}
+        
         # Product-related keywords for filtering
-        self.product_keywords = [
-            'product', 'review', 'unboxing', 'test', 'try', 'works', 'helps',
-            'relief', 'solution', 'device', 'tool', 'gadget', 'item', 'buy',
-            'purchase', 'amazon', 'link', 'shop', 'store', 'brand', 'recommend',
-            'cushion', 'pillow', 'support', 'brace', 'wrap', 'pad', 'mat',
-            'cream', 'gel', 'oil', 'supplement', 'vitamin', 'medicine',
-            'stretcher', 'roller', 'massager', 'therapy', 'treatment'
-        ]
+        self.product_keywords = list(PRODUCT_KEYWORDS)
+        
+        # HTML parsing and classification run in worker processes when configured
+        self.parse_pool = get_parse_pool()
         
         logger.info("TikTokScraper initialized successfully")
     
-    def _setup_driver(self) -> webdriver.Chrome:
+    def _setup_driver(self):
         """Set up Chrome WebDriver."""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        
         try:
-            service = Service(ChromeDriverManager().install())
+            service = Service(resolve_chromedriver_path())
             driver = webdriver.Chrome(service=service, options=self.chrome_options)
+            
+            if self.block_resources:
+                enable_resource_blocking(driver)
+            elif self.capture_mode == 'network':
+                driver.execute_cdp_cmd('Network.enable', {})
+            
             return driver
         except Exception as e:
             logger.error(f"Failed to setup Chrome driver: {e}")
             raise
     
+    def prewarm(self):
+        """Resolve the chromedriver binary up front so the first search only spawns a process."""
+        from selenium import webdriver  # noqa: F401  (loads selenium ahead of the first search)
+        resolve_chromedriver_path()
+    
     def _extract_view_count(self, view_text: str) -> int:
         """Extract numeric view count from text."""
-        if not view_text:
-            return 0
-        
-        # Remove non-numeric characters except K, M, B
-        view_text = view_text.upper().replace(',', '')
-        
-        # Extract number and multiplier
-        match = re.search(r'(\d+\.?\d*)\s*([KMB]?)', view_text)
-        if not match:
-            return 0
-        
-        number = float(match.group(1))
-        multiplier = match.group(2)
-        
-        if multiplier == 'K':
-            return int(number * 1000)
-        elif multiplier == 'M':
-            return int(number * 1000000)
-        elif multiplier == 'B':
-            return int(number * 1000000000)
-        else:
-            return int(number)
+        return extract_view_count(view_text)
     
     def _is_product_related(self, title: str, description: str) -> bool:
         """Check if video is product-related."""
-        combined_text = f"{title} {description}".lower()
-        
-        # Check for product keywords
-        for keyword in self.product_keywords:
-            if keyword in combined_text:
-                return True
-        
-        # Check for product-related patterns
-        product_patterns = [
-            r'\b(this|the|my)\s+\w*\s+(product|item|device|tool)',
-            r'\b(buy|purchase|get|order)\s+\w*\s+(this|it|here)',
-            r'\b(link\s+in\s+bio|check\s+description)',
-            r'\b(amazon|shop|store|website)',
-            r'\b(review|unbox|test|try)',
-            r'\b(works|helps|relief|solution)'
-        ]
-        
-        for pattern in product_patterns:
-            if re.search(pattern, combined_text):
-                return True
-        
-        return False
+        return is_product_related(title, description, self.product_keywords)
+    
+    def _report_resource_usage(self, events, query: str):
+        """Log how many requests and bytes resource blocking saved on the current page."""
+        report = summarize_resource_usage(events)
+        with self._resource_lock:
+            self.last_resource_report = report
+            self.resource_totals['pages'] += 1
+            for key in ('requests_blocked', 'estimated_bytes_saved', 'bytes_loaded'):
+                self.resource_totals[key] += report[key]
+        
+        logger.info(f"Resource filter for '{query}': blocked {report['requests_blocked']} requests "
+                    f"(~{report['estimated_bytes_saved'] / 1024:.0f} KB saved), "
+                    f"loaded {report['requests_loaded']} requests ({report['bytes_loaded'] / 1024:.0f} KB)")
+    
+    def _collect_network(self, driver, page_events: list, captured: list, seen_request_ids: set):
+        """Drain network events and capture any completed search API responses."""
+        if not (self.block_resources or self.capture_mode == 'network'):
+            return
+        
+        events = read_network_events(driver)
+        page_events.extend(events)
+        
+        if self.capture_mode == 'network':
+            for payload in fetch_search_payloads(driver, events, seen_request_ids):
+                captured.extend(parse_search_payload(payload))
+    
+    def _check_blocked(self, driver, events) -> Optional[str]:
+        """Return why TikTok is refusing the search, or None if the page looks normal."""
+        return detect_blocked_responses(events) or detect_block_page(driver)
+    
+    def _filter_captured_videos(self, captured: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Deduplicate and filter videos captured from API responses."""
+        videos = []
+        seen_ids = set()
+        
+        for video in captured:
+            if video['id'] in seen_ids:
+                continue
+            seen_ids.add(video['id'])
+            
+            if self._is_valid_video(video):
+                videos.append(video)
+                if len(videos) >= self.max_results:
+                    break
+        
+        return videos
     
     def search_tiktok(self, query: str) -> List[Dict[str, Any]]:
-        """Search TikTok for videos related to the query."""
+        """Search TikTok for videos related to the query.
+        
+        Raises ScrapeBlockedError if TikTok answers with a captcha or rate-limit
+        page, or if searching is paused after repeated blocks.
+        """
         driver = None
         videos = []
+        page_events = []
+        captured = []
+        seen_request_ids = set()
+        blocked = None
         
+        ticket = self.guard.begin()
         try:
             driver = self._setup_driver()
             
@@ -126,101 +220,244 @@ class TikTokScraper:
             
             # Wait for content to load
             time.sleep(5)
+            self._collect_network(driver, page_events, captured, seen_request_ids)
+            
+            reason = self._check_blocked(driver, page_events)
+            if reason:
+                raise ScrapeBlockedError(f"TikTok blocked search for '{query}': {reason}")
             
-            # Scroll to load more videos
+            # Scroll to load more videos; search responses are read as they arrive
             for _ in range(3):
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                 time.sleep(2)
+                self._collect_network(driver, page_events, captured, seen_request_ids)
             
-            # Parse the page source
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            # A captcha or 429 can also appear while scrolling
+            reason = self._check_blocked(driver, page_events)
+            if reason:
+                raise ScrapeBlockedError(f"TikTok blocked search for '{query}' while scrolling: {reason}")
             
-            # Find video elements (TikTok structure may change)
-            video_elements = soup.find_all('div', {'data-e2e': 'search_top-item'}) or \
-                           soup.find_all('div', class_=re.compile(r'.*video.*item.*'))
+            if self.block_resources:
+                self._report_resource_usage(page_events, query)
             
-            if not video_elements:
-                # Try alternative selectors
-                video_elements = soup.find_all('a', href=re.compile(r'/video/'))[:self.max_results]
-            
-            for element in video_elements[:self.max_results]:
-                try:
-                    video_data = self._extract_video_data(element, driver.current_url)
-                    if video_data and self._is_valid_video(video_data):
-                        videos.append(video_data)
-                except Exception as e:
-                    logger.warning(f"Failed to extract video data: {e}")
-                    continue
+            if captured:
+                # Structured records with exact play counts, no DOM serialization needed
+                videos = self._filter_captured_videos(captured)
+                logger.info(f"Captured {len(captured)} videos from search responses")
+            else:
+                if self.capture_mode == 'network':
+                    logger.info("No search responses captured, falling back to page parsing")
+                
+                # Parse and filter the page source (in a worker process when configured)
+                videos = self.parse_pool.parse_search_page(
+                    driver.page_source, self.max_results, self.min_views, self.product_keywords
+                )
             
             logger.info(f"Found {len(videos)} relevant videos for query: {query}")
-            
+            blocked = False
+        
+        except ScrapeBlockedError as e:
+            blocked = True
+            logger.warning(str(e))
+            raise
+        
         except Exception as e:
             logger.error(f"Error searching TikTok for '{query}': {e}")
         
         finally:
             if driver:
                 driver.quit()
+            # Errors unrelated to blocking (blocked=None) leave the limit alone
+            self.guard.end(ticket, blocked)
         
         return videos
     
+    def _open_tab(self, driver, query: str, first: bool) -> Dict[str, Any]:
+        """Open a search in a tab without waiting for the page to load."""
+        if not first:
+            driver.switch_to.new_window('tab')
+        
+        # Blocking rules and network capture are per tab
+        if self.block_resources:
+            enable_resource_blocking(driver)
+        elif self.capture_mode == 'network':
+            driver.execute_cdp_cmd('Network.enable', {})
+        
+        search_query = query.replace(' ', '%20')
+        url = f"https://www.tiktok.com/search?q={search_query}"
+        
+        logger.info(f"Searching TikTok for: {query}")
+        driver.execute_script("window.location.href = arguments[0];", url)
+        
+        # Same timing as search_tiktok: 5 s initial wait, then 3 scrolls 2 s apart
+        handle = driver.current_window_handle
+        return {
+            'handle': handle,
+            'target': window_target_id(handle),
+            'query': query,
+            'scrolls_left': 3,
+            'ready_at': time.time() + 5,
+            'events': []
+        }
+    
+    def _drain_tab_events(self, driver, tabs: List[Dict[str, Any]]):
+        """Hand each open tab the network events its own target logged.
+        
+        The performance log is shared by every tab of the browser, so events
+        are sorted by the tab that logged them; events of closed tabs are dropped.
+        """
+        if not (self.block_resources or self.capture_mode == 'network'):
+            return
+        
+        events = read_network_events_by_target(driver)
+        for tab in tabs:
+            tab['events'].extend(events.get(tab['target'], []))
+    
+    def _advance_tab(self, driver, tab: Dict[str, Any]) -> bool:
+        """Run the next step of a tab's search. Returns True when the tab is done."""
+        driver.switch_to.window(tab['handle'])
+        
+        if tab['scrolls_left'] > 0:
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            tab['scrolls_left'] -= 1
+            tab['ready_at'] = time.time() + 2
+            return False
+        
+        return True
+    
+    def search_many(self, queries: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Search several queries concurrently as tabs of one browser process.
+        
+        Each tab's load and scroll waits are interleaved with the others, so
+        the browser keeps working while any single page is waiting. Each tab
+        is judged on its own network events, and in network capture mode its
+        results come from its own search responses, falling back to the
+        rendered page like search_tiktok. Tabs are also capped by the
+        guard's concurrency limit; queries left unsearched because TikTok is
+        blocking are missing from the result.
+        """
+        if self.tabs_per_browser <= 1 or len(queries) <= 1:
+            results = {}
+            for query in queries:
+                try:
+                    results[query] = self.search_tiktok(query)
+                except ScrapeBlockedError:
+                    break
+            return results
+        
+        results = {}
+        remaining = list(dict.fromkeys(queries))
+        tabs = []
+        driver = None
+        blank_window = True  # The browser starts with one empty window we can use
+        
+        try:
+            driver = self._setup_driver()
+            
+            while remaining or tabs:
+                # Fill free tab slots; finished tabs are reused for the next query.
+                # Only wait for a guard slot when no tab is open
+                try:
+                    while remaining and len(tabs) < self.tabs_per_browser:
+                        ticket = self.guard.begin(timeout=None if not tabs else 0)
+                        if ticket is None:
+                            break
+                        try:
+                            # Events the reused window logged so far belong to the tabs before it
+                            self._drain_tab_events(driver, tabs)
+                            tab = self._open_tab(driver, remaining.pop(0), blank_window)
+                        except Exception:
+                            self.guard.end(ticket, None)
+                            raise
+                        tab['ticket'] = ticket
+                        tabs.append(tab)
+                        blank_window = False
+                except ScrapeBlockedError as e:
+                    logger.warning(f"Stopping multi-tab search: {e}")
+                    remaining = []
+                
+                if not tabs:
+                    break
+                
+                # Work on whichever tab is ready first
+                tab = min(tabs, key=lambda t: t['ready_at'])
+                delay = tab['ready_at'] - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                
+                blocked = None
+                try:
+                    done = self._advance_tab(driver, tab)
+                    self._drain_tab_events(driver, tabs)
+                    if not done:
+                        continue
+                    
+                    events = tab['events']
+                    if self.block_resources:
+                        self._report_resource_usage(events, tab['query'])
+                    
+                    reason = self._check_blocked(driver, events)
+                    if reason:
+                        blocked = True
+                        logger.warning(f"TikTok blocked search for '{tab['query']}': {reason}")
+                    else:
+                        results[tab['query']] = self._tab_videos(driver, tab)
+                        blocked = False
+                        logger.info(f"Found {len(results[tab['query']])} relevant videos for query: {tab['query']}")
+                
+                except Exception as e:
+                    logger.error(f"Error searching TikTok for '{tab['query']}': {e}")
+                
+                self.guard.end(tab['ticket'], blocked)
+                
+                # Close the finished tab unless it's the last window
+                tabs.remove(tab)
+                if len(driver.window_handles) > 1:
+                    driver.switch_to.window(tab['handle'])
+                    driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
+                else:
+                    driver.execute_script("window.location.href = 'about:blank';")
+                    blank_window = True
+        
+        except Exception as e:
+            logger.error(f"Error in multi-tab TikTok search: {e}")
+        
+        finally:
+            # Tabs still open when the browser failed hold guard slots
+            for tab in tabs:
+                self.guard.end(tab['ticket'], None)
+            if driver:
+                driver.quit()
+        
+        return results
+    
+    def _tab_videos(self, driver, tab: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Videos of a finished tab (the driver must be switched to it)."""
+        if self.capture_mode == 'network':
+            captured = []
+            for payload in fetch_search_payloads(driver, tab['events'], set()):
+                captured.extend(parse_search_payload(payload))
+            if captured:
+                logger.info(f"Captured {len(captured)} videos from search responses")
+                return self._filter_captured_videos(captured)
+            logger.info("No search responses captured, falling back to page parsing")
+        
+        return self.parse_pool.parse_search_page(
+            driver.page_source, self.max_results, self.min_views, self.product_keywords
+        )
+    
     def _extract_video_data(self, element, current_url: str) -> Optional[Dict[str, Any]]:
         """Extract video data from HTML element."""
         try:
-            # Try to find video link
-            link_elem = element.find('a', href=re.compile(r'/video/'))
-            if not link_elem:
-                link_elem = element.find('a')
-            
-            if not link_elem:
-                return None
-            
-            video_url = link_elem.get('href', '')
-            if video_url.startswith('/'):
-                video_url = f"https://www.tiktok.com{video_url}"
-            
-            # Extract title/description
-            title_elem = element.find('span') or element.find('div')
-            title = title_elem.get_text(strip=True) if title_elem else ''
-            
-            # Try to find view count
-            view_elem = element.find(text=re.compile(r'\d+[KMB]?\s*(view|like)'))
-            views = 0
-            if view_elem:
-                views = self._extract_view_count(view_elem)
-            
-            # Extract author if available
-            author_elem = element.find('span', text=re.compile(r'@\w+'))
-            author = author_elem.get_text(strip=True) if author_elem else 'Unknown'
-            
-            return {
-                'title': title[:200],  # Limit title length
-                'url': video_url,
-                'views': views,
-                'author': author,
-                'description': title,  # Use title as description for now
-                'platform': 'TikTok',
-                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
+            return extract_video_data(element)
         except Exception as e:
             logger.warning(f"Failed to extract video data: {e}")
             return None
     
     def _is_valid_video(self, video_data: Dict[str, Any]) -> bool:
         """Check if video meets criteria for viral product content."""
-        # Check minimum views
-        if video_data['views'] < self.min_views:
-            return False
-        
-        # Check if product-related
-        if not self._is_product_related(video_data['title'], video_data['description']):
-            return False
-        
-        # Check if URL is valid
-        if not video_data['url'] or 'tiktok.com' not in video_data['url']:
-            return False
-        
-        return True
+        return is_valid_video(video_data, self.min_views, self.product_keywords)
     
     def find_products_for_problems(self, problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Find TikTok products for a list of Reddit problems."""
@@ -260,7 +497,7 @@ class TikTokScraper:
                 
                 # Add delay between searches to avoid rate limiting
                 time.sleep(3)
-                
+            
             except Exception as e:
                 logger.error(f"Failed to find products for problem: {e}")
                 continue
@@ -300,7 +537,7 @@ class TikTokAPIClient:
     def __init__(self):
         load_dotenv()
         self.api_key = os.getenv('TIKTOK_API_KEY')  # If using a service like RapidAPI
-        
+    
     def search_videos(self, query: str, count: int = 10) -> List[Dict[str, Any]]:
         """Search TikTok videos using API (placeholder for future implementation)."""
         # This would be implemented with services like:
@@ -326,6 +563,6 @@ if __name__ == "__main__":
             print(f"   Views: {video['views']:,}")
             print(f"   Author: {video['author']}")
             print(f"   URL: {video['url']}")
-            
+    
     except Exception as e:
         logger.error(f"Test failed: {e}")
\ No newline at end of file
@@ -0,0 +1,96 @@
+import re
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from json_store import atomic_write_json, load_json
+
+logger = logging.getLogger(__name__)
+
+# Post ID in a Reddit permalink: /r/<sub>/comments/<id>/<slug>/
+POST_ID_PATTERN = re.compile(r'/comments/([a-z0-9]+)', re.IGNORECASE)
+
+def reddit_fullname(url: str) -> Optional[str]:
+    """Return the fullname (t3_<id>) of the post a Reddit URL points to."""
+    match = POST_ID_PATTERN.search(url or '')
+    return f"t3_{match.group(1).lower()}" if match else None
+
+class TrackedPostStore:
+    """Reddit posts that have matches in the sheet, with their latest engagement.
+    
+    Posts are tracked for max_age_days after they were first written to the
+    sheet; after that their scores are no longer refreshed. Each post also
+    remembers the worksheets its matches were written to, so refreshed
+    scores reach older monthly partitions as well as the current one.
+    """
+    
+    def __init__(self, path: str = 'tracked_posts.json', max_age_days: float = 30):
+        """Initialize the store and load any saved posts."""
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        self.posts: Dict[str, Dict[str, Any]] = load_json(self.path, 'tracked posts file', {})
+    
+    def track(self, matches: List[Dict[str, Any]], worksheet: Optional[str] = None) -> int:
+        """Start tracking the Reddit posts of matches written to a worksheet.
+        
+        Returns the number of posts that are new or newly seen in the worksheet.
+        """
+        changed = 0
+        
+        with self._lock:
+            for match in matches:
+                fullname = reddit_fullname(match.get('reddit_url', ''))
+                if not fullname:
+                    continue
+                
+                post = self.posts.get(fullname)
+                if post is None:
+                    self.posts[fullname] = {
+                        'url': match['reddit_url'],
+                        'score': match.get('reddit_score', 0),
+                        'num_comments': match.get('reddit_comments', 0),
+                        'tracked_at': time.time(),
+                        'refreshed_at': None,
+                        'worksheets': [worksheet] if worksheet else []
+                    }
+                    changed += 1
+                elif worksheet and worksheet not in post.setdefault('worksheets', []):
+                    post['worksheets'].append(worksheet)
+                    changed += 1
+        
+        return changed
+    
+    def fullnames(self) -> List[str]:
+        """Fullnames of posts still worth refreshing; expired posts are dropped."""
+        cutoff = time.time() - self.max_age_seconds
+        
+        with self._lock:
+            for fullname in [f for f, post in self.posts.items() if post['tracked_at'] < cutoff]:
+                del self.posts[fullname]
+            return list(self.posts)
+    
+    def apply(self, engagement: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        """Record fresh engagement by fullname; returns the changed posts keyed by URL,
+        each with the worksheets it appears in."""
+        changed = {}
+        now = time.time()
+        
+        with self._lock:
+            for fullname, fresh in engagement.items():
+                post = self.posts.get(fullname)
+                if post is None:
+                    continue
+                
+                post['refreshed_at'] = now
+                if (post['score'], post['num_comments']) != (fresh['score'], fresh['num_comments']):
+                    post['score'] = fresh['score']
+                    post['num_comments'] = fresh['num_comments']
+                    changed[post['url']] = dict(fresh, worksheets=list(post.get('worksheets', [])))
+        
+        return changed
+    
+    def save(self):
+        """Write the store to disk atomically."""
+        with self._lock:
+            atomic_write_json(self.path, self.posts)
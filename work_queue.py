@@ -0,0 +1,360 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class WorkQueue(ABC):
+    """Task queue shared by worker processes, possibly on several machines.
+    
+    Workers lease a task, process it and ack it. A task that is not acked
+    before its visibility timeout (e.g. because the worker crashed) becomes
+    available to other workers again. Tasks leased more than max_attempts
+    times are moved aside as dead instead of being retried forever.
+    
+    Tasks are dicts with 'id', 'type', 'payload', 'attempts' and 'lease'.
+    """
+    
+    @abstractmethod
+    def put(self, task_type: str, payload: Dict[str, Any], dedup_key: str = None,
+            delay: float = 0) -> bool:
+        """Add a task. Returns False if a live task with the same dedup_key exists."""
+    
+    @abstractmethod
+    def lease(self, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the next available task, hiding it from other workers for a while."""
+    
+    @abstractmethod
+    def ack(self, task: Dict[str, Any]) -> bool:
+        """Remove a finished task. Returns False if the lease had already expired."""
+    
+    @abstractmethod
+    def nack(self, task: Dict[str, Any], delay: float = 0, count_attempt: bool = True) -> bool:
+        """Give a task back to the queue, visible again after the delay.
+        
+        With count_attempt=False the lease doesn't count towards max_attempts,
+        for failures that aren't the task's fault (e.g. the site is blocking us).
+        """
+    
+    @abstractmethod
+    def size(self) -> Dict[str, int]:
+        """Count available, leased and dead tasks."""
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue in a local SQLite file, shared by processes on one machine.
+    
+    SQLite's file lock serializes leases, so two workers never get the
+    same task.
+    """
+    
+    def __init__(self, path: str = 'work_queue.db', max_attempts: int = 5):
+        """Initialize the queue and create its table if needed."""
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    dedup_key TEXT UNIQUE,
+                    visible_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease TEXT,
+                    dead INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS tasks_visible ON tasks (dead, visible_at)')
+    
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections can't be shared."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    def put(self, task_type: str, payload: Dict[str, Any], dedup_key: str = None,
+            delay: float = 0) -> bool:
+        """Add a task. Returns False if a live task with the same dedup_key exists."""
+        try:
+            self._connect().execute(
+                'INSERT INTO tasks (type, payload, dedup_key, visible_at) VALUES (?, ?, ?, ?)',
+                (task_type, json.dumps(payload), dedup_key, time.time() + delay)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+    
+    def lease(self, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the next available task, hiding it from other workers for a while."""
+        conn = self._connect()
+        
+        while True:
+            now = time.time()
+            # IMMEDIATE takes the write lock up front so the select and update are atomic
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    'SELECT id, type, payload, attempts FROM tasks '
+                    'WHERE dead = 0 AND visible_at <= ? ORDER BY visible_at, id LIMIT 1',
+                    (now,)
+                ).fetchone()
+                
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                
+                task_id, task_type, payload, attempts = row
+                
+                if attempts >= self.max_attempts:
+                    conn.execute('UPDATE tasks SET dead = 1, lease = NULL, dedup_key = NULL WHERE id = ?',
+                                 (task_id,))
+                    conn.execute('COMMIT')
+                    logger.warning(f"Task {task_id} ({task_type}) failed {attempts} times, marked dead")
+                    continue
+                
+                lease = uuid.uuid4().hex
+                conn.execute(
+                    'UPDATE tasks SET visible_at = ?, attempts = attempts + 1, lease = ? WHERE id = ?',
+                    (now + visibility_timeout, lease, task_id)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            
+            return {
+                'id': task_id,
+                'type': task_type,
+                'payload': json.loads(payload),
+                'attempts': attempts + 1,
+                'lease': lease
+            }
+    
+    def ack(self, task: Dict[str, Any]) -> bool:
+        """Remove a finished task. Returns False if the lease had already expired."""
+        cursor = self._connect().execute(
+            'DELETE FROM tasks WHERE id = ? AND lease = ?', (task['id'], task['lease'])
+        )
+        return cursor.rowcount > 0
+    
+    def nack(self, task: Dict[str, Any], delay: float = 0, count_attempt: bool = True) -> bool:
+        """Give a task back to the queue, visible again after the delay."""
+        cursor = self._connect().execute(
+            'UPDATE tasks SET visible_at = ?, lease = NULL, attempts = attempts - ? '
+            'WHERE id = ? AND lease = ?',
+            (time.time() + delay, 0 if count_attempt else 1, task['id'], task['lease'])
+        )
+        return cursor.rowcount > 0
+    
+    def size(self) -> Dict[str, int]:
+        """Count available, leased and dead tasks."""
+        now = time.time()
+        counts = {'available': 0, 'leased': 0, 'dead': 0}
+        
+        for dead, leased, count in self._connect().execute(
+            'SELECT dead, lease IS NOT NULL AND visible_at > ?, COUNT(*) FROM tasks GROUP BY 1, 2',
+            (now,)
+        ):
+            key = 'dead' if dead else 'leased' if leased else 'available'
+            counts[key] += count
+        
+        return counts
+
+class RedisWorkQueue(WorkQueue):
+    """Work queue in Redis, shared by workers on any number of machines.
+    
+    Accepts any redis-py compatible client (including fakeredis). Tasks are
+    kept in a sorted set scored by the time they become visible, so leasing
+    moves the score into the future and a crashed worker's task simply
+    reappears when its score comes due. Leases are claimed with WATCH/MULTI
+    so concurrent workers never get the same task.
+    """
+    
+    def __init__(self, client, name: str = 'product_finder', max_attempts: int = 5):
+        """Initialize the queue."""
+        self.client = client
+        self.max_attempts = max_attempts
+        self.queue_key = f"{name}:queue"      # id -> visible_at
+        self.tasks_key = f"{name}:tasks"      # id -> task JSON
+        self.leases_key = f"{name}:leases"    # id -> lease token
+        self.dedup_key = f"{name}:dedup"      # dedup key -> id
+        self.dead_key = f"{name}:dead"        # ids of dead tasks
+        self.counter_key = f"{name}:next_id"
+    
+    def put(self, task_type: str, payload: Dict[str, Any], dedup_key: str = None,
+            delay: float = 0) -> bool:
+        """Add a task. Returns False if a live task with the same dedup_key exists.
+        
+        The dedup claim and the task are written in one MULTI, so a crash
+        can't leave a dedup key behind without its task.
+        """
+        from redis.exceptions import WatchError
+        
+        task_id = str(self.client.incr(self.counter_key))
+        task = {'type': task_type, 'payload': payload, 'attempts': 0, 'dedup_key': dedup_key}
+        
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    if dedup_key:
+                        pipe.watch(self.dedup_key)
+                        if pipe.hexists(self.dedup_key, dedup_key):
+                            pipe.unwatch()
+                            return False
+                    
+                    pipe.multi()
+                    if dedup_key:
+                        pipe.hset(self.dedup_key, dedup_key, task_id)
+                    pipe.hset(self.tasks_key, task_id, json.dumps(task))
+                    pipe.zadd(self.queue_key, {task_id: time.time() + delay})
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    # Another put or ack changed the dedup keys first; check again
+                    continue
+    
+    def lease(self, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the next available task, hiding it from other workers for a while."""
+        from redis.exceptions import WatchError
+        
+        while True:
+            now = time.time()
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(self.queue_key)
+                    due = pipe.zrangebyscore(self.queue_key, '-inf', now, start=0, num=1)
+                    if not due:
+                        pipe.unwatch()
+                        return None
+                    
+                    task_id = due[0].decode() if isinstance(due[0], bytes) else due[0]
+                    raw = pipe.hget(self.tasks_key, task_id)
+                    if raw is None:
+                        # Acked between our read and now; drop the stale entry
+                        pipe.multi()
+                        pipe.zrem(self.queue_key, task_id)
+                        pipe.execute()
+                        continue
+                    
+                    task = json.loads(raw)
+                    lease = uuid.uuid4().hex
+                    task['attempts'] += 1
+                    
+                    pipe.multi()
+                    if task['attempts'] > self.max_attempts:
+                        pipe.zrem(self.queue_key, task_id)
+                        pipe.sadd(self.dead_key, task_id)
+                        pipe.hdel(self.leases_key, task_id)
+                        if task.get('dedup_key'):
+                            pipe.hdel(self.dedup_key, task['dedup_key'])
+                    else:
+                        pipe.zadd(self.queue_key, {task_id: now + visibility_timeout})
+                        pipe.hset(self.tasks_key, task_id, json.dumps(task))
+                        pipe.hset(self.leases_key, task_id, lease)
+                    pipe.execute()
+                except WatchError:
+                    # Another worker changed the queue first; try again
+                    continue
+            
+            if task['attempts'] > self.max_attempts:
+                logger.warning(f"Task {task_id} ({task['type']}) failed {self.max_attempts} times, marked dead")
+                continue
+            
+            return {
+                'id': task_id,
+                'type': task['type'],
+                'payload': task['payload'],
+                'attempts': task['attempts'],
+                'lease': lease
+            }
+    
+    def _holds_lease(self, pipe, task: Dict[str, Any]) -> bool:
+        """Check, inside a WATCH, that the task is still leased to us."""
+        current = pipe.hget(self.leases_key, task['id'])
+        if isinstance(current, bytes):
+            current = current.decode()
+        return current == task['lease']
+    
+    def ack(self, task: Dict[str, Any]) -> bool:
+        """Remove a finished task. Returns False if the lease had already expired."""
+        from redis.exceptions import WatchError
+        
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(self.leases_key)
+                    if not self._holds_lease(pipe, task):
+                        pipe.unwatch()
+                        return False
+                    
+                    raw = pipe.hget(self.tasks_key, task['id'])
+                    dedup_key = json.loads(raw).get('dedup_key') if raw else None
+                    
+                    pipe.multi()
+                    pipe.zrem(self.queue_key, task['id'])
+                    pipe.hdel(self.tasks_key, task['id'])
+                    pipe.hdel(self.leases_key, task['id'])
+                    if dedup_key:
+                        pipe.hdel(self.dedup_key, dedup_key)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+    
+    def nack(self, task: Dict[str, Any], delay: float = 0, count_attempt: bool = True) -> bool:
+        """Give a task back to the queue, visible again after the delay."""
+        from redis.exceptions import WatchError
+        
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(self.leases_key)
+                    if not self._holds_lease(pipe, task):
+                        pipe.unwatch()
+                        return False
+                    
+                    raw = pipe.hget(self.tasks_key, task['id'])
+                    
+                    pipe.multi()
+                    if raw and not count_attempt:
+                        stored = json.loads(raw)
+                        stored['attempts'] = max(0, stored['attempts'] - 1)
+                        pipe.hset(self.tasks_key, task['id'], json.dumps(stored))
+                    pipe.zadd(self.queue_key, {task['id']: time.time() + delay})
+                    pipe.hdel(self.leases_key, task['id'])
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+    
+    def size(self) -> Dict[str, int]:
+        """Count available, leased and dead tasks."""
+        now = time.time()
+        total = self.client.zcard(self.queue_key)
+        # Delayed tasks are hidden too but, as in SQLiteWorkQueue, count as available
+        hidden = total - self.client.zcount(self.queue_key, '-inf', now)
+        leased = min(hidden, self.client.hlen(self.leases_key))
+        return {
+            'available': total - leased,
+            'leased': leased,
+            'dead': self.client.scard(self.dead_key)
+        }
+
+def open_work_queue(url: str, max_attempts: int = 5) -> WorkQueue:
+    """Open a work queue from a URL: redis://... or sqlite:///path (or a plain path)."""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisWorkQueue(redis.Redis.from_url(url), max_attempts=max_attempts)
+    
+    path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+    return SQLiteWorkQueue(path, max_attempts=max_attempts)
@@ -0,0 +1,496 @@
+import os
+import re
+import sys
+import json
+import time
+import codecs
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from dotenv import load_dotenv
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+Item = Dict[str, Any]
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yield the elements of a JSON array as its bytes arrive.
+    
+    Only the element being parsed is kept in memory, so arbitrarily long
+    arrays stream in constant memory. A top-level object is yielded whole.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    started = False
+    is_array = True
+    chunks = iter(chunks)
+    exhausted = False
+    
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        
+        if position < len(buffer):
+            if not started:
+                started = True
+                if buffer[position] == '[':
+                    position += 1
+                    continue
+                is_array = False
+            
+            if is_array and buffer[position] == ']':
+                return
+            
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # A number (or literal) only ends at a delimiter: '1.' may continue as '1.5e3'
+                # in the next chunk, so one that runs up to the end of the buffer, or stops at
+                # a character that can't follow it, needs more input before it can be yielded
+                if not isinstance(value, (dict, list, str)) and (
+                        buffer[end:end + 1] not in ('', ' ', '\t', '\r', '\n', ',', ']') or
+                        (end == len(buffer) and not exhausted)):
+                    raise ValueError('incomplete')
+            except ValueError:
+                if exhausted:
+                    raise ValueError(f"Malformed JSON near: {buffer[position:position + 80]!r}")
+            else:
+                yield value
+                if not is_array:
+                    return
+                # Drop what has been parsed so the buffer never holds more than one element
+                buffer = buffer[end:]
+                position = 0
+                continue
+        
+        if exhausted:
+            return
+        
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text_decoder.decode(b'', final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
+
+# {{ ... }} blocks in n8n parameters
+TEMPLATE_PATTERN = re.compile(r'\{\{(.*?)\}\}', re.DOTALL)
+# $json.a.b, $json["a"], $json['a'] and combinations
+PATH_PATTERN = re.compile(r'''^\$json((?:\.[A-Za-z_$][\w$]*|\[\s*(?:"[^"]*"|'[^']*'|\d+)\s*\])*)$''')
+PATH_PART_PATTERN = re.compile(r'''\.([A-Za-z_$][\w$]*)|\[\s*(?:"([^"]*)"|'([^']*)'|(\d+))\s*\]''')
+
+def _split_alternatives(expression: str) -> List[str]:
+    """Split `a || b || c` on top-level || outside string literals."""
+    parts, current, quote = [], '', None
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif expression.startswith('||', i):
+            parts.append(current.strip())
+            current = ''
+            i += 2
+            continue
+        current += char
+        i += 1
+    parts.append(current.strip())
+    return parts
+
+def compile_expression(expression: str) -> Callable[[Item], Any]:
+    """Compile an n8n expression (field paths, literals and || fallbacks) to a function."""
+    getters = []
+    
+    for part in _split_alternatives(expression):
+        path = PATH_PATTERN.match(part)
+        if path:
+            keys = []
+            for key in PATH_PART_PATTERN.finditer(path.group(1)):
+                name, double_quoted, single_quoted, index = key.groups()
+                keys.append(int(index) if index is not None else
+                            next(k for k in (name, double_quoted, single_quoted) if k is not None))
+            getters.append(lambda item, keys=keys: _get_path(item, keys))
+            continue
+        
+        try:
+            literal = json.loads(part.replace("'", '"') if part.startswith("'") else part)
+        except ValueError:
+            raise ValueError(f"Unsupported expression: {expression!r}")
+        getters.append(lambda item, literal=literal: literal)
+    
+    def evaluate(item: Item) -> Any:
+        value = None
+        for getter in getters:
+            value = getter(item)
+            # JavaScript truthiness decides whether || falls through
+            if value not in (None, '', 0, False) and value != []:
+                return value
+        return value
+    
+    return evaluate
+
+def _get_path(value: Any, keys: List[Any]) -> Any:
+    for key in keys:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(_to_text(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def compile_value(value: Any) -> Callable[[Item], Any]:
+    """Compile a node parameter: `={{ expr }}`, a string with {{ }} blocks, or a constant."""
+    if isinstance(value, dict):
+        compiled = {key: compile_value(v) for key, v in value.items()}
+        return lambda item: {key: f(item) for key, f in compiled.items()}
+    
+    if not isinstance(value, str):
+        return lambda item: value
+    
+    whole = re.fullmatch(r'=?\s*\{\{(.*)\}\}\s*', value, re.DOTALL)
+    if whole and '{{' not in whole.group(1):
+        # The whole value is one expression: keep its type (numbers stay numbers)
+        return compile_expression(whole.group(1).strip())
+    
+    template = value[1:] if value.startswith('=') else value
+    parts = []
+    last = 0
+    for block in TEMPLATE_PATTERN.finditer(template):
+        literal = template[last:block.start()]
+        parts.append(lambda item, literal=literal: literal)
+        expression = compile_expression(block.group(1).strip())
+        parts.append(lambda item, expression=expression: _to_text(expression(item)))
+        last = block.end()
+    
+    if not parts:
+        return lambda item: value
+    
+    tail = template[last:]
+    parts.append(lambda item: tail)
+    return lambda item: ''.join(part(item) for part in parts)
+
+def _to_number(value: Any, strict: bool) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if strict:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+# n8n If-node operations: (left, right) -> bool
+OPERATIONS = {
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b,
+    'equals': lambda a, b: a == b,
+    'notEquals': lambda a, b: a != b,
+    'contains': lambda a, b: b in a,
+    'notContains': lambda a, b: b not in a,
+    'startsWith': lambda a, b: a.startswith(b),
+    'endsWith': lambda a, b: a.endswith(b),
+}
+
+def compile_condition(condition: Dict[str, Any], case_sensitive: bool, strict: bool) -> Callable[[Item], bool]:
+    """Compile one If-node condition into a predicate."""
+    left = compile_value(condition.get('leftValue'))
+    right = compile_value(condition.get('rightValue'))
+    operator = condition.get('operator', {})
+    value_type = operator.get('type', 'string')
+    operation = operator.get('operation', 'equals')
+    
+    if operation in ('exists', 'notExists'):
+        expected = operation == 'exists'
+        return lambda item: (left(item) is not None) == expected
+    
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unsupported If operation: {operation}")
+    compare = OPERATIONS[operation]
+    
+    def coerce(value):
+        if value_type == 'number':
+            return _to_number(value, strict)
+        if value_type == 'boolean':
+            return value if isinstance(value, bool) or strict else bool(value)
+        if value is None or (strict and not isinstance(value, str)):
+            return None
+        value = str(value)
+        return value if case_sensitive else value.lower()
+    
+    def predicate(item: Item) -> bool:
+        a, b = coerce(left(item)), coerce(right(item))
+        if a is None or b is None:
+            return False
+        try:
+            return compare(a, b)
+        except TypeError:
+            return False
+    
+    return predicate
+
+def compile_conditions(parameters: Dict[str, Any]) -> Callable[[Item], bool]:
+    """Compile an If node's conditions block into a single predicate."""
+    block = parameters.get('conditions', {})
+    options = block.get('options', {})
+    case_sensitive = options.get('caseSensitive', True)
+    strict = options.get('typeValidation', 'strict') == 'strict'
+    
+    predicates = [compile_condition(c, case_sensitive, strict) for c in block.get('conditions', [])]
+    if block.get('combinator', 'and') == 'or':
+        return lambda item: any(p(item) for p in predicates)
+    return lambda item: all(p(item) for p in predicates)
+
+class RateLimitedSender:
+    """Send HTTP requests in batches over one session at a bounded rate.
+    
+    Requests are paced to at most rate_per_second; a 429 answer with a
+    retry_after hint (as Telegram sends) waits and retries once.
+    """
+    
+    def __init__(self, session, rate_per_second: float = 1.0, batch_size: int = 20,
+                 on_response: Callable[[Item], None] = None, timeout: float = 30):
+        """Initialize the sender."""
+        self.session = session
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.batch_size = batch_size
+        self.on_response = on_response
+        self.timeout = timeout
+        self._batch: List[Dict[str, Any]] = []
+        self._last_sent = 0.0
+        self.sent = 0
+        self.failed = 0
+    
+    def add(self, method: str, url: str, body: Any = None, headers: Dict[str, str] = None):
+        """Queue a request, sending the batch once it is full."""
+        self._batch.append({'method': method, 'url': url, 'json': body, 'headers': headers})
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Send every queued request."""
+        batch, self._batch = self._batch, []
+        for request in batch:
+            self._send(request)
+    
+    def _send(self, request: Dict[str, Any], retry: bool = True):
+        wait = self._last_sent + self.interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_sent = time.time()
+        
+        try:
+            response = self.session.request(
+                request['method'], request['url'], json=request['json'],
+                headers=request['headers'], timeout=self.timeout
+            )
+        except Exception as e:
+            logger.error(f"Request to {request['url']} failed: {e}")
+            self.failed += 1
+            return
+        
+        if response.status_code == 429 and retry:
+            try:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+            except ValueError:
+                retry_after = 1.0
+            logger.warning(f"Rate limited, retrying in {retry_after:.0f}s")
+            time.sleep(retry_after)
+            return self._send(request, retry=False)
+        
+        if response.status_code >= 400:
+            logger.error(f"Request to {request['url']} failed with {response.status_code}")
+            self.failed += 1
+            return
+        
+        self.sent += 1
+        if self.on_response:
+            try:
+                self.on_response(response.json())
+            except ValueError:
+                self.on_response({'body': response.text})
+
+class WorkflowRunner:
+    """Run an n8n workflow's manualTrigger, httpRequest and if nodes in-process.
+    
+    Items are pushed through the node graph one at a time: a fetch node
+    streams its JSON array and hands each element downstream as soon as it
+    is parsed, If conditions are compiled once into predicates, and nodes
+    that send a body go through a RateLimitedSender.
+    
+    placeholders replaces literal tokens in the workflow (e.g. YOUR_API_TOKEN)
+    and base_urls rewrites URL prefixes, e.g. to point the Apify fetch at a
+    local stand-in server.
+    """
+    
+    SUPPORTED_TYPES = ('n8n-nodes-base.manualTrigger', 'n8n-nodes-base.httpRequest', 'n8n-nodes-base.if')
+    
+    def __init__(self, workflow: Dict[str, Any], placeholders: Dict[str, str] = None,
+                 base_urls: Dict[str, str] = None, session=None,
+                 rate_per_second: float = 1.0, batch_size: int = 20, chunk_size: int = 65536):
+        """Load and compile a workflow definition."""
+        if placeholders:
+            raw = json.dumps(workflow)
+            # Longest first, so a token never clobbers part of a longer one
+            for token in sorted(placeholders, key=len, reverse=True):
+                if placeholders[token]:
+                    raw = raw.replace(token, json.dumps(placeholders[token])[1:-1])
+            workflow = json.loads(raw)
+        
+        self.name = workflow.get('name', 'workflow')
+        self.nodes = {node['name']: node for node in workflow.get('nodes', [])}
+        self.connections = workflow.get('connections', {})
+        self.base_urls = base_urls or {}
+        self.chunk_size = chunk_size
+        
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        
+        unsupported = [n['type'] for n in self.nodes.values() if n['type'] not in self.SUPPORTED_TYPES]
+        if unsupported:
+            raise ValueError(f"Unsupported node types: {', '.join(sorted(set(unsupported)))}")
+        
+        self.stats = {name: {'in': 0, 'out': 0, 'filtered': 0} for name in self.nodes}
+        self._predicates = {}
+        self._requests = {}
+        self._senders = {}
+        
+        for name, node in self.nodes.items():
+            parameters = node.get('parameters', {})
+            
+            if node['type'].endswith('.if'):
+                self._predicates[name] = compile_conditions(parameters)
+            
+            elif node['type'].endswith('.httpRequest'):
+                send_body = parameters.get('sendBody', False)
+                headers = parameters.get('options', {}).get('headers') or {}
+                self._requests[name] = {
+                    'method': parameters.get('method', 'POST' if send_body else 'GET').upper(),
+                    'url': compile_value(parameters.get('url', '')),
+                    'body': compile_value(parameters.get('body', {})) if send_body else None,
+                    'headers': headers
+                }
+                if send_body:
+                    self._senders[name] = RateLimitedSender(
+                        session, rate_per_second, batch_size,
+                        on_response=lambda response, name=name: self._emit(name, 0, response)
+                    )
+    
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'WorkflowRunner':
+        """Load a workflow from an exported n8n JSON file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+    
+    def _rewrite_url(self, url: str) -> str:
+        for prefix, replacement in self.base_urls.items():
+            if replacement and url.startswith(prefix):
+                return replacement.rstrip('/') + url[len(prefix):]
+        return url
+    
+    def _emit(self, name: str, output: int, item: Item):
+        """Hand an item to every node connected to one of a node's outputs."""
+        # Items on an If node's false branch count as filtered out
+        self.stats[name]['out' if output == 0 else 'filtered'] += 1
+        outputs = self.connections.get(name, {}).get('main', [])
+        if output >= len(outputs):
+            return
+        for connection in outputs[output] or []:
+            self._execute(connection['node'], item)
+    
+    def _execute(self, name: str, item: Item):
+        node = self.nodes[name]
+        self.stats[name]['in'] += 1
+        
+        if node['type'].endswith('.if'):
+            # Output 0 is the true branch, output 1 the false branch
+            self._emit(name, 0 if self._predicates[name](item) else 1, item)
+        
+        elif node['type'].endswith('.httpRequest'):
+            request = self._requests[name]
+            url = self._rewrite_url(request['url'](item))
+            
+            if name in self._senders:
+                self._senders[name].add(request['method'], url, request['body'](item), request['headers'])
+            else:
+                self._fetch(name, request['method'], url, request['headers'])
+        
+        else:
+            self._emit(name, 0, item)
+    
+    def _fetch(self, name: str, method: str, url: str, headers: Dict[str, str]):
+        """Stream a JSON response and emit each array element as it is parsed."""
+        response = self.session.request(method, url, headers=headers, stream=True, timeout=300)
+        try:
+            response.raise_for_status()
+            for element in iter_json_array(response.iter_content(self.chunk_size)):
+                self._emit(name, 0, element if isinstance(element, dict) else {'data': element})
+        finally:
+            response.close()
+    
+    def run(self) -> Dict[str, Dict[str, int]]:
+        """Run the workflow from its manual triggers; returns item counts per node."""
+        triggers = [n for n, node in self.nodes.items() if node['type'].endswith('.manualTrigger')]
+        if not triggers:
+            raise ValueError("Workflow has no manualTrigger node")
+        
+        for name in triggers:
+            self._execute(name, {})
+        
+        # Send whatever is left in partially filled batches
+        for sender in self._senders.values():
+            sender.flush()
+        
+        for name, sender in self._senders.items():
+            logger.info(f"{name}: sent {sender.sent} requests, {sender.failed} failed")
+        
+        return self.stats
+
+def main():
+    """Run tiktok-telegram-workflow.json (or the workflow given as argument)."""
+    load_dotenv()
+    setup_logging()
+    
+    path = sys.argv[1] if len(sys.argv) > 1 else 'tiktok-telegram-workflow.json'
+    runner = WorkflowRunner.from_file(
+        path,
+        placeholders={
+            'YOUR_TASK_ID': os.getenv('APIFY_TASK_ID'),
+            'YOUR_API_TOKEN': os.getenv('APIFY_TOKEN'),
+            'TELEGRAM_BOT_TOKEN': os.getenv('TELEGRAM_TOKEN'),
+            'TELEGRAM_CHAT_ID': os.getenv('TELEGRAM_CHAT_ID')
+        },
+        base_urls={
+            'https://api.apify.com': os.getenv('APIFY_API_BASE'),
+            'https://api.telegram.org': os.getenv('TELEGRAM_API_BASE')
+        },
+        rate_per_second=float(os.getenv('WORKFLOW_SEND_RATE', '1')),
+        batch_size=int(os.getenv('WORKFLOW_BATCH_SIZE', '20'))
+    )
+    
+    logger.info(f"Running workflow: {runner.name}")
+    stats = runner.run()
+    for name, counts in stats.items():
+        print(f"  {name}: {counts['in']} in, {counts['out']} out, {counts['filtered']} filtered")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())